@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Adversarial Input Benchmark for uBlock Unified List Generator
+
+This module times the per-rule conversion and optimization path on
+generated lines built to make naive matching backtrack: repeated anchors,
+long whitespace runs, deeply nested regex groups, near misses of stored
+wildcard patterns and the like. Each shape is timed at growing line
+lengths and the growth exponent of its time, less the time of a short
+line of the same shape, is fitted, so a change that makes any step
+superlinear again fails the benchmark.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import UBlockRuleConverter
+from error_handler import ErrorHandler
+from logger import UnifiedLogger
+from regex_rewriter import RegexRewriter
+from rule_converter import RuleConverter
+from rule_optimizer import RuleOptimizer
+
+
+# Line length whose time is taken as the fixed cost of a shape
+BASELINE_SIZE = 64
+
+# Seconds above the fixed cost below which timings are too noisy to fit
+NOISE_FLOOR = 0.001
+
+# Stored pattern with many wildcards, matched against lines that almost fit it
+WILDCARD_PATTERN = "*a*b*c*d*e*f*g*h*"
+
+# Adversarial line shapes: source type the line is converted as, None to
+# only match it against WILDCARD_PATTERN, and a builder of a line of about n characters
+SHAPES: Dict[str, Tuple[Optional[str], Callable[[int], str]]] = {
+    "domain_anchors": ("uBlock Origin", lambda n: "||*." + "||" * (n // 2)),
+    "child_combinator": ("uBlock Origin", lambda n: "example.com##a" + " " * n + "b"),
+    "nested_groups": ("uBlock Origin", lambda n: "/" + "(" * (n // 2) + "a" + ")" * (n // 2) + "/"),
+    "alternation": ("uBlock Origin", lambda n: "/" + "ad|" * (n // 3) + "ad/"),
+    "separators": ("uBlock Origin", lambda n: "||example.com" + "^," * (n // 2)),
+    "domain_list": ("uBlock Origin", lambda n: "||example.com^$domain=" + "|".join(
+        f"d{i}.com" for i in range(n // 8))),
+    "wildcards": ("uBlock Origin", lambda n: "||" + "*" * n + "example.com^"),
+    "adguard_css": ("AdGuard", lambda n: "example.com" + "#$#" * (n // 3)),
+    "hosts_entry": ("Hosts File", lambda n: "0.0.0.0 " + "a." * (n // 2) + "com"),
+    "ghostery_near_miss": ("Ghostery", lambda n: "example.co" * (n // 10)),
+    "wildcard_pattern": (None, lambda n: "abcdefg" * (n // 7)),
+}
+
+
+class AdversarialBenchmark:
+    """Times the per-rule pipeline on adversarial lines of growing length."""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the benchmark.
+
+        Args:
+            db_path: Path of the conversion database, created if missing
+        """
+        logger = UnifiedLogger("AdversarialBenchmark")
+        self.converter = UBlockRuleConverter(db_path)
+        self.rewriter = RegexRewriter()
+        self.optimizer = RuleOptimizer(logger, ErrorHandler(logger))
+
+    def process(self, line: str, source_type: Optional[str]) -> None:
+        """
+        Run one line through the steps the list generator applies to each rule.
+
+        Args:
+            line: Raw line
+            source_type: Source type to convert the line as, or None to only
+                match it against WILDCARD_PATTERN
+        """
+        if source_type is None:
+            self.converter._pattern_matches(WILDCARD_PATTERN, line)
+            return
+
+        converted, _ = self.converter.convert_rule(line, source_type)
+        rules = [converted] if converted else []
+        if converted and converted.startswith(("/", "@@/")):
+            rules = self.rewriter.rewrite(converted) or rules
+        for rule in rules:
+            self.optimizer._optimize_rule(rule)
+            RuleConverter.classify_rule(rule)
+
+    def time_line(self, line: str, source_type: Optional[str], repeat: int) -> float:
+        """
+        Time one line, keeping the fastest of several runs.
+
+        Args:
+            line: Raw line
+            source_type: Source type to convert the line as
+            repeat: Number of runs
+
+        Returns:
+            Fastest run in seconds
+        """
+        best = math.inf
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.process(line, source_type)
+            best = min(best, time.perf_counter() - started)
+        return best
+
+
+def growth_exponent(sizes: List[int], seconds: List[float]) -> float:
+    """
+    Fit the exponent k of seconds ~ size^k by least squares on a log-log scale.
+
+    Args:
+        sizes: Line lengths
+        seconds: Time taken at each length
+
+    Returns:
+        Fitted exponent, about 1 for linear and 2 for quadratic growth
+    """
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(second, 1e-9)) for second in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance if variance else 0.0
+
+
+def main() -> int:
+    """Command line entry point of the adversarial benchmark."""
+    parser = argparse.ArgumentParser(description="Time the rule pipeline on adversarial lines of growing length.")
+    parser.add_argument('shapes', nargs='*', help=f"shapes to run, all by default: {', '.join(SHAPES)}")
+    parser.add_argument('--sizes', default='16384,65536,262144', help="comma-separated line lengths")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per line, the fastest is kept")
+    parser.add_argument('--max-exponent', type=float, default=1.3,
+                        help="fail if a shape's time grows faster than size to this power")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.shapes if name not in SHAPES]
+    if unknown:
+        parser.error(f"unknown shapes: {', '.join(unknown)}")
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    if len(sizes) < 2:
+        parser.error("--sizes needs at least two lengths")
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        benchmark = AdversarialBenchmark(os.path.join(directory, 'ublock_rules_dictionary.db'))
+        print(f"{'shape':<20}" + "".join(f"{size:>12}" for size in sizes) + f"{'exponent':>10}")
+        for name in args.shapes or SHAPES:
+            source_type, build = SHAPES[name]
+            # Fixed costs such as the database lookup would hide the growth
+            try:
+                baseline = benchmark.time_line(build(BASELINE_SIZE), source_type, args.repeat)
+                seconds = [benchmark.time_line(build(size), source_type, args.repeat) for size in sizes]
+            except Exception as e:
+                failures += 1
+                print(f"{name:<20}failed: {type(e).__name__}: {str(e)[:80]}")
+                continue
+            row = f"{name:<20}" + "".join(f"{second * 1000:>10.2f}ms" for second in seconds)
+            if seconds[-1] - baseline < NOISE_FLOOR:
+                print(f"{row}{'-':>10}")
+                continue
+            exponent = growth_exponent(sizes, [second - baseline for second in seconds])
+            verdict = "" if exponent <= args.max_exponent else "  superlinear"
+            failures += bool(verdict)
+            print(f"{row}{exponent:>10.2f}{verdict}")
+
+    if failures:
+        print(f"{failures} shapes failed or grew faster than size^{args.max_exponent}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
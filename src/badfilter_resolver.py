@@ -0,0 +1,234 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from logger import UnifiedLogger
+from error_handler import ErrorHandler, ConfigError
+from rule_canonicalizer import RuleCanonicalizer
+
+
+class BadfilterResolver:
+    """Applies ``$badfilter`` rules at build time.
+
+    A ``$badfilter`` rule disables the filter it equals once the option is
+    removed. uBO otherwise compiles both and cancels the target on every
+    device. Targets are looked up by their canonical text, and a badfilter
+    with a ``domain=`` list also disables filters whose domain list is a
+    subset of it, including entity entries such as ``example.*``. Lists
+    with negated entries only match exactly.
+    """
+
+    # What to do with badfilters once their targets are removed:
+    # 'unmatched' keeps only those that may target rules of other lists
+    KEEP_MODES = ('none', 'unmatched', 'all')
+
+    def __init__(self, logger: UnifiedLogger, error_handler: ErrorHandler, settings: Optional[Dict] = None):
+        """Initialize the badfilter resolver.
+
+        Args:
+            logger (UnifiedLogger): Logger instance for resolution reporting.
+            error_handler (ErrorHandler): Error handler for report errors.
+            settings (Optional[Dict]): The ``badfilter`` settings block.
+
+        Raises:
+            ConfigError: If the keep mode is not supported.
+        """
+        self.logger = logger
+        self.error_handler = error_handler
+        self.settings = settings or {}
+
+        self.keep = self.settings.get('keep', 'unmatched')
+        if self.keep not in self.KEEP_MODES:
+            raise ConfigError(f"Unsupported badfilter keep mode: {self.keep}")
+
+        # Canonical target text mapped to the badfilter disabling it
+        self.targets: Dict[str, str] = {}
+        # Target without its domain= option mapped to badfilter domain sets
+        self.domain_targets: Dict[str, List[Tuple[FrozenSet[str], str]]] = {}
+
+    def resolve(
+        self,
+        read_rules: Callable[[], Iterable[Tuple[str, str]]],
+        build_time: Optional[datetime] = None
+    ) -> Set[str]:
+        """Find the badfilters and targets to remove, and write the report.
+
+        Args:
+            read_rules (Callable[[], Iterable[Tuple[str, str]]]): Returns a fresh
+                iterable of (rule, source name) pairs; it is read twice.
+            build_time (Optional[datetime]): UTC time stamped in the report, now if omitted.
+
+        Returns:
+            Set[str]: Rules to remove from the list.
+        """
+        self.targets = {}
+        self.domain_targets = {}
+        badfilters: Dict[str, str] = {}
+        for rule, source in read_rules():
+            if 'badfilter' in rule and self.add_badfilter(rule):
+                badfilters[rule] = source
+
+        if not badfilters:
+            return set()
+
+        removed: Set[str] = set()
+        removed_targets: List[Dict] = []
+        matched: Set[str] = set()
+        for rule, source in read_rules():
+            if rule in badfilters:
+                continue
+            badfilter = self.match(rule)
+            if badfilter is not None:
+                removed.add(rule)
+                matched.add(badfilter)
+                removed_targets.append({
+                    'rule': rule, 'source': source,
+                    'badfilter': badfilter, 'badfilter_source': badfilters[badfilter]
+                })
+
+        unmatched = [rule for rule in badfilters if rule not in matched]
+        if self.keep == 'none':
+            removed.update(badfilters)
+        elif self.keep == 'unmatched':
+            removed.update(matched)
+
+        self._write_report({
+            'generated': (build_time or datetime.utcnow()).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'keep': self.keep,
+            'badfilters': len(badfilters),
+            'removed_targets': removed_targets,
+            'removed_badfilters': sorted(rule for rule in badfilters if rule in removed),
+            'unmatched_badfilters': [
+                {'rule': rule, 'source': badfilters[rule]} for rule in sorted(unmatched)
+            ]
+        })
+
+        self.logger.info(
+            f"Applied {len(matched)} of {len(badfilters)} badfilters, "
+            f"removed {len(removed_targets)} targets and {len(removed) - len(removed_targets)} badfilters"
+        )
+        return removed
+
+    def add_badfilter(self, rule: str) -> bool:
+        """Index the target of a badfilter rule.
+
+        Args:
+            rule (str): Canonical rule to index.
+
+        Returns:
+            bool: True if the rule is a badfilter.
+        """
+        prefix, pattern, options = self._split(rule)
+        if options is None or 'badfilter' not in options:
+            return False
+
+        options = [option for option in options if option != 'badfilter']
+        target = self._join(prefix, pattern, options)
+        self.targets.setdefault(target, rule)
+
+        domains = self._split_domains(prefix, pattern, options)
+        if domains is not None:
+            base, entries = domains
+            self.domain_targets.setdefault(base, []).append((entries, rule))
+        return True
+
+    def match(self, rule: str) -> Optional[str]:
+        """Find the badfilter that disables a rule.
+
+        Args:
+            rule (str): Canonical rule to look up.
+
+        Returns:
+            Optional[str]: Badfilter disabling the rule, or None.
+        """
+        badfilter = self.targets.get(rule)
+        if badfilter is not None or not self.domain_targets or 'domain=' not in rule:
+            return badfilter
+
+        prefix, pattern, options = self._split(rule)
+        domains = self._split_domains(prefix, pattern, options) if options else None
+        if domains is None:
+            return None
+        base, entries = domains
+        for badfilter_entries, badfilter in self.domain_targets.get(base, ()):
+            if entries <= badfilter_entries:
+                return badfilter
+        return None
+
+    @staticmethod
+    def _split(rule: str) -> Tuple[str, str, Optional[List[str]]]:
+        """Split a network filter into exception prefix, pattern and options.
+
+        Args:
+            rule (str): Rule to split.
+
+        Returns:
+            Tuple[str, str, Optional[List[str]]]: Prefix, pattern and option list,
+                or None options for rules without options or with cosmetic syntax.
+        """
+        prefix = ''
+        if rule.startswith('@@'):
+            prefix, rule = '@@', rule[2:]
+        if '#' in rule and any(separator in rule for separator in RuleCanonicalizer.COSMETIC_SEPARATORS):
+            return prefix, rule, None
+        pattern, options = RuleCanonicalizer.split_options(rule)
+        if options is None:
+            return prefix, pattern, None
+        return prefix, pattern, [option.strip() for option in options.split(',')]
+
+    @staticmethod
+    def _join(prefix: str, pattern: str, options: List[str]) -> str:
+        """Assemble a network filter from its parts.
+
+        Args:
+            prefix (str): Exception prefix or empty string.
+            pattern (str): Filter pattern.
+            options (List[str]): Canonical options.
+
+        Returns:
+            str: Filter text.
+        """
+        return f"{prefix}{pattern}${','.join(options)}" if options else prefix + pattern
+
+    def _split_domains(
+        self,
+        prefix: str,
+        pattern: str,
+        options: List[str]
+    ) -> Optional[Tuple[str, FrozenSet[str]]]:
+        """Separate the domain= option from the rest of a filter.
+
+        Args:
+            prefix (str): Exception prefix or empty string.
+            pattern (str): Filter pattern.
+            options (List[str]): Canonical options.
+
+        Returns:
+            Optional[Tuple[str, FrozenSet[str]]]: Filter without its domain= option
+                and the set of domain entries, or None if it has no domain= option
+                or the option has negated entries.
+        """
+        for index, option in enumerate(options):
+            if option.startswith('domain='):
+                entries = frozenset(option[len('domain='):].split('|'))
+                # Negated entries narrow a filter, those lists only match exactly
+                if any(entry.startswith('~') for entry in entries):
+                    return None
+                base = self._join(prefix, pattern, options[:index] + options[index + 1:])
+                return base, entries
+        return None
+
+    def _write_report(self, report: Dict) -> None:
+        """Write the badfilter report to the configured path.
+
+        Args:
+            report (Dict): Report data to serialize.
+        """
+        report_path = Path(self.settings.get('report_file', 'reports/badfilter.json'))
+        try:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            self.error_handler.handle_error(e, "writing badfilter report")
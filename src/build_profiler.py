@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Build Profiler for uBlock Unified List Generator
+
+This module profiles a build stage by stage when the generator runs with
+--profile. Each stage gets its own cProfile profile and tracemalloc
+snapshots, per-rule hot functions are timed to find the slowest rules,
+and the results are written as pstats files, a collapsed-stack file for
+flamegraph tools and a JSON report. Nothing is installed when profiling
+is off.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import cProfile
+import heapq
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Callers are followed up to this depth when reconstructing stacks
+MAX_STACK_DEPTH = 64
+
+# Stack weights below this many seconds follow only their main caller,
+# which bounds the number of reconstructed stacks
+MIN_STACK_WEIGHT = 1e-4
+
+
+class _Stage:
+    """Accumulated measurements of one build stage."""
+
+    def __init__(self, name: str):
+        """
+        Initialize the stage record.
+
+        Args:
+            name: Stage name
+        """
+        self.name = name
+        self.profile = cProfile.Profile()
+        # Profiles of work the stage ran on worker threads
+        self.thread_profiles: List[cProfile.Profile] = []
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_bytes = 0
+        # Net allocation growth by source line: location -> [bytes, blocks]
+        self.allocations: Dict[str, List[int]] = {}
+
+
+class BuildProfiler:
+    """Per-stage CPU and allocation profiler for a build."""
+
+    def __init__(self, output_dir: str, top: int = 25, traceback_frames: int = 1):
+        """
+        Initialize the profiler and start tracing allocations.
+
+        Args:
+            output_dir: Directory the profile files are written to
+            top: Number of entries kept in each top-N list
+            traceback_frames: Frames stored per traced allocation
+        """
+        self.output_dir = Path(output_dir)
+        self.top = max(1, top)
+        self._stages: Dict[str, _Stage] = {}
+        self._active: List[_Stage] = []
+        # Min-heaps of (seconds, rule) per timed function
+        self._slowest: Dict[str, List[Tuple[float, str]]] = {}
+        self._lock = threading.Lock()
+        tracemalloc.start(traceback_frames)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Profile the enclosed code as part of a stage.
+
+        A stage may be entered several times, its measurements accumulate.
+        Entering a stage inside another pauses the outer stage's profile.
+
+        Args:
+            name: Stage name
+        """
+        outer = self._active[-1] if self._active else None
+        if outer is not None:
+            outer.profile.disable()
+            outer.peak_bytes = max(outer.peak_bytes, tracemalloc.get_traced_memory()[1])
+
+        record = self._stages.setdefault(name, _Stage(name))
+        before = self._snapshot()
+        tracemalloc.reset_peak()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        self._active.append(record)
+        record.profile.enable()
+        try:
+            yield
+        finally:
+            record.profile.disable()
+            self._active.pop()
+            record.wall_seconds += time.perf_counter() - wall_start
+            record.cpu_seconds += time.process_time() - cpu_start
+            peak = tracemalloc.get_traced_memory()[1]
+            record.peak_bytes = max(record.peak_bytes, peak)
+            for stat in self._snapshot().compare_to(before, "lineno"):
+                if stat.size_diff or stat.count_diff:
+                    entry = record.allocations.setdefault(str(stat.traceback[0]), [0, 0])
+                    entry[0] += stat.size_diff
+                    entry[1] += stat.count_diff
+
+            if outer is not None:
+                outer.peak_bytes = max(outer.peak_bytes, peak)
+                outer.profile.enable()
+
+    def thread_task(self, name: str, func: Callable) -> Callable:
+        """
+        Wrap a function so its runs on worker threads are profiled into a stage.
+
+        cProfile only sees the thread that enabled it, so each run gets its
+        own profile, merged into the stage when the report is written.
+
+        Args:
+            name: Stage name
+            func: Function run on a worker thread
+
+        Returns:
+            Profiled wrapper of the function
+        """
+        record = self._stages.setdefault(name, _Stage(name))
+
+        @wraps(func)
+        def profiled(*args: Any, **kwargs: Any) -> Any:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler owns the interpreter, run unprofiled
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    record.thread_profiles.append(profile)
+
+        return profiled
+
+    def time_rules(self, name: str, func: Callable) -> Callable:
+        """
+        Wrap a per-rule function to keep the rules it spent the most time on.
+
+        Args:
+            name: Name the timings are reported under
+            func: Function taking the rule as its first argument
+
+        Returns:
+            Timing wrapper of the function
+        """
+        slowest = self._slowest.setdefault(name, [])
+        top = self.top
+
+        @wraps(func)
+        def timed(rule: str, *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(rule, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                if len(slowest) < top:
+                    heapq.heappush(slowest, (elapsed, rule))
+                elif elapsed > slowest[0][0]:
+                    heapq.heapreplace(slowest, (elapsed, rule))
+
+        return timed
+
+    def write(self, build_time: Optional[datetime] = None) -> Path:
+        """
+        Stop tracing and write the pstats files, collapsed stacks and report.
+
+        Args:
+            build_time: UTC time stamped in the report, now if omitted
+
+        Returns:
+            Path of the JSON report
+        """
+        tracemalloc.stop()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        stages = []
+        stacks: Dict[str, float] = {}
+        for record in self._stages.values():
+            stats = self._stats(record)
+            if stats is None:
+                continue
+            stats.dump_stats(str(self.output_dir / f"{record.name}.pstats"))
+            self._collapse(record.name, stats, stacks)
+            stages.append(self._summarize(record, stats))
+
+        with open(self.output_dir / "stacks.collapsed", "w", encoding="utf-8") as f:
+            for stack, seconds in sorted(stacks.items()):
+                microseconds = round(seconds * 1e6)
+                if microseconds:
+                    f.write(f"{stack} {microseconds}\n")
+
+        report = {
+            "generated": (build_time or datetime.utcnow()).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "stages": stages,
+            "slowest_rules": {
+                name: [
+                    {"rule": rule, "microseconds": round(seconds * 1e6, 1)}
+                    for seconds, rule in sorted(slowest, reverse=True)
+                ]
+                for name, slowest in self._slowest.items()
+            }
+        }
+        report_path = self.output_dir / "report.json"
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report_path
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        """
+        Take an allocation snapshot without the profiler's own allocations.
+
+        Returns:
+            Filtered snapshot
+        """
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, cProfile.__file__)
+        ))
+
+    @staticmethod
+    def _stats(record: _Stage) -> Optional[pstats.Stats]:
+        """
+        Merge a stage's main and worker thread profiles.
+
+        Args:
+            record: Stage record
+
+        Returns:
+            Merged statistics, or None if the stage recorded no calls
+        """
+        profiles = [record.profile, *record.thread_profiles]
+        stats = None
+        for profile in profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        return stats
+
+    def _summarize(self, record: _Stage, stats: pstats.Stats) -> Dict[str, Any]:
+        """
+        Build the report entry of a stage.
+
+        Args:
+            record: Stage record
+            stats: Merged profile statistics of the stage
+
+        Returns:
+            Stage timings with its top functions and top allocations
+        """
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        allocations = sorted(record.allocations.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+        return {
+            "name": record.name,
+            "wall_seconds": round(record.wall_seconds, 3),
+            "cpu_seconds": round(record.cpu_seconds, 3),
+            "peak_traced_kib": round(record.peak_bytes / 1024, 1),
+            "top_functions": [
+                {
+                    "function": self._label(func),
+                    "calls": calls,
+                    "own_seconds": round(own, 4),
+                    "cumulative_seconds": round(cumulative, 4)
+                }
+                for func, (_, calls, own, cumulative, _) in functions
+            ],
+            "top_allocations": [
+                {"location": location, "net_kib": round(size / 1024, 1), "net_blocks": blocks}
+                for location, (size, blocks) in allocations
+                if size > 0
+            ]
+        }
+
+    def _collapse(self, stage: str, stats: pstats.Stats, stacks: Dict[str, float]) -> None:
+        """
+        Reconstruct collapsed stacks from a profile's caller graph.
+
+        cProfile records caller and callee pairs, not whole stacks, so each
+        function's own time is split among its callers in proportion to the
+        time each spent calling it, the usual approximation for profile
+        flame graphs.
+
+        Args:
+            stage: Stage name, used as the root frame
+            stats: Merged profile statistics of the stage
+            stacks: Collapsed stack to seconds, updated in place
+        """
+        graph = stats.stats
+        for func, (_, _, own, _, _) in graph.items():
+            if own <= 0:
+                continue
+            pending = [(func, own, [self._label(func)], {func})]
+            while pending:
+                current, weight, frames, seen = pending.pop()
+                callers = [
+                    (caller, timing[3])
+                    for caller, timing in graph.get(current, (0, 0, 0, 0, {}))[4].items()
+                    if caller not in seen and timing[3] > 0
+                ]
+                if not callers or len(frames) >= MAX_STACK_DEPTH:
+                    stack = ";".join([stage, *reversed(frames)])
+                    stacks[stack] = stacks.get(stack, 0.0) + weight
+                    continue
+                if weight < MIN_STACK_WEIGHT:
+                    callers = [max(callers, key=lambda item: item[1])]
+                total = sum(cumulative for _, cumulative in callers)
+                for caller, cumulative in callers:
+                    pending.append((
+                        caller, weight * cumulative / total, frames + [self._label(caller)], seen | {caller}
+                    ))
+
+    @staticmethod
+    def _label(func: Tuple[str, int, str]) -> str:
+        """
+        Format a profile function key as a stack frame.
+
+        Args:
+            func: Tuple of (file name, line number, function name)
+
+        Returns:
+            Frame label without the separators of the collapsed format
+        """
+        filename, line, name = func
+        if filename == "~":
+            label = name
+        else:
+            label = f"{name} ({os.path.basename(filename)}:{line})"
+        return label.replace(";", ",")
@@ -0,0 +1,143 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from logger import UnifiedLogger
+from error_handler import ErrorHandler, ConfigError
+from badfilter_resolver import BadfilterResolver
+from exception_pruner import ExceptionPruner
+from rule_cost_analyzer import RuleCostAnalyzer
+from list_exporter import ListExporter
+from chunk_writer import ChunkWriter
+
+
+class BuildVariant:
+    """One list built from the shared converted rules, with its own sources, sections and outputs.
+
+    The main list is the variant described by the configuration's settings.
+    Each entry of the ``variants`` configuration section adds another list,
+    which only filters, merges and writes the rules every list shares.
+    """
+
+    # Post-merge stages each optimization level runs, if enabled in the settings
+    OPTIMIZATION_LEVELS = {
+        'full': ('badfilter', 'exception_pruning', 'cost_analysis'),
+        'standard': ('badfilter', 'exception_pruning'),
+        'minimal': ()
+    }
+
+    def __init__(
+        self,
+        logger: UnifiedLogger,
+        error_handler: ErrorHandler,
+        config: Any,
+        variant: Optional[Dict] = None
+    ):
+        """Initialize the variant.
+
+        Args:
+            logger (UnifiedLogger): Logger instance for stage reporting.
+            error_handler (ErrorHandler): Error handler for stage errors.
+            config (Config): Build configuration.
+            variant (Optional[Dict]): Entry of the ``variants`` section, or None
+                for the main list.
+
+        Raises:
+            ConfigError: If the optimization level is not supported.
+        """
+        variant = variant or {}
+        self.name = variant.get('name', '')
+        self.metadata = {**config.metadata, **variant.get('metadata', {})}
+        if variant:
+            self.settings = {
+                'output_file': variant['output_file'],
+                'exports': variant.get('exports', []),
+                'provenance_file': variant.get('provenance_file'),
+                'chunked_output': variant.get('chunked_output', {})
+            }
+        else:
+            self.settings = config.settings
+
+        # Sources and sections this list keeps, None keeps all of them
+        self.sources: Optional[Set[str]] = set(variant['sources']) if 'sources' in variant else None
+        self.excluded_sources: Set[str] = set(variant.get('exclude_sources', []))
+        self.sections: List[Dict] = list(config.sections) + [
+            {'name': 'Other Filters', 'description': '', 'rule_types': []}
+        ]
+        self.section_index: Dict[int, int] = {}
+        for index, section in enumerate(config.sections):
+            for rule_type in section.get('rule_types', []):
+                self.section_index.setdefault(rule_type, index)
+        self.kept_sections: Optional[Set[int]] = (
+            {index for index, section in enumerate(self.sections) if section['name'] in variant['sections']}
+            if 'sections' in variant else None
+        )
+
+        level = variant.get('optimization', 'full')
+        if level not in self.OPTIMIZATION_LEVELS:
+            raise ConfigError(f"Unsupported optimization level in variant {self.name}: {level}")
+        stages = self.OPTIMIZATION_LEVELS[level]
+        badfilter_settings = self._stage_settings(
+            config.settings.get('badfilter', {}), 'reports/badfilter.json'
+        )
+        self.badfilter_resolver = (
+            BadfilterResolver(logger, error_handler, badfilter_settings)
+            if 'badfilter' in stages and badfilter_settings.get('enabled', False) else None
+        )
+        pruning_settings = self._stage_settings(
+            config.settings.get('exception_pruning', {}), 'reports/exception_coverage.json'
+        )
+        self.exception_pruner = (
+            ExceptionPruner(logger, error_handler, pruning_settings)
+            if 'exception_pruning' in stages and pruning_settings.get('enabled', False) else None
+        )
+        cost_settings = self._stage_settings(
+            config.settings.get('cost_analysis', {}), 'reports/rule_cost.json'
+        )
+        self.cost_analyzer = (
+            RuleCostAnalyzer(logger, error_handler, cost_settings)
+            if 'cost_analysis' in stages and cost_settings.get('enabled', False) else None
+        )
+
+        self.list_exporter = ListExporter(logger, error_handler, self.metadata)
+        chunk_settings = self.settings.get('chunked_output', {})
+        self.chunk_writer = (
+            ChunkWriter(logger, error_handler, chunk_settings)
+            if chunk_settings.get('enabled', False) else None
+        )
+
+    def includes_source(self, name: str) -> bool:
+        """Check whether the list takes rules from a source.
+
+        Args:
+            name (str): Source name.
+
+        Returns:
+            bool: True if the source is selected and not excluded.
+        """
+        return (self.sources is None or name in self.sources) and name not in self.excluded_sources
+
+    def section_of(self, rule_type: int) -> int:
+        """Get the index of the section a rule type is written to.
+
+        Args:
+            rule_type (int): Rule type ID, 0 for unclassified rules.
+
+        Returns:
+            int: Index into sections, the trailing catch-all for unlisted types.
+        """
+        return self.section_index.get(rule_type, len(self.sections) - 1)
+
+    def _stage_settings(self, settings: Dict, default_report: str) -> Dict:
+        """Get a stage's settings block with the report moved to the variant's directory.
+
+        Args:
+            settings (Dict): Stage settings block of the main list.
+            default_report (str): Report file the stage writes when none is configured.
+
+        Returns:
+            Dict: Settings block whose report file does not clash with other lists.
+        """
+        if not self.name:
+            return settings
+        report_file = Path(settings.get('report_file', default_report))
+        return {**settings, 'report_file': str(report_file.parent / self.name / report_file.name)}
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from logger import UnifiedLogger
+from error_handler import ErrorHandler
+
+
+class ChunkWriter:
+    """Writes the unified list as a root list that ``!#include``s chunks.
+
+    Each section is split into a power of two number of chunks by a stable
+    hash of the canonical rule, so a rule stays in the same chunk across
+    builds and a change only rewrites the chunk holding it. The chunk count
+    of a section only grows, doubling when the section outgrows the
+    configured chunk size. Chunks carry no timestamp: an unchanged chunk is
+    left untouched on disk, keeping its bytes, modification time and ETag.
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+
+    def __init__(self, logger: UnifiedLogger, error_handler: ErrorHandler, settings: Optional[Dict] = None):
+        """Initialize the chunk writer.
+
+        Args:
+            logger (UnifiedLogger): Logger instance for output reporting.
+            error_handler (ErrorHandler): Error handler for output errors.
+            settings (Optional[Dict]): The ``chunked_output`` settings block.
+        """
+        self.logger = logger
+        self.error_handler = error_handler
+        self.settings = settings or {}
+
+        self.directory = Path(self.settings.get('directory', 'output/chunks'))
+        self.root_file = self.settings.get('root_file', 'ublock-unified-list.txt')
+        self.chunk_size = max(1, self.settings.get('chunk_size', 20000))
+        self.workers = max(1, self.settings.get('workers', 4))
+
+    def write(
+        self,
+        sections: Iterable[Tuple[str, str, Iterable[str]]],
+        header: str,
+        build_time: Optional[datetime] = None
+    ) -> Dict:
+        """Write the chunks, the root list and the manifest.
+
+        Sections are partitioned one at a time and their chunks written in
+        parallel, so at most one section's rules are held at once.
+
+        Args:
+            sections (Iterable[Tuple[str, str, Iterable[str]]]): Ordered
+                sections as tuples of (name, description, rules).
+            header (str): Metadata header of the root list.
+            build_time (Optional[datetime]): UTC time stamped in the manifest, now if omitted.
+
+        Returns:
+            Dict: The manifest that was written.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        previous = self._load_manifest()
+        previous_counts = previous.get('sections', {})
+
+        chunks: List[Dict] = []
+        section_counts: Dict[str, int] = {}
+        root_lines = [header]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for name, description, section_rules in sections:
+                section_rules = list(section_rules)
+                count = self.chunk_count(len(section_rules), previous_counts.get(name, 1))
+                section_counts[name] = count
+
+                # Filtering the ordered section keeps each chunk in output order
+                buckets: List[List[str]] = [[] for _ in range(count)]
+                for rule in section_rules:
+                    buckets[self.bucket(rule, count)].append(rule)
+                del section_rules
+
+                slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'section'
+                futures = [
+                    executor.submit(self._write_chunk, f"{slug}-{index:02d}.txt", name, index, count, bucket)
+                    for index, bucket in enumerate(buckets)
+                ]
+                root_lines.append(f"! === {name} ===\n")
+                if description:
+                    root_lines.append(f"! {description}\n")
+                for future in futures:
+                    chunk = future.result()
+                    chunks.append(chunk)
+                    root_lines.append(f"!#include {chunk['file']}\n")
+
+        self._write_file(self.directory / self.root_file, ''.join(root_lines).encode('utf-8'))
+
+        # Chunks of sections that no longer exist would be served stale
+        current = {chunk['file'] for chunk in chunks}
+        for chunk in previous.get('chunks', []):
+            if chunk['file'] not in current:
+                (self.directory / chunk['file']).unlink(missing_ok=True)
+
+        manifest = {
+            'generated': (build_time or datetime.utcnow()).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'root': self.root_file,
+            'chunk_size': self.chunk_size,
+            'sections': section_counts,
+            'chunks': [{key: value for key, value in chunk.items() if key != 'changed'} for chunk in chunks]
+        }
+        self._write_file(
+            self.directory / self.MANIFEST_FILE, json.dumps(manifest, indent=2).encode('utf-8')
+        )
+
+        changed = sum(chunk['changed'] for chunk in chunks)
+        self.logger.info(
+            f"Written {len(chunks)} chunks to {self.directory}, {changed} changed, "
+            f"{len(chunks) - changed} unchanged"
+        )
+        return manifest
+
+    def chunk_count(self, rule_count: int, previous_count: int = 1) -> int:
+        """Get the number of chunks for a section.
+
+        Args:
+            rule_count (int): Number of rules in the section.
+            previous_count (int): Chunk count of the section in the last build.
+
+        Returns:
+            int: Power of two chunk count, never below the previous count.
+        """
+        count = 1
+        while count < previous_count:
+            count *= 2
+        while rule_count > count * self.chunk_size:
+            count *= 2
+        return count
+
+    @staticmethod
+    def bucket(rule: str, count: int) -> int:
+        """Get the chunk a rule belongs to.
+
+        CRC-32 is stable across processes, unlike hash(), and its low bits
+        are kept when the chunk count doubles, so a split only moves rules
+        from each chunk into one new chunk.
+
+        Args:
+            rule (str): Canonical rule.
+            count (int): Power of two chunk count.
+
+        Returns:
+            int: Chunk index.
+        """
+        return zlib.crc32(rule.encode('utf-8')) & (count - 1)
+
+    def _write_chunk(self, file_name: str, section: str, index: int, count: int, rules: List[str]) -> Dict:
+        """Write one chunk unless its content is unchanged.
+
+        Args:
+            file_name (str): Chunk file name within the chunk directory.
+            section (str): Name of the section.
+            index (int): Chunk index within the section.
+            count (int): Number of chunks in the section.
+            rules (List[str]): Ordered rules of the chunk.
+
+        Returns:
+            Dict: Manifest entry of the chunk.
+        """
+        lines = [f"! {section} ({index + 1}/{count})\n"]
+        lines.extend(f"{rule}\n" for rule in rules)
+        data = ''.join(lines).encode('utf-8')
+        changed = self._write_file(self.directory / file_name, data)
+        return {
+            'file': file_name,
+            'section': section,
+            'index': index,
+            'rules': len(rules),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'changed': changed
+        }
+
+    @staticmethod
+    def _write_file(path: Path, data: bytes) -> bool:
+        """Atomically replace a file if its content differs.
+
+        Args:
+            path (Path): File to write.
+            data (bytes): New content.
+
+        Returns:
+            bool: True if the file was written, False if it already held the content.
+        """
+        try:
+            if path.stat().st_size == len(data) and path.read_bytes() == data:
+                return False
+        except FileNotFoundError:
+            pass
+
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # mkstemp creates owner-only files, chunks are published
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return True
+
+    def _load_manifest(self) -> Dict:
+        """Load the manifest of the previous build.
+
+        Returns:
+            Dict: Previous manifest, or an empty dict if there is none.
+        """
+        try:
+            with open(self.directory / self.MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.error_handler.handle_warning(f"Ignoring unreadable chunk manifest: {e}", "writing chunks")
+            return {}
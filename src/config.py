@@ -12,6 +12,8 @@ import json
 import os
 from typing import Dict, List, Any, Optional, Union
 
+from error_handler import ConfigError
+
 
 class Config:
     """Configuration manager for the uBlock Unified List Generator."""
@@ -31,6 +33,7 @@ class Config:
         self.sources: List[Dict[str, Any]] = []
         self.sections: List[Dict[str, Any]] = []
         self.exclude_patterns: List[str] = []
+        self.variants: List[Dict[str, Any]] = []
         
         self._load_config()
         self._validate_config()
@@ -39,22 +42,30 @@ class Config:
         """Load configuration from the config file."""
         try:
             if not os.path.exists(self.config_path):
-                raise FileNotFoundError(f"Configuration file not found: {self.config_path}")
+                raise ConfigError(f"Configuration file not found: {self.config_path}")
             
             with open(self.config_path, 'r', encoding='utf-8') as f:
                 config = json.load(f)
             
+            # Validate required sections
+            for section in ["metadata", "settings", "sources", "sections"]:
+                if section not in config:
+                    raise ConfigError(f"Missing required section: {section}")
+            
             # Extract config sections
             self.metadata = config.get("metadata", {})
             self.settings = config.get("settings", {})
             self.sources = config.get("sources", [])
             self.sections = config.get("sections", [])
             self.exclude_patterns = config.get("exclude_patterns", [])
+            self.variants = config.get("variants", [])
             
         except json.JSONDecodeError as e:
-            self.error_handler.handle(e, f"Invalid JSON in configuration file: {self.config_path}")
+            self.error_handler.handle_error(e, f"configuration file {self.config_path}")
+            raise ConfigError(f"Invalid JSON in configuration file: {self.config_path}") from e
         except Exception as e:
-            self.error_handler.handle(e, f"Error loading configuration from {self.config_path}")
+            self.error_handler.handle_error(e, f"configuration loading from {self.config_path}")
+            raise
     
     def _validate_config(self) -> None:
         """Validate the loaded configuration."""
@@ -62,17 +73,49 @@ class Config:
         required_metadata = ["title", "description", "author"]
         for field in required_metadata:
             if field not in self.metadata:
-                self.error_handler.warn(f"Missing required metadata field: {field}")
+                self.error_handler.handle_warning(f"Missing required metadata field: {field}", "configuration")
         
         # Validate required settings
         default_settings = {
-            "cache_ttl": 86400,  # 24 hours
+            "cache_ttl": 86400,  # 24 hours, used when a list has no Expires header
+            "min_refresh_interval": 3600,
+            "max_refresh_interval": 604800,
             "max_retries": 3,
             "retry_delay": 5,
             "timeout": 30,
             "user_agent": "uBlock-Unified-List-Generator/1.0",
+            "max_retry_delay": 60,
+            "build_time_budget": 0,  # Seconds, 0 disables the budget
             "parallel_downloads": 5,
-            "output_file": "ublock-unified-list.txt"
+            "output_file": "ublock-unified-list.txt",
+            "optimizer_batch_size": 0,  # Rules per batch substitution pass, 0 is per rule
+            "snapshot_dir": "snapshots",  # Archive used by --record and --replay
+            "content_validation": {  # Checks that keep error pages and truncated bodies out of the cache
+                "enabled": True,
+                "min_size_ratio": 0.5,
+                "max_invalid_ratio": 0.01,
+                "verify_checksum": True
+            },
+            "cache_lock": {  # Lock files that let builds sharing the cache download each source once
+                "timeout": 300,
+                "stale_after": 600
+            },
+            "fetch_history": {  # Per-source timings used to start the longest sources first
+                "enabled": True,
+                "path": "cache/fetch_history.json",
+                "smoothing": 0.3
+            },
+            "circuit_breaker": {
+                "failure_threshold": 3,
+                "reset_timeout": 300
+            },
+            "hedging": {  # Races a slow mirror against the next one, timed by each host's latency history
+                "enabled": True,
+                "percentile": 95,
+                "default_delay": 2.0,
+                "min_delay": 0.2,
+                "min_samples": 5
+            }
         }
         
         # Apply defaults for missing settings
@@ -82,20 +125,47 @@ class Config:
         
         # Validate sources
         if not self.sources:
-            self.error_handler.handle(ValueError("No sources defined in configuration"))
+            raise ConfigError("No sources defined in configuration")
         
         # Validate each source
         for i, source in enumerate(self.sources):
             required_source_fields = ["name", "type", "url", "enabled"]
             for field in required_source_fields:
                 if field not in source:
-                    self.error_handler.handle(
-                        ValueError(f"Missing required field '{field}' in source #{i+1}: {source.get('name', 'Unknown')}")
+                    raise ConfigError(
+                        f"Missing required field '{field}' in source #{i+1}: {source.get('name', 'Unknown')}"
                     )
             
+            mirrors = source.get("mirrors", [])
+            if not isinstance(mirrors, list) or not all(isinstance(url, str) for url in mirrors):
+                raise ConfigError(f"Mirrors of source {source['name']} must be a list of URLs")
+            
             # Add default priority if missing
             if "priority" not in source:
                 source["priority"] = i + 1
+        
+        # Validate build variants against the sources and sections they select
+        source_names = {source["name"] for source in self.sources}
+        section_names = {section["name"] for section in self.sections} | {"Other Filters"}
+        variant_names = set()
+        for i, variant in enumerate(self.variants):
+            for field in ["name", "output_file"]:
+                if field not in variant:
+                    raise ConfigError(
+                        f"Missing required field '{field}' in variant #{i+1}: {variant.get('name', 'Unknown')}"
+                    )
+            if variant["name"] in variant_names:
+                raise ConfigError(f"Duplicate variant name: {variant['name']}")
+            variant_names.add(variant["name"])
+            if variant["output_file"] == self.settings["output_file"]:
+                raise ConfigError(f"Variant {variant['name']} would overwrite the main list")
+            
+            unknown_sources = (set(variant.get("sources", [])) | set(variant.get("exclude_sources", []))) - source_names
+            if unknown_sources:
+                raise ConfigError(f"Unknown sources in variant {variant['name']}: {', '.join(sorted(unknown_sources))}")
+            unknown_sections = set(variant.get("sections", [])) - section_names
+            if unknown_sections:
+                raise ConfigError(f"Unknown sections in variant {variant['name']}: {', '.join(sorted(unknown_sections))}")
     
     def get_enabled_sources(self) -> List[Dict[str, Any]]:
         """
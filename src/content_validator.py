@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Content Validator for uBlock Unified List Generator
+
+This module checks a downloaded body before it is decoded and parsed.
+HTML error and captive-portal pages, binary or mis-encoded payloads,
+bodies without a filter list or hosts file signature, truncated
+downloads and lists failing their own "! Checksum" are rejected, so the
+fetcher falls back to the last good cached copy instead of replacing it.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import base64
+import codecs
+import hashlib
+import re
+from typing import Any, Dict, Mapping, Optional
+
+from error_handler import SourceError
+
+
+# Leading bytes inspected for markup, signatures and encoding
+SAMPLE_SIZE = 64 * 1024
+
+# Signatures of compressed or archived bodies that were not decoded
+BINARY_SIGNATURES = (b"\x1f\x8b", b"PK\x03\x04", b"BZh", b"\xfd7zXZ")
+
+HTML_PATTERN = re.compile(rb"^\s*<(!doctype\s+html|html|head|body|meta|title|script|\?xml)\b", re.IGNORECASE)
+
+ADBLOCK_HEADER_PATTERN = re.compile(r"^\[\s*(adblock|ublock|adguard)", re.IGNORECASE)
+
+HOSTS_LINE_PATTERN = re.compile(r"^(?:(?:\d{1,3}\.){3}\d{1,3}|[0-9a-f:]*:[0-9a-f:]+)\s+\S", re.IGNORECASE)
+
+DOMAIN_LINE_PATTERN = re.compile(r"^[a-z0-9_-]+(?:\.[a-z0-9_-]+)+\.?$", re.IGNORECASE)
+
+CHECKSUM_PATTERN = re.compile(r"^\s*!\s*checksum[\s\-:]+([\w+/=]+).*\n", re.IGNORECASE | re.MULTILINE)
+
+
+class ContentRejectedError(SourceError):
+    """Exception raised when a downloaded body is not a usable list."""
+
+    def __init__(self, message: str, reason: str, retryable: bool = False):
+        """
+        Initialize the rejection.
+
+        Args:
+            message: Why the body was rejected
+            reason: Short rejection code, such as "html" or "shrunk"
+            retryable: Whether another download may succeed, such as after a
+                transient CDN error page or a cut-off transfer
+        """
+        super().__init__(message)
+        self.reason = reason
+        self.retryable = retryable
+
+
+class ContentValidator:
+    """Rejects downloaded bodies that are not plausible filter lists."""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the content validator.
+
+        Args:
+            settings: The content_validation settings block
+        """
+        settings = settings or {}
+        self.enabled = settings.get("enabled", True)
+        # Smallest accepted size as a fraction of the previous download
+        self.min_size_ratio = settings.get("min_size_ratio", 0.5)
+        # Largest accepted share of undecodable characters in the sample
+        self.max_invalid_ratio = settings.get("max_invalid_ratio", 0.01)
+        self.verify_checksum = settings.get("verify_checksum", True)
+
+    def validate(
+        self,
+        body: bytes,
+        source: Dict[str, Any],
+        headers: Optional[Mapping[str, str]] = None,
+        encoding: Optional[str] = None,
+        previous_size: Optional[int] = None
+    ) -> None:
+        """
+        Check a downloaded body before it is parsed.
+
+        Args:
+            body: Raw response body
+            source: Source configuration, "validate": false skips the checks
+            headers: Response headers
+            encoding: Encoding the body will be decoded with
+            previous_size: Size in bytes of the last accepted download, or None
+                to skip the shrink check
+
+        Raises:
+            ContentRejectedError: If the body is not a plausible list
+        """
+        if not self.enabled or not source.get("validate", True):
+            return
+        headers = headers or {}
+
+        if not body.strip():
+            raise ContentRejectedError("Empty body", "empty", retryable=True)
+        self._check_size(body, headers, previous_size)
+
+        sample = body[:SAMPLE_SIZE]
+        if sample.startswith(BINARY_SIGNATURES) or b"\x00" in sample:
+            raise ContentRejectedError("Binary content instead of a text list", "binary")
+        if HTML_PATTERN.match(sample.removeprefix(codecs.BOM_UTF8)):
+            raise ContentRejectedError("HTML page instead of a filter list", "html", retryable=True)
+
+        text = self._decode_sample(sample, encoding)
+        self._check_signature(text, source)
+
+        if self.verify_checksum and b"checksum" in sample.lower():
+            self._check_checksum(body, encoding)
+
+    def _check_size(self, body: bytes, headers: Mapping[str, str], previous_size: Optional[int]) -> None:
+        """
+        Reject bodies shorter than announced or implausibly shrunk.
+
+        Args:
+            body: Raw response body
+            headers: Response headers
+            previous_size: Size in bytes of the last accepted download, if any
+
+        Raises:
+            ContentRejectedError: If the body looks truncated
+        """
+        # Content-Length counts encoded bytes, only comparable when the body was not compressed
+        content_length = headers.get("Content-Length")
+        if content_length and not headers.get("Content-Encoding"):
+            try:
+                expected = int(content_length)
+            except ValueError:
+                expected = 0
+            if len(body) < expected:
+                raise ContentRejectedError(
+                    f"Truncated body: {len(body)} of {expected} bytes", "truncated", retryable=True
+                )
+
+        if previous_size and len(body) < previous_size * self.min_size_ratio:
+            raise ContentRejectedError(
+                f"Body shrank to {len(body)} bytes from {previous_size}, below the "
+                f"{self.min_size_ratio:.0%} minimum", "shrunk"
+            )
+
+    def _decode_sample(self, sample: bytes, encoding: Optional[str]) -> str:
+        """
+        Decode the leading bytes and reject mostly undecodable content.
+
+        Args:
+            sample: Leading bytes of the body
+            encoding: Encoding the body will be decoded with
+
+        Returns:
+            Decoded sample
+
+        Raises:
+            ContentRejectedError: If too much of the sample cannot be decoded
+        """
+        try:
+            decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        except LookupError:
+            raise ContentRejectedError(f"Unknown encoding {encoding}", "encoding")
+        # Not final, a multi-byte character cut at the sample boundary is not an error
+        text = decoder.decode(sample, final=False)
+        if text.count("\ufffd") > max(1, len(text) * self.max_invalid_ratio):
+            raise ContentRejectedError(f"Body is not valid {encoding or 'utf-8'} text", "encoding")
+        return text.lstrip("\ufeff")
+
+    def _check_signature(self, text: str, source: Dict[str, Any]) -> None:
+        """
+        Require a filter list header or hosts file lines at the start of the body.
+
+        Args:
+            text: Decoded leading part of the body
+            source: Source configuration
+
+        Raises:
+            ContentRejectedError: If the body starts like neither
+        """
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("!") or ADBLOCK_HEADER_PATTERN.match(line):
+                return
+            # Hosts files open with a comment or go straight to their entries
+            if source.get("type") == "Hosts File" and (
+                line.startswith("#") or HOSTS_LINE_PATTERN.match(line) or DOMAIN_LINE_PATTERN.match(line)
+            ):
+                return
+            raise ContentRejectedError(f"Missing list signature, body starts with {line[:60]!r}", "signature")
+        raise ContentRejectedError("Body has no content lines", "empty", retryable=True)
+
+    def _check_checksum(self, body: bytes, encoding: Optional[str]) -> None:
+        """
+        Verify the "! Checksum" line of lists that carry one.
+
+        The checksum is the base64 MD5 of the list without the checksum line,
+        with carriage returns removed and blank lines collapsed, as defined
+        by Adblock Plus.
+
+        Args:
+            body: Raw response body
+            encoding: Encoding the body will be decoded with
+
+        Raises:
+            ContentRejectedError: If the checksum does not match
+        """
+        text = body.decode(encoding or "utf-8", errors="replace")
+        match = CHECKSUM_PATTERN.search(text)
+        if match is None:
+            return
+        data = re.sub(r"\n+", "\n", text.replace("\r", ""))
+        data = CHECKSUM_PATTERN.sub("", data, count=1)
+        digest = base64.b64encode(hashlib.md5(data.encode("utf-8")).digest()).decode("ascii").rstrip("=")
+        if digest != match.group(1).rstrip("="):
+            raise ContentRejectedError(
+                "Checksum mismatch, the body is corrupted or truncated", "checksum", retryable=True
+            )
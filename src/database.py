@@ -2,10 +2,15 @@ import sqlite3
 import re
 import os
 
+from scriptlet_canonicalizer import ScriptletCanonicalizer
+
 class UBlockRuleConverter:
     def __init__(self, db_path='ublock_rules_dictionary.db'):
         """Initialize the UBlock Origin Rules Dictionary Database."""
         self.db_path = db_path
+        self.scriptlets = ScriptletCanonicalizer()
+        # Literal segments between the wildcards of each stored pattern
+        self._pattern_segments = {}
         self.create_database()
         self.populate_database()
     
@@ -239,6 +244,14 @@ class UBlockRuleConverter:
     
     def convert_rule(self, rule, source_name):
         """Convert a rule from the specified source to uBlock Origin syntax."""
+        # AdGuard scriptlets take free-form arguments no stored pattern can
+        # match, they are translated through the scriptlet name tables instead
+        if '%#//scriptlet(' in rule:
+            converted = self.scriptlets.convert_adguard(rule)
+            if converted:
+                return converted, "Converted"
+            return None, "Unsupported scriptlet"
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -265,9 +278,7 @@ class UBlockRuleConverter:
         
         # Try to find a matching pattern
         for pattern_id, pattern, ublock_pattern, conversion_function in patterns:
-            # Convert regex pattern to actual regex
-            pattern_regex = self._pattern_to_regex(pattern)
-            if re.match(pattern_regex, rule):
+            if self._pattern_matches(pattern, rule):
                 if conversion_function:
                     # If there's a conversion function defined, we'd call it
                     # Here we're simulating the conversion logic
@@ -278,19 +289,31 @@ class UBlockRuleConverter:
         
         return rule, "No specific conversion rule found, assuming compatibility"
     
-    def _pattern_to_regex(self, pattern):
-        """Convert a pattern to a regular expression for matching."""
-        # Escape special regex characters except * which we'll convert to .*
-        special_chars = '.^$+?()[]{}|\\/'
-        regex = ''
-        for char in pattern:
-            if char == '*':
-                regex += '.*'
-            elif char in special_chars:
-                regex += '\\' + char
-            else:
-                regex += char
-        return '^' + regex + '$'
+    def _pattern_matches(self, pattern, rule):
+        """Check whether a whole rule matches a pattern in which * stands for any text.
+        
+        The literal segments are searched left to right, each at its first
+        occurrence, which finds a match whenever one exists in time linear
+        in the rule length; a regex with one .* per wildcard backtracks and
+        can take polynomial time on long rules.
+        """
+        segments = self._pattern_segments.get(pattern)
+        if segments is None:
+            segments = self._pattern_segments[pattern] = pattern.split('*')
+        if len(segments) == 1:
+            return rule == pattern
+        
+        first, *middle, last = segments
+        end = len(rule) - len(last)
+        if end < len(first) or not rule.startswith(first) or not rule.endswith(last):
+            return False
+        position = len(first)
+        for segment in middle:
+            position = rule.find(segment, position, end)
+            if position < 0:
+                return False
+            position += len(segment)
+        return True
     
     def _apply_conversion(self, rule, conversion_function, pattern, ublock_pattern):
         """Apply a conversion function to transform a rule."""
@@ -303,24 +326,7 @@ class UBlockRuleConverter:
         
         elif conversion_function == 'convert_adguard_scriptlet_to_ublock':
             # Convert AdGuard scriptlet to uBlock scriptlet
-            match = re.search(r'#%#//scriptlet\("([^"]+)", "([^"]+)"\)', rule)
-            if match:
-                scriptlet_name = match.group(1)
-                scriptlet_arg = match.group(2)
-                domain = rule.split('#')[0]
-                
-                # Map AdGuard scriptlet names to uBlock names
-                scriptlet_map = {
-                    'abort-on-property-read': 'aopr',
-                    'abort-on-property-write': 'aopw',
-                    'abort-current-inline-script': 'acis',
-                    'set-constant': 'set',
-                    'json-prune': 'json-prune'
-                }
-                
-                ubo_scriptlet = scriptlet_map.get(scriptlet_name, scriptlet_name)
-                return f"{domain}##+js({ubo_scriptlet}, {scriptlet_arg})"
-            return rule
+            return self.scriptlets.convert_adguard(rule) or rule
         
         elif conversion_function == 'convert_adguard_redirect_to_ublock':
             # Convert AdGuard redirect to uBlock redirect
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Deduplication Benchmark for uBlock Unified List Generator
+
+This module times the deduplication of converted rules and measures the
+memory it adds to the build's peak. Each structure runs in a fresh
+interpreter so peak resident set sizes are comparable: a plain set of
+rule strings as the baseline, and the FingerprintSet the build uses, with
+and without its Bloom filter pre-check, grown from its default capacity
+as the build does.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import time
+from typing import List, Set
+
+from rule_dedup import BloomFilter, FingerprintSet
+
+
+# Structures timed, run in that order
+STRUCTURES = ('set', 'fingerprint', 'bloom')
+
+
+def generate_rules(count: int, unique: int, seed: int) -> List[str]:
+    """
+    Generate a reproducible rule stream with duplicates spread through it.
+
+    Args:
+        count: Number of rules
+        unique: Number of distinct rules among them
+        seed: Random seed
+
+    Returns:
+        Shuffled rules
+    """
+    generator = random.Random(seed)
+    distinct = [
+        f"||ads{i}-{generator.randrange(10 ** 9)}.example{i % 97}.com^$third-party" for i in range(unique)
+    ]
+    rules = distinct + [generator.choice(distinct) for _ in range(count - unique)]
+    generator.shuffle(rules)
+    return rules
+
+
+def deduplicate(rules: List[str], structure: str) -> List[str]:
+    """
+    Deduplicate rules the way the build does with the given structure.
+
+    Args:
+        rules: Rules in arrival order
+        structure: 'set', 'fingerprint' or 'bloom'
+
+    Returns:
+        Unique rules in first-seen order
+    """
+    unique_rules: List[str] = []
+    if structure == 'set':
+        seen: Set[str] = set()
+        for rule in rules:
+            if rule not in seen:
+                unique_rules.append(rule)
+                seen.add(rule)
+    else:
+        bloom = BloomFilter(len(rules)) if structure == 'bloom' else None
+        fingerprints = FingerprintSet(unique_rules.__getitem__, bloom=bloom)
+        for rule in rules:
+            if fingerprints.add(rule, len(unique_rules)):
+                unique_rules.append(rule)
+    return unique_rules
+
+
+def run_structure(args: argparse.Namespace) -> None:
+    """Time one structure in this interpreter and print its result line."""
+    rules = generate_rules(args.rules, args.unique, args.seed)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    unique_rules = deduplicate(rules, args.structure)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"{args.structure:<12}{len(rules) / elapsed / 1e6:>10.2f}M/s{len(unique_rules):>10}"
+        f"{peak / 1024:>12.1f} MiB{(peak - baseline) / 1024:>12.1f} MiB"
+    )
+
+
+def main() -> int:
+    """Command line entry point of the deduplication benchmark."""
+    parser = argparse.ArgumentParser(description="Time rule deduplication and measure its peak memory.")
+    parser.add_argument('--rules', type=int, default=1_500_000, help="number of rules")
+    parser.add_argument('--unique', type=int, default=1_000_000, help="number of distinct rules")
+    parser.add_argument('--seed', type=int, default=1, help="random seed of the rule stream")
+    parser.add_argument('--structure', choices=STRUCTURES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.unique > args.rules:
+        parser.error("--unique cannot exceed --rules")
+
+    if args.structure:
+        run_structure(args)
+        return 0
+
+    print(f"{'structure':<12}{'rules/s':>12}{'unique':>10}{'peak RSS':>16}{'added':>16}")
+    sys.stdout.flush()
+    for structure in STRUCTURES:
+        # A fresh interpreter per structure, the peak never goes down
+        subprocess.run([
+            sys.executable, __file__, '--structure', structure, '--rules', str(args.rules),
+            '--unique', str(args.unique), '--seed', str(args.seed)
+        ], check=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
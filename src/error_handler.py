@@ -1,5 +1,7 @@
-from typing import Any, Callable, Optional, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
 from functools import wraps
+import random
+import threading
 import traceback
 from logger import UnifiedLogger
 
@@ -22,15 +24,21 @@ class ConfigError(UnifiedError):
 class ErrorHandler:
     """Error handling utility for uBlock Unified List Generator."""
     
-    def __init__(self, logger: UnifiedLogger):
+    def __init__(self, logger: UnifiedLogger, sample_size: int = 3):
         """Initialize the error handler.
         
         Args:
             logger (UnifiedLogger): Logger instance for error reporting.
+            sample_size (int): Examples kept per diagnostic category and source.
         """
         self.logger = logger
+        self.sample_size = sample_size
         self._error_count = 0
         self._warning_count = 0
+        # (category, source) -> [count, sampled examples]
+        self._diagnostics: Dict[Tuple[str, str], List] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
     
     @property
     def error_count(self) -> int:
@@ -67,18 +75,64 @@ class ErrorHandler:
         self._warning_count += 1
         self.logger.warning(f"Warning in {context}: {message}")
     
+    def record_diagnostic(self, category: str, source: str = "", example: Optional[str] = None) -> None:
+        """Count a per-rule problem without logging it.
+        
+        Problems are aggregated by category and source and logged once by
+        report_diagnostics, with a few examples kept by reservoir sampling.
+        Callers should pass a fixed category string and the raw example, so
+        nothing is formatted for the common case of a discarded example.
+        
+        Args:
+            category (str): Fixed description of the problem.
+            source (str): Name of the source the rule came from.
+            example (Optional[str]): Offending rule or value.
+        """
+        with self._lock:
+            self._warning_count += 1
+            entry = self._diagnostics.get((category, source))
+            if entry is None:
+                entry = self._diagnostics[(category, source)] = [0, []]
+            entry[0] += 1
+            if example is None:
+                return
+            samples = entry[1]
+            if len(samples) < self.sample_size:
+                samples.append(example)
+            else:
+                slot = self._random.randrange(entry[0])
+                if slot < self.sample_size:
+                    samples[slot] = example
+    
+    def report_diagnostics(self) -> None:
+        """Log one summary line per diagnostic category and source."""
+        with self._lock:
+            diagnostics = sorted(self._diagnostics.items(), key=lambda item: -item[1][0])
+        
+        for (category, source), (count, samples) in diagnostics:
+            examples = ", ".join(repr(sample) for sample in samples)
+            self.logger.warning(
+                "%s%s: %d rules (e.g. %s)", category, f" [{source}]" if source else "", count, examples
+            )
+    
     @staticmethod
     def retry_on_error(
         max_retries: int = 3,
         retry_exceptions: tuple = (Exception,),
-        delay: int = 1
+        delay: float = 1,
+        max_delay: float = 60
     ) -> Callable:
         """Decorator to retry a function on specified exceptions.
         
+        The delay doubles after every failed attempt and is jittered so that
+        concurrent callers do not retry in lockstep. This blocks the calling
+        thread; fetch jobs should go through RetryScheduler instead.
+        
         Args:
-            max_retries (int): Maximum number of retry attempts.
+            max_retries (int): Maximum number of attempts.
             retry_exceptions (tuple): Tuple of exceptions to retry on.
-            delay (int): Delay between retries in seconds.
+            delay (float): Delay after the first failed attempt in seconds.
+            max_delay (float): Upper bound for a single delay in seconds.
         
         Returns:
             Callable: Decorated function with retry logic.
@@ -96,12 +150,15 @@ class ErrorHandler:
                         attempts += 1
                         if attempts == max_retries:
                             raise
-                        time.sleep(delay)
+                        backoff = min(max_delay, delay * (2 ** (attempts - 1)))
+                        time.sleep(backoff / 2 + random.uniform(0, backoff / 2))
                 return None
             return wrapper
         return decorator
     
     def reset_counts(self) -> None:
-        """Reset error and warning counters."""
-        self._error_count = 0
-        self._warning_count = 0
\ No newline at end of file
+        """Reset error and warning counters and aggregated diagnostics."""
+        with self._lock:
+            self._error_count = 0
+            self._warning_count = 0
+            self._diagnostics.clear()
\ No newline at end of file
@@ -0,0 +1,302 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from logger import UnifiedLogger
+from error_handler import ErrorHandler
+from rule_canonicalizer import RuleCanonicalizer
+
+
+# Request types, party and domain scope of a filter: (types or None for all
+# types, '1p', '3p' or None for both, positive domain entries or None for all)
+Scope = Tuple[Optional[FrozenSet[str]], Optional[str], Optional[FrozenSet[str]]]
+
+
+class _HostNode:
+    """Node of the exception trie, keyed by reversed hostname labels."""
+
+    __slots__ = ('children', 'exceptions', 'blocked')
+
+    def __init__(self):
+        self.children: Dict[str, '_HostNode'] = {}
+        # (scope, rule) of the exceptions anchored at this hostname
+        self.exceptions: List[Tuple[Scope, str]] = []
+        # Whether a block rule targets this hostname
+        self.blocked = False
+
+
+class ExceptionPruner:
+    """Drops block rules that an exception in the list always overrides.
+
+    ``||tracker.com^$script`` is dead weight next to ``@@||tracker.com^``:
+    uBO matches both on every request to the host and the exception always
+    wins. Host-anchored exceptions are indexed in a trie of reversed labels,
+    so a block rule finds the exceptions of its hostname and every parent in
+    one walk, then the exception must cover the rule's request types, party
+    and ``domain=`` list. Only options with a known scope are compared; rules
+    with any other option, such as ``important`` or ``redirect``, are kept.
+    """
+
+    # Request type options an exception can cover a block rule on
+    TYPE_OPTIONS = frozenset({
+        'css', 'font', 'frame', 'image', 'media', 'object', 'other', 'ping', 'script', 'websocket', 'xhr'
+    })
+
+    PARTY_OPTIONS = frozenset({'1p', '3p'})
+
+    # Options that only narrow a block rule
+    NARROWING_OPTIONS = frozenset({'match-case'})
+
+    HOST_END = '^/*|$?:'
+
+    def __init__(self, logger: UnifiedLogger, error_handler: ErrorHandler, settings: Optional[Dict] = None):
+        """Initialize the exception pruner.
+
+        Args:
+            logger (UnifiedLogger): Logger instance for pruning reporting.
+            error_handler (ErrorHandler): Error handler for report errors.
+            settings (Optional[Dict]): The ``exception_pruning`` settings block.
+        """
+        self.logger = logger
+        self.error_handler = error_handler
+        self.settings = settings or {}
+
+        self.hosts = _HostNode()
+        # Exceptions that are not host-anchored, by exact pattern
+        self.patterns: Dict[str, List[Tuple[Scope, str]]] = {}
+
+    def resolve(
+        self,
+        read_rules: Callable[[], Iterable[Tuple[str, str]]],
+        build_time: Optional[datetime] = None
+    ) -> Set[str]:
+        """Find the block rules exceptions always override, and write the report.
+
+        Args:
+            read_rules (Callable[[], Iterable[Tuple[str, str]]]): Returns a fresh
+                iterable of (rule, source name) pairs; it is read twice.
+            build_time (Optional[datetime]): UTC time stamped in the report, now if omitted.
+
+        Returns:
+            Set[str]: Block rules to remove from the list.
+        """
+        self.hosts = _HostNode()
+        self.patterns = {}
+        exceptions: Dict[str, str] = {}
+        for rule, source in read_rules():
+            if rule.startswith('@@') and self.add_exception(rule):
+                exceptions[rule] = source
+
+        if not exceptions:
+            return set()
+
+        removed: Set[str] = set()
+        removed_rules: List[Dict] = []
+        related: Set[str] = set()
+        for rule, source in read_rules():
+            if rule.startswith('@@'):
+                continue
+            exception = self.match(rule, related)
+            if exception is not None:
+                removed.add(rule)
+                removed_rules.append({
+                    'rule': rule, 'source': source,
+                    'exception': exception, 'exception_source': exceptions[exception]
+                })
+
+        related.update(self._blocked_descendants(self.hosts, False))
+        unused = sorted(rule for rule in exceptions if rule not in related)
+
+        self._write_report({
+            'generated': (build_time or datetime.utcnow()).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'exceptions': len(exceptions),
+            'removed_rules': removed_rules,
+            'unused_exceptions': [{'rule': rule, 'source': exceptions[rule]} for rule in unused]
+        })
+
+        self.logger.info(
+            f"Removed {len(removed)} block rules overridden by {len(exceptions)} indexed exceptions, "
+            f"{len(unused)} exceptions match no block rule"
+        )
+        return removed
+
+    def add_exception(self, rule: str) -> bool:
+        """Index an exception rule.
+
+        Args:
+            rule (str): Canonical exception rule, with its '@@' prefix.
+
+        Returns:
+            bool: True if the exception has a scope that can be compared.
+        """
+        pattern, options = RuleCanonicalizer.split_options(rule[2:])
+        if '#' in pattern and any(separator in rule for separator in RuleCanonicalizer.COSMETIC_SEPARATORS):
+            return False
+        scope = self._parse_scope(options, exception=True)
+        if scope is None:
+            return False
+
+        host, rest = self._split_host(pattern)
+        if host is not None and rest in ('', '^'):
+            node = self.hosts
+            for label in reversed(host.split('.')):
+                node = node.children.setdefault(label, _HostNode())
+            node.exceptions.append((scope, rule))
+        else:
+            self.patterns.setdefault(pattern, []).append((scope, rule))
+        return True
+
+    def match(self, rule: str, related: Optional[Set[str]] = None) -> Optional[str]:
+        """Find an exception that always overrides a block rule.
+
+        Args:
+            rule (str): Canonical block rule.
+            related (Optional[Set[str]]): Collects the exceptions sharing a
+                hostname or pattern with the rule, whether or not they cover it.
+
+        Returns:
+            Optional[str]: Covering exception, or None.
+        """
+        if rule.startswith(('0.0.0.0 ', '127.0.0.1 ')):
+            host, rest, options = rule.split(None, 1)[1].strip(), '^', None
+            candidates: List[Tuple[Scope, str]] = []
+        else:
+            if '#' in rule and any(separator in rule for separator in RuleCanonicalizer.COSMETIC_SEPARATORS):
+                return None
+            pattern, options = RuleCanonicalizer.split_options(rule)
+            host, rest = self._split_host(pattern)
+            candidates = list(self.patterns.get(pattern, ()))
+
+        # Without a separator the rule also matches longer hostnames
+        if host is not None and rest and rest[0] in '^/':
+            node = self.hosts
+            for label in reversed(host.split('.')):
+                node = node.children.get(label)
+                if node is None:
+                    break
+                candidates.extend(node.exceptions)
+            else:
+                node.blocked = True
+
+        if not candidates:
+            return None
+        if related is not None:
+            related.update(exception for _, exception in candidates)
+        return self._covering(candidates, options)
+
+    def _covering(self, candidates: List[Tuple[Scope, str]], options: Optional[str]) -> Optional[str]:
+        """Pick the first exception whose scope covers a block rule's.
+
+        Args:
+            candidates (List[Tuple[Scope, str]]): Exceptions matching the rule's pattern.
+            options (Optional[str]): Options of the block rule.
+
+        Returns:
+            Optional[str]: Covering exception, or None.
+        """
+        scope = self._parse_scope(options, exception=False)
+        if scope is None:
+            return None
+        types, party, domains = scope
+        for (exception_types, exception_party, exception_domains), exception in candidates:
+            if exception_types is not None and (types is None or not types <= exception_types):
+                continue
+            if exception_party is not None and exception_party != party:
+                continue
+            if exception_domains is not None and not (domains and all(
+                any(domain == entry or domain.endswith('.' + entry) for entry in exception_domains)
+                for domain in domains
+            )):
+                continue
+            return exception
+        return None
+
+    def _parse_scope(self, options: Optional[str], exception: bool) -> Optional[Scope]:
+        """Parse the options of a filter into the scope it applies to.
+
+        Args:
+            options (Optional[str]): Canonical options string, or None.
+            exception (bool): Whether the filter is an exception.
+
+        Returns:
+            Optional[Scope]: Scope of the filter, or None if it has options whose
+                effect cannot be compared.
+        """
+        if options is None:
+            return None, None, None
+
+        types = set()
+        party = None
+        domains = None
+        for option in options.split(','):
+            if option in self.TYPE_OPTIONS:
+                types.add(option)
+            elif option in self.PARTY_OPTIONS:
+                party = option
+            elif option.startswith('domain='):
+                entries = option[len('domain='):].split('|')
+                negated = [entry for entry in entries if entry.startswith('~')]
+                # Negated entries only narrow a block rule, an exception limited
+                # by them cannot be proven to cover anything
+                if negated and exception:
+                    return None
+                domains = frozenset(entry for entry in entries if not entry.startswith('~'))
+            elif option in self.NARROWING_OPTIONS and not exception:
+                continue
+            else:
+                return None
+        return frozenset(types) if types else None, party, domains
+
+    def _split_host(self, pattern: str) -> Tuple[Optional[str], str]:
+        """Split a host-anchored pattern into its hostname and remainder.
+
+        Args:
+            pattern (str): Network filter pattern.
+
+        Returns:
+            Tuple[Optional[str], str]: Hostname, or None if the pattern is not
+                anchored to a plain hostname, and the rest of the pattern.
+        """
+        if not pattern.startswith('||'):
+            return None, pattern
+        end = 2
+        while end < len(pattern) and pattern[end] not in self.HOST_END:
+            end += 1
+        host = pattern[2:end]
+        if '.' not in host or host.startswith('.') or host.endswith('.'):
+            return None, pattern
+        return host, pattern[end:]
+
+    def _blocked_descendants(self, node: _HostNode, blocked: bool) -> Iterator[str]:
+        """Yield the exceptions at or below a hostname targeted by a block rule.
+
+        Args:
+            node (_HostNode): Trie node to start from.
+            blocked (bool): Whether a parent hostname is targeted by a block rule.
+
+        Yields:
+            str: Exceptions that carve an exception out of a block rule.
+        """
+        stack = [(node, blocked)]
+        while stack:
+            node, blocked = stack.pop()
+            blocked = blocked or node.blocked
+            if blocked:
+                for _, exception in node.exceptions:
+                    yield exception
+            stack.extend((child, blocked) for child in node.children.values())
+
+    def _write_report(self, report: Dict) -> None:
+        """Write the exception coverage report to the configured path.
+
+        Args:
+            report (Dict): Report data to serialize.
+        """
+        report_path = Path(self.settings.get('report_file', 'reports/exception_coverage.json'))
+        try:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            self.error_handler.handle_error(e, "writing exception coverage report")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Fetch History for uBlock Unified List Generator
+
+This module keeps a small JSON store of per-source fetch latency, size
+and conversion time across runs, smoothed with an exponentially weighted
+moving average, and recent response latencies per host. The source
+fetcher uses it to start the longest sources first (longest-processing-
+time scheduling over the download slots), to estimate the makespan of
+the fetch and conversion phase, and to time hedged requests to mirrors.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import heapq
+import json
+import math
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class FetchHistory:
+    """Smoothed per-source timings persisted between runs."""
+
+    def __init__(self, path: str, smoothing: float = 0.3, latency_samples: int = 50):
+        """
+        Initialize the fetch history.
+
+        Args:
+            path: Path of the JSON history file
+            smoothing: Weight of the newest sample in the moving averages, in (0, 1]
+            latency_samples: Number of recent response latencies kept per host
+        """
+        self.path = path
+        self.smoothing = min(1.0, max(0.01, smoothing))
+        self.latency_samples = max(1, latency_samples)
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self.latencies: Dict[str, List[float]] = {}
+        self.last_run: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """
+        Load the history file, starting empty if it is missing or unreadable.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.sources = data.get("sources", {})
+        self.latencies = data.get("latencies", {})
+        self.last_run = data.get("last_run", {})
+
+    def save(self) -> None:
+        """
+        Atomically write the history file.
+        """
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = json.dumps(
+                {"sources": self.sources, "latencies": self.latencies, "last_run": self.last_run},
+                indent=2, sort_keys=True
+            )
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def record(self, source_name: str, **samples: float) -> None:
+        """
+        Fold new samples into a source's moving averages.
+
+        Args:
+            source_name: Name of the source
+            samples: Measured values such as fetch_seconds, size_bytes or convert_seconds
+        """
+        with self._lock:
+            entry = self.sources.setdefault(source_name, {})
+            for key, value in samples.items():
+                previous = entry.get(key)
+                entry[key] = value if previous is None else previous + self.smoothing * (value - previous)
+            entry["updated"] = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def record_latency(self, host: str, seconds: float) -> None:
+        """
+        Keep a response latency sample of a host, dropping the oldest beyond the limit.
+
+        Args:
+            host: Host that answered
+            seconds: Time from sending the request to receiving the response headers
+        """
+        with self._lock:
+            samples = self.latencies.setdefault(host, [])
+            samples.append(round(seconds, 4))
+            del samples[:-self.latency_samples]
+
+    def latency_percentile(self, host: str, percentile: float, min_samples: int = 5) -> Optional[float]:
+        """
+        Get a percentile of a host's recent response latencies.
+
+        Args:
+            host: Host to look up
+            percentile: Percentile in (0, 100]
+            min_samples: Fewest samples a percentile is computed from
+
+        Returns:
+            Latency in seconds by the nearest-rank method, or None with too few samples
+        """
+        with self._lock:
+            samples = sorted(self.latencies.get(host, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        rank = math.ceil(min(100.0, max(0.0, percentile)) / 100 * len(samples))
+        return samples[max(0, rank - 1)]
+
+    def estimate(self, source_name: str, fetch: bool = True) -> Optional[Tuple[float, float]]:
+        """
+        Estimate how long a source takes to fetch and to convert.
+
+        Args:
+            source_name: Name of the source
+            fetch: False when the source will be served from a valid cache
+
+        Returns:
+            Tuple of (fetch seconds, conversion seconds), or None for a source
+            without history
+        """
+        entry = self.sources.get(source_name)
+        if not entry or "convert_seconds" not in entry:
+            return None
+        fetch_seconds = entry.get("fetch_seconds", 0.0) if fetch else 0.0
+        return fetch_seconds, entry["convert_seconds"]
+
+    def schedule(
+        self,
+        source_names: Iterable[str],
+        slots: int,
+        cached: Iterable[str] = ()
+    ) -> Tuple[List[str], Optional[float]]:
+        """
+        Order sources longest first and estimate the makespan of the order.
+
+        Each source holds a download slot while it is fetched, then is
+        converted on the build thread as soon as its bytes arrive. Sources
+        without history get the longest known estimate, so they start early
+        instead of becoming the tail of the build.
+
+        Args:
+            source_names: Sources to schedule, in configuration order
+            slots: Number of parallel downloads
+            cached: Sources that will be served from a valid cache
+
+        Returns:
+            Tuple of (source names in submission order, estimated makespan in
+            seconds or None when no source has history yet)
+        """
+        cached = set(cached)
+        names = list(source_names)
+        known = {name: self.estimate(name, name not in cached) for name in names}
+        if all(estimate is None for estimate in known.values()):
+            return names, None
+        longest = max(
+            (sum(estimate) for estimate in known.values() if estimate is not None), default=0.0
+        )
+        estimates = {
+            name: estimate if estimate is not None else (longest, 0.0)
+            for name, estimate in known.items()
+        }
+
+        # Stable sort keeps configuration order between equal estimates
+        order = sorted(names, key=lambda name: -sum(estimates[name]))
+        return order, self.makespan(order, estimates, slots)
+
+    @staticmethod
+    def makespan(order: List[str], estimates: Dict[str, Tuple[float, float]], slots: int) -> float:
+        """
+        Simulate fetching on the download slots and converting on one thread.
+
+        Args:
+            order: Source names in submission order
+            estimates: Mapping of source name to (fetch seconds, conversion seconds)
+            slots: Number of parallel downloads
+
+        Returns:
+            Estimated seconds until the last source is converted
+        """
+        free_at = [0.0] * max(1, slots)
+        arrivals = []
+        for name in order:
+            fetch_seconds, convert_seconds = estimates[name]
+            start = heapq.heappop(free_at)
+            heapq.heappush(free_at, start + fetch_seconds)
+            arrivals.append((start + fetch_seconds, convert_seconds))
+
+        finished = 0.0
+        for arrival, convert_seconds in sorted(arrivals):
+            finished = max(finished, arrival) + convert_seconds
+        return finished
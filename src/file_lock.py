@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+File Lock for uBlock Unified List Generator
+
+This module provides lock files that let builds sharing a cache directory
+take turns on a cache entry, so a build waits for a download another build
+has in flight instead of repeating it. Locks are created atomically with
+O_EXCL and record their owner; a lock whose owner died or that outlived
+its time limit is taken over. Cache writes are atomic on their own, so a
+lock only ever saves duplicate work and waiting never blocks a build for
+longer than its timeout.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+
+class FileLock:
+    """Inter-process lock held through an exclusively created file."""
+
+    def __init__(self, path: str, timeout: float = 300, stale_after: float = 600, poll_interval: float = 0.2):
+        """
+        Initialize the lock.
+
+        Args:
+            path: Path of the lock file
+            timeout: Seconds to wait for the lock before giving up
+            stale_after: Age in seconds after which a held lock is taken over
+            poll_interval: Seconds between attempts while waiting
+        """
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.token: Optional[str] = None
+
+    @property
+    def acquired(self) -> bool:
+        """Whether this instance currently holds the lock."""
+        return self.token is not None
+
+    def acquire(self) -> bool:
+        """
+        Wait for the lock, taking over stale locks along the way.
+
+        Returns:
+            True if the lock was acquired, False if the timeout passed first
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            token = uuid.uuid4().hex
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if self._break_stale():
+                    continue
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(self.poll_interval)
+                continue
+
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"pid": os.getpid(), "host": socket.gethostname(), "created": time.time(),
+                           "token": token}, f)
+            self.token = token
+            return True
+
+    def release(self) -> None:
+        """
+        Release the lock if this instance still owns it.
+        """
+        if self.token is None:
+            return
+        # A lock taken over as stale belongs to someone else now
+        owner = self._read_owner(self.path)
+        if owner is not None and owner.get("token") == self.token:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        self.token = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+    def _break_stale(self) -> bool:
+        """
+        Remove the lock file if its owner is gone or it has been held too long.
+
+        Returns:
+            True if a stale lock was removed
+        """
+        owner = self._read_owner(self.path)
+        if owner is None:
+            try:
+                age = time.time() - os.path.getmtime(self.path)
+            except FileNotFoundError:
+                return True
+            # An owner that has not written its details yet is just starting
+            if age < self.stale_after:
+                return False
+        elif not self._is_stale(owner):
+            return False
+
+        # Renaming is atomic, so only one waiter takes the lock over
+        stale_path = f"{self.path}.{uuid.uuid4().hex}.stale"
+        try:
+            os.rename(self.path, stale_path)
+        except FileNotFoundError:
+            return True
+        if self._read_owner(stale_path) != owner:
+            # The lock changed hands between the check and the rename, put it back
+            try:
+                os.link(stale_path, self.path)
+            except FileExistsError:
+                pass
+        os.unlink(stale_path)
+        return True
+
+    def _is_stale(self, owner: Dict[str, Any]) -> bool:
+        """
+        Decide whether a lock's owner has given it up.
+
+        Args:
+            owner: Owner details read from the lock file
+
+        Returns:
+            True if the lock outlived its time limit or its owner process died
+        """
+        if time.time() - owner.get("created", 0) >= self.stale_after:
+            return True
+        # Signal 0 probes a process on POSIX; elsewhere only the age counts
+        if os.name != "posix" or owner.get("host") != socket.gethostname():
+            return False
+        try:
+            pid = int(owner.get("pid", 0))
+            if pid <= 0:
+                return False
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except (PermissionError, ValueError, OverflowError):
+            return False
+        return False
+
+    @staticmethod
+    def _read_owner(path: str) -> Optional[Dict[str, Any]]:
+        """
+        Read the owner details of a lock file.
+
+        Args:
+            path: Path of the lock file
+
+        Returns:
+            Owner details, or None if the file is missing or not written yet
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                owner = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return owner if isinstance(owner, dict) else None
@@ -0,0 +1,107 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from logger import UnifiedLogger
+from error_handler import ErrorHandler
+
+
+class InputGuard:
+    """Quarantines rules too long or too costly to convert.
+
+    A single huge line or a crafted rule can stall the conversion loop, and
+    every rule it yields still has to go through the optimizer and the
+    post-merge stages. Lines longer than the length cap are set aside
+    before any work is done on them, and rules whose conversion used more
+    CPU time than the per-rule budget are set aside once converted. Both
+    are left out of the list and listed in the quarantine report.
+    """
+
+    # Diagnostic category of each quarantine reason
+    REASONS = {
+        'length': 'Rule quarantined: longer than the line length cap',
+        'cpu': 'Rule quarantined: over the per-rule CPU budget'
+    }
+
+    # Characters of a quarantined rule kept in the report and diagnostics
+    EXAMPLE_LENGTH = 100
+
+    def __init__(self, logger: UnifiedLogger, error_handler: ErrorHandler, settings: Optional[Dict] = None):
+        """Initialize the input guard.
+
+        Args:
+            logger (UnifiedLogger): Logger instance for quarantine reporting.
+            error_handler (ErrorHandler): Error handler for report errors.
+            settings (Optional[Dict]): The ``input_guard`` settings block.
+        """
+        self.logger = logger
+        self.error_handler = error_handler
+        self.settings = settings or {}
+        # Longest line converted, 0 for no cap; sources may set their own
+        self.max_line_length = self.settings.get('max_line_length', 32768)
+        # CPU time one rule's conversion may use, 0 for no budget
+        self.max_rule_seconds = self.settings.get('max_rule_ms', 50) / 1000
+
+        self.counts: Dict[str, int] = dict.fromkeys(self.REASONS, 0)
+        self.quarantined: List[Dict] = []
+
+    @property
+    def total(self) -> int:
+        """Number of rules quarantined so far."""
+        return sum(self.counts.values())
+
+    def line_limit(self, source: Dict) -> int:
+        """Get the line length cap of a source.
+
+        Args:
+            source (Dict): Source configuration, whose ``max_line_length``
+                overrides the setting.
+
+        Returns:
+            int: Longest line converted, 0 for no cap.
+        """
+        return source.get('max_line_length', self.max_line_length)
+
+    def quarantine(self, rule: str, source: str, reason: str, cpu_seconds: Optional[float] = None) -> None:
+        """Set a rule aside and count it.
+
+        Args:
+            rule (str): Raw rule as read from the source.
+            source (str): Name of the source the rule came from.
+            reason (str): 'length' or 'cpu'.
+            cpu_seconds (Optional[float]): CPU time the rule's conversion used.
+        """
+        self.counts[reason] += 1
+        example = rule[:self.EXAMPLE_LENGTH]
+        self.error_handler.record_diagnostic(self.REASONS[reason], source, example)
+        entry = {'rule': example, 'length': len(rule), 'source': source, 'reason': reason}
+        if cpu_seconds is not None:
+            entry['cpu_ms'] = round(cpu_seconds * 1000, 3)
+        self.quarantined.append(entry)
+
+    def write_report(self, build_time: Optional[datetime] = None) -> None:
+        """Write the quarantined rules and their counts to the configured path.
+
+        Args:
+            build_time (Optional[datetime]): UTC time stamped in the report, now if omitted.
+        """
+        if self.total:
+            self.logger.info(
+                f"Quarantined {self.total} rules: {self.counts['length']} over the line length cap, "
+                f"{self.counts['cpu']} over the CPU budget"
+            )
+
+        report_path = Path(self.settings.get('report_file', 'reports/quarantine.json'))
+        try:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'generated': (build_time or datetime.utcnow()).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'max_line_length': self.max_line_length,
+                    'max_rule_ms': self.max_rule_seconds * 1000,
+                    'counts': self.counts,
+                    'rules': self.quarantined
+                }, f, indent=2)
+        except OSError as e:
+            self.error_handler.handle_error(e, "writing quarantine report")
@@ -0,0 +1,186 @@
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from logger import UnifiedLogger
+from error_handler import ErrorHandler, ConfigError
+
+
+class ListExporter:
+    """Exports the DNS-safe part of the unified list to DNS blocker formats.
+
+    Only plain hostname blocks (``||host^`` and hosts file entries) can be
+    expressed at DNS level. Rules with path, wildcard or narrowing options
+    would overblock and are left out, as are hosts covered by an exception.
+    """
+
+    # Options that do not narrow what a hostname block matches
+    DNS_SAFE_OPTIONS = frozenset({'', 'all', 'important'})
+
+    # Hosts file entries that must never be blocked
+    RESERVED_HOSTS = frozenset({
+        'localhost', 'localhost.localdomain', 'local', 'broadcasthost',
+        'ip6-localhost', 'ip6-loopback', '0.0.0.0'
+    })
+
+    # Formats whose entries also block every subdomain
+    SUBDOMAIN_FORMATS = frozenset({'dnsmasq', 'unbound', 'adguard_home'})
+
+    FORMATS = ('hosts', 'dnsmasq', 'unbound', 'adguard_home')
+
+    def __init__(self, logger: UnifiedLogger, error_handler: ErrorHandler, metadata: Dict[str, str]):
+        """Initialize the list exporter.
+
+        Args:
+            logger (UnifiedLogger): Logger instance for export reporting.
+            error_handler (ErrorHandler): Error handler for export errors.
+            metadata (Dict[str, str]): List metadata used in export headers.
+        """
+        self.logger = logger
+        self.error_handler = error_handler
+        self.metadata = metadata
+        self.patterns = {
+            'hostname': re.compile(r'^(?=.{1,253}$)[a-z0-9_]([a-z0-9_-]*[a-z0-9_])?(\.[a-z0-9_]([a-z0-9_-]*[a-z0-9_])?)+$'),
+            'hosts_entry': re.compile(r'^(?:0\.0\.0\.0|127\.0\.0\.1)\s+(\S+)\s*(?:#.*)?$'),
+            'ip_address': re.compile(r'^[0-9.]+$')
+        }
+
+    def collect_domains(self, rules: List[str]) -> Tuple[Set[str], Set[str]]:
+        """Collect the hostnames that can be blocked or allowed at DNS level.
+
+        Args:
+            rules (List[str]): Optimized rules of the unified list.
+
+        Returns:
+            Tuple[Set[str], Set[str]]: Blocked hostnames and allowed hostnames.
+        """
+        blocked: Set[str] = set()
+        allowed: Set[str] = set()
+
+        for rule in rules:
+            target = blocked
+            if rule.startswith('@@'):
+                target, rule = allowed, rule[2:]
+
+            if rule.startswith('||'):
+                host, _, options = rule[2:].partition('$')
+                if not host.endswith('^') or any(
+                    option.strip() not in self.DNS_SAFE_OPTIONS for option in options.split(',')
+                ):
+                    continue
+                host = host[:-1]
+            elif target is blocked and (match := self.patterns['hosts_entry'].match(rule)):
+                host = match.group(1)
+            else:
+                continue
+
+            host = host.lower()
+            if (
+                host not in self.RESERVED_HOSTS
+                and self.patterns['hostname'].match(host)
+                and not self.patterns['ip_address'].match(host)
+            ):
+                target.add(host)
+
+        return blocked, allowed
+
+    def filter_domains(self, blocked: Set[str], allowed: Set[str], export_format: str) -> List[str]:
+        """Select the blocked hostnames an export format can safely express.
+
+        Args:
+            blocked (Set[str]): Blocked hostnames.
+            allowed (Set[str]): Hostnames allowed by exception rules.
+            export_format (str): Target export format.
+
+        Returns:
+            List[str]: Sorted hostnames to write.
+        """
+        subdomains = export_format in self.SUBDOMAIN_FORMATS
+        # Hosts with an allowed subdomain cannot be blocked as a whole zone
+        allowed_parents: Set[str] = set()
+        if subdomains and export_format != 'adguard_home':
+            for host in allowed:
+                labels = host.split('.')
+                allowed_parents.update('.'.join(labels[i:]) for i in range(1, len(labels) - 1))
+
+        selected = []
+        for host in blocked:
+            labels = host.split('.')
+            parents = ['.'.join(labels[i:]) for i in range(1, len(labels) - 1)]
+            # An exception on the host or a parent overrides the block in uBO
+            if host in allowed or any(parent in allowed for parent in parents):
+                continue
+            if host in allowed_parents:
+                continue
+            # Zone-based formats already cover hosts under a blocked parent
+            if subdomains and any(parent in blocked for parent in parents):
+                continue
+            selected.append(host)
+
+        selected.sort(key=lambda host: host.split('.')[::-1])
+        return selected
+
+    def export(
+        self,
+        domains: Tuple[Set[str], Set[str]],
+        export_settings: Dict,
+        build_time: Optional[datetime] = None
+    ) -> None:
+        """Write one export file.
+
+        Args:
+            domains (Tuple[Set[str], Set[str]]): Blocked and allowed hostnames.
+            export_settings (Dict): Export configuration with format and output_file.
+            build_time (Optional[datetime]): UTC time stamped in the header, now if omitted.
+
+        Raises:
+            ConfigError: If the export format is not supported.
+        """
+        export_format = export_settings.get('format', '')
+        if export_format not in self.FORMATS:
+            raise ConfigError(f"Unsupported export format: {export_format}")
+
+        blocked, allowed = domains
+        hosts = self.filter_domains(blocked, allowed, export_format)
+        lines = self._generate_header(export_format, len(hosts), build_time or datetime.utcnow())
+
+        if export_format == 'hosts':
+            lines.extend(f"0.0.0.0 {host}" for host in hosts)
+        elif export_format == 'dnsmasq':
+            lines.extend(f"local=/{host}/" for host in hosts)
+        elif export_format == 'unbound':
+            lines.extend(f'local-zone: "{host}." always_nxdomain' for host in hosts)
+        else:
+            lines.extend(f"||{host}^" for host in hosts)
+            lines.extend(f"@@||{host}^" for host in sorted(allowed, key=lambda host: host.split('.')[::-1]))
+
+        output_path = Path(export_settings['output_file'])
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write('\n'.join(lines))
+            f.write('\n')
+
+        self.logger.info(f"Exported {len(hosts)} {export_format} entries to {output_path}")
+
+    def _generate_header(self, export_format: str, entry_count: int, build_time: datetime) -> List[str]:
+        """Generate the header comment lines of an export.
+
+        Args:
+            export_format (str): Target export format.
+            entry_count (int): Number of entries in the export.
+            build_time (datetime): UTC time of the build.
+
+        Returns:
+            List[str]: Header lines.
+        """
+        comment = '!' if export_format == 'adguard_home' else '#'
+        update_time = build_time.strftime('%Y-%m-%d:%H:%M')
+        return [
+            f"{comment} Title: {self.metadata.get('title', '')} ({export_format})",
+            f"{comment} Description: {self.metadata.get('description', '')}",
+            f"{comment} Homepage: {self.metadata.get('homepage', '')}",
+            f"{comment} Last Updated: {update_time}",
+            f"{comment} Total Entries: {entry_count}",
+            comment
+        ]
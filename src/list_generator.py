@@ -1,90 +1,106 @@
-from typing import Dict, List, Optional, Set
-import concurrent.futures
-import json
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
-import requests
-from datetime import datetime
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import groupby
+from operator import itemgetter
+from array import array
+import gc
+import time
 
 from logger import UnifiedLogger
-from error_handler import ErrorHandler, SourceError, ConfigError
+from error_handler import ErrorHandler
+from config import Config
+from source_fetcher import SourceFetcher, format_age
 from rule_optimizer import RuleOptimizer
+from rule_dedup import FingerprintSet
+from rule_converter import RuleConverter
+from rule_canonicalizer import RuleCanonicalizer
 from database import UBlockRuleConverter
+from regex_rewriter import RegexRewriter
+from input_guard import InputGuard
+from build_variant import BuildVariant
+from rule_store import RuleStore
+from snapshot_archive import SnapshotArchive
+from build_profiler import BuildProfiler
 
 class ListGenerator:
     """Generator for the unified uBlock Origin filter list."""
     
-    def __init__(self, config_path: str = 'sources.json'):
+    def __init__(
+        self,
+        config_path: str = 'sources.json',
+        record: bool = False,
+        replay: Optional[str] = None,
+        profile: Optional[str] = None
+    ):
         """Initialize the list generator.
         
         Args:
             config_path (str): Path to the configuration file.
+            record (bool): Record the consumed source bodies into a new snapshot.
+            replay (Optional[str]): Snapshot to build from instead of the network,
+                an identifier or "latest".
+            profile (Optional[str]): Directory to write per-stage CPU and
+                allocation profiles to, or None to build without profiling.
         """
         self.config_path = Path(config_path)
         self.logger = UnifiedLogger("UnifiedList", "logs/unified_list.log")
         self.error_handler = ErrorHandler(self.logger)
-        self.rule_optimizer = RuleOptimizer(self.logger, self.error_handler)
+        self.profiler = BuildProfiler(profile) if profile else None
+        with self._stage('config'):
+            self.config = Config(str(self.config_path), self.error_handler)
+        self.rule_optimizer = RuleOptimizer(
+            self.logger, self.error_handler, self.config.settings['optimizer_batch_size']
+        )
         self.rule_converter = UBlockRuleConverter()
+        regex_settings = self.config.settings.get('regex_rewrite', {})
+        self.regex_rewriter = RegexRewriter(regex_settings) if regex_settings.get('enabled', False) else None
+        guard_settings = self.config.settings.get('input_guard', {})
+        self.input_guard = (
+            InputGuard(self.logger, self.error_handler, guard_settings)
+            if guard_settings.get('enabled', False) else None
+        )
         
-        self.config = self._load_config()
-        self.processed_rules: Set[str] = set()
-    
-    def _load_config(self) -> Dict:
-        """Load and validate the configuration file.
-        
-        Returns:
-            Dict: Validated configuration dictionary.
+        snapshot_dir = self.config.settings['snapshot_dir']
+        snapshot = None
+        if replay:
+            snapshot = SnapshotArchive.open(snapshot_dir, replay)
+        elif record:
+            snapshot = SnapshotArchive.create(snapshot_dir)
+        self.source_fetcher = SourceFetcher(self.config, self.error_handler, self.logger, snapshot=snapshot)
+        self.build_time = datetime.utcnow()
+        self.makespan = 0.0
+        self.processed_rules = FingerprintSet(lambda ref: ref)
         
-        Raises:
-            ConfigError: If configuration is invalid or missing required fields.
-        """
-        try:
-            if not self.config_path.exists():
-                raise ConfigError(f"Configuration file not found: {self.config_path}")
-            
-            with open(self.config_path) as f:
-                config = json.load(f)
-            
-            # Validate required sections
-            required_sections = ['metadata', 'settings', 'sources', 'sections']
-            for section in required_sections:
-                if section not in config:
-                    raise ConfigError(f"Missing required section: {section}")
-            
-            return config
-        except Exception as e:
-            self.error_handler.handle_error(e, "config loading")
-            raise
-    
-    @ErrorHandler.retry_on_error(max_retries=3, delay=5)
-    def _fetch_source(self, source: Dict) -> Optional[List[str]]:
-        """Fetch rules from a filter list source.
+        # The main list and every configured variant share one fetch,
+        # conversion and optimization pass
+        self.main_list = BuildVariant(self.logger, self.error_handler, self.config)
+        self.variants = [
+            BuildVariant(self.logger, self.error_handler, self.config, variant)
+            for variant in self.config.variants
+        ]
+        self.variant_counts: Dict[str, int] = {}
         
-        Args:
-            source (Dict): Source configuration dictionary.
+        store_settings = self.config.settings.get('rule_store', {})
+        self.rule_store = (
+            RuleStore(store_settings.get('path', 'cache/rules.db'), store_settings.get('batch_size', 10000))
+            if store_settings.get('enabled', False) else None
+        )
         
-        Returns:
-            Optional[List[str]]: List of rules or None if fetch failed.
-        """
-        try:
-            headers = {'User-Agent': self.config['settings']['user_agent']}
-            response = requests.get(
-                source['url'],
-                headers=headers,
-                timeout=self.config['settings']['timeout']
+        # Profiling wraps the per-rule hot paths and fetch jobs only when
+        # enabled, so an unprofiled build runs the unwrapped methods
+        if self.profiler:
+            self.rule_converter.convert_rule = self.profiler.time_rules(
+                'convert_rule', self.rule_converter.convert_rule
             )
-            response.raise_for_status()
-            
-            rules = [
-                line.strip()
-                for line in response.text.splitlines()
-                if line.strip() and not line.startswith(('!', '#'))
-            ]
-            
-            self.logger.info(f"Fetched {len(rules)} rules from {source['name']}")
-            return rules
-            
-        except Exception as e:
-            raise SourceError(f"Failed to fetch {source['name']}: {str(e)}")
+            # Batched optimization skips _optimize_rule, its per-rule step is _finish_rule
+            optimize_step = '_finish_rule' if self.config.settings['optimizer_batch_size'] > 0 else '_optimize_rule'
+            setattr(self.rule_optimizer, optimize_step, self.profiler.time_rules(
+                optimize_step, getattr(self.rule_optimizer, optimize_step)
+            ))
+            self.source_fetcher.fetch_source = self.profiler.thread_task('fetch', self.source_fetcher.fetch_source)
     
     def generate(self) -> bool:
         """Generate the unified filter list.
@@ -95,49 +111,57 @@ class ListGenerator:
         try:
             # Reset counters
             self.error_handler.reset_counts()
-            self.processed_rules.clear()
             
-            all_rules: List[tuple] = []  # (rule, priority)
+            # A replayed build is stamped with its snapshot's time so it reproduces exactly
+            snapshot = self.source_fetcher.snapshot
+            if snapshot is not None and snapshot.read_only:
+                self.build_time = snapshot.created.astimezone(timezone.utc).replace(tzinfo=None)
+            else:
+                self.build_time = datetime.utcnow()
             
-            # Fetch and process sources in parallel
-            with concurrent.futures.ThreadPoolExecutor(
-                max_workers=self.config['settings']['parallel_downloads']
-            ) as executor:
-                future_to_source = {
-                    executor.submit(self._fetch_source, source): source
-                    for source in self.config['sources']
-                    if source['enabled']
-                }
-                
-                for future in concurrent.futures.as_completed(future_to_source):
-                    source = future_to_source[future]
-                    try:
-                        rules = future.result()
-                        if rules:
-                            # Convert and optimize rules
-                            for rule in rules:
-                                converted_rule, status = self.rule_converter.convert_rule(
-                                    rule, source['type']
-                                )
-                                if converted_rule:
-                                    all_rules.append((converted_rule, source['priority']))
-                    except Exception as e:
-                        self.error_handler.handle_error(e, f"processing {source['name']}")
+            # Bound the fetch phase by the build time budget, if any
+            time_budget = self.config.settings.get('build_time_budget', 0)
+            deadline = time.monotonic() + time_budget if time_budget else None
             
-            # Sort rules by priority and optimize
-            all_rules.sort(key=lambda x: x[1])
-            unique_rules = [rule for rule, _ in all_rules]
-            optimized_rules = self.rule_optimizer.optimize_rules(unique_rules)
+            # Fetch sources in parallel and convert each one as soon as it arrives
+            sources = self.source_fetcher.iter_sources(deadline)
+            if self.profiler:
+                # Stages run back to back when profiling so each is measured on its own
+                with self.profiler.stage('fetch'):
+                    sources = list(sources)
+            if self.rule_store:
+                total_rules, unique_count, optimized_count = self._build_from_store(sources)
+            else:
+                total_rules, unique_count, optimized_count = self._build_in_memory(sources)
             
-            # Generate and write the final list
-            self._write_list(optimized_rules)
+            if self.regex_rewriter and self.regex_rewriter.rewritten:
+                self.logger.info(
+                    f"Rewrote {self.regex_rewriter.rewritten} regex filters into "
+                    f"{self.regex_rewriter.produced} plain filters"
+                )
+            if self.input_guard:
+                self.input_guard.write_report(self.build_time)
             
-            # Log statistics
+            # Log aggregated per-rule diagnostics, then statistics
+            self.error_handler.report_diagnostics()
             stats = {
-                "Total sources processed": len(self.config['sources']),
-                "Total rules processed": len(all_rules),
-                "Unique rules": len(unique_rules),
-                "Optimized rules": len(optimized_rules),
+                "Total sources processed": len(self.config.sources),
+                "Total rules processed": total_rules,
+                "Unique rules": unique_count,
+                "Optimized rules": optimized_count,
+                "Quarantined rules": (
+                    f"{self.input_guard.total} ({self.input_guard.counts['length']} over length cap, "
+                    f"{self.input_guard.counts['cpu']} over CPU budget)"
+                    if self.input_guard else "disabled"
+                ),
+                "Variants": ", ".join(
+                    f"{name} ({count} rules)" for name, count in self.variant_counts.items()
+                ) or "none",
+                "Fetch makespan": self._format_makespan(),
+                "Stale sources": ", ".join(
+                    f"{name} ({format_age(age)} old)"
+                    for name, age in sorted(self.source_fetcher.stale_sources.items())
+                ) or "none",
                 "Errors encountered": self.error_handler.error_count,
                 "Warnings encountered": self.error_handler.warning_count
             }
@@ -148,36 +172,557 @@ class ListGenerator:
         except Exception as e:
             self.error_handler.handle_error(e, "list generation")
             return False
+        
+        finally:
+            if self.profiler:
+                try:
+                    report_path = self.profiler.write(self.build_time)
+                    self.logger.info(f"Written build profile to {report_path.parent}")
+                except OSError as e:
+                    self.error_handler.handle_warning(f"Failed to write build profile: {e}", "profiling")
+    
+    def _build_in_memory(self, sources: Iterable[Tuple[List[str], Dict]]) -> Tuple[int, int, int]:
+        """Convert, optimize and write the fetched sources in memory.
+        
+        Sources are converted and optimized once. The main list and each
+        variant then only merge the rules of their sources, run their
+        post-merge stages and write their outputs.
+        
+        Args:
+            sources (Iterable[Tuple[List[str], Dict]]): Fetched rules and source
+                configuration, in arrival order.
+        
+        Returns:
+            Tuple[int, int, int]: Converted, unique and optimized rule counts.
+        """
+        phase_start = time.monotonic()
+        converted_sources: List[Tuple[List[str], Dict]] = []
+        with self._stage('convert'):
+            for rules, source in sources:
+                started = time.monotonic()
+                converted_sources.append((list(self._convert_source(rules, source)), source))
+                del rules
+                self._record_conversion(source, started)
+        self._report_makespan(phase_start)
+        
+        with self._stage('optimize'):
+            all_rules: List[tuple] = []  # (rule, priority, source name)
+            total_rules = 0
+            # Drop cross-source duplicates in priority order, whatever order the sources arrived in
+            self.processed_rules = FingerprintSet(lambda ref: all_rules[ref][0])
+            config_order = {source['name']: index for index, source in enumerate(self.config.sources)}
+            converted_sources.sort(key=lambda item: (item[1]['priority'], config_order.get(item[1]['name'], 0)))
+            
+            # Variants need the unique rule behind every rule of a source, duplicates
+            # included, to keep a rule whose higher priority twin they leave out
+            members: Dict[str, array] = {}
+            for converted_rules, source in converted_sources:
+                source_members = members.setdefault(source['name'], array('i')) if self.variants else None
+                for converted_rule in converted_rules:
+                    total_rules += 1
+                    if self.processed_rules.add(converted_rule, len(all_rules)):
+                        if source_members is not None:
+                            source_members.append(len(all_rules))
+                        all_rules.append((converted_rule, source['priority'], source['name']))
+                    elif source_members is not None:
+                        source_members.append(self.processed_rules.get(converted_rule))
+            merge_order = [source for _, source in converted_sources]
+            del converted_sources
+            
+            # Rules are already in priority order, optimize them
+            unique_rules = [rule for rule, _, _ in all_rules]
+            merged_rules = self.rule_optimizer.optimize_rules(
+                unique_rules, lambda index: all_rules[index][2], map_inputs=bool(self.variants)
+            )
+            # Source of each optimized rule, kept parallel through the later stages
+            rule_sources = [all_rules[index][2] for index in self.rule_optimizer.origins]
+        
+        optimized_count = self._finish_list(self.main_list, merged_rules, rule_sources)
+        
+        for variant in self.variants:
+            with self._stage('optimize'):
+                variant_rules, variant_sources = self._merge_variant(
+                    variant, merge_order, members, merged_rules, self.rule_optimizer.merged_into
+                )
+            self.variant_counts[variant.name] = self._finish_list(variant, variant_rules, variant_sources)
+        return total_rules, len(unique_rules), optimized_count
+    
+    def _merge_variant(
+        self,
+        variant: BuildVariant,
+        sources: List[Dict],
+        members: Dict[str, array],
+        merged_rules: List[str],
+        merged_into: array
+    ) -> Tuple[List[str], List[str]]:
+        """Select a variant's rules from the shared optimized rules.
+        
+        Sources are visited in priority order, so each rule is credited to
+        the highest priority source of the variant that has it, as in the
+        main list.
+        
+        Args:
+            variant (BuildVariant): Variant to merge the rules of.
+            sources (List[Dict]): Source configurations in priority order.
+            members (Dict[str, array]): Unique rule index of every rule of each source.
+            merged_rules (List[str]): Optimized rules shared by all lists.
+            merged_into (array): Index into merged_rules of each unique rule, -1 if dropped.
+        
+        Returns:
+            Tuple[List[str], List[str]]: The variant's rules and the source of each.
+        """
+        seen = bytearray(len(merged_rules))
+        rules: List[str] = []
+        rule_sources: List[str] = []
+        for source in sources:
+            name = source['name']
+            if not variant.includes_source(name):
+                continue
+            for unique_index in members.get(name, ()):
+                index = merged_into[unique_index]
+                if index < 0 or seen[index]:
+                    continue
+                seen[index] = 1
+                rule = merged_rules[index]
+                if (
+                    variant.kept_sections is not None
+                    and variant.section_of(RuleConverter.classify_rule(rule) or 0) not in variant.kept_sections
+                ):
+                    continue
+                rules.append(rule)
+                rule_sources.append(name)
+        return rules, rule_sources
+    
+    def _finish_list(self, variant: BuildVariant, optimized_rules: List[str], rule_sources: List[str]) -> int:
+        """Run a list's post-merge stages and write its outputs.
+        
+        Args:
+            variant (BuildVariant): The main list or a variant.
+            optimized_rules (List[str]): Merged and optimized rules of the list.
+            rule_sources (List[str]): Source of each rule, parallel to optimized_rules.
+        
+        Returns:
+            int: Number of rules written.
+        """
+        with self._stage('optimize'):
+            # Remove $badfilter rules and the filters they disable, then block
+            # rules an exception always overrides
+            for stage in (variant.badfilter_resolver, variant.exception_pruner):
+                if not stage:
+                    continue
+                removed = stage.resolve(lambda: zip(optimized_rules, rule_sources), self.build_time)
+                if removed:
+                    kept = [
+                        (rule, source) for rule, source in zip(optimized_rules, rule_sources) if rule not in removed
+                    ]
+                    optimized_rules = [rule for rule, _ in kept]
+                    rule_sources = [source for _, source in kept]
+            
+            # Score matching cost and rewrite or drop the worst offenders
+            if variant.cost_analyzer:
+                source_priorities = {s['name']: s['priority'] for s in self.config.sources}
+                optimized_rules = variant.cost_analyzer.analyze(
+                    optimized_rules, dict(zip(optimized_rules, rule_sources)), source_priorities, self.build_time
+                )
+                rule_sources = variant.cost_analyzer.kept_sources
+        
+        # Generate and write the final list and its DNS exports
+        with self._stage('classify'):
+            ordered_sections = self._order_rules(variant, optimized_rules)
+        with self._stage('write'):
+            self._write_outputs(
+                variant, len(optimized_rules), lambda: ordered_sections, optimized_rules,
+                zip(optimized_rules, rule_sources)
+            )
+        return len(optimized_rules)
+    
+    def _build_from_store(self, sources: Iterable[Tuple[List[str], Dict]]) -> Tuple[int, int, int]:
+        """Convert and optimize the fetched sources into the on-disk rule store.
+        
+        Each source is stored as soon as it arrives and released, and the
+        outputs are streamed from the store, so memory use does not grow
+        with the size of the merged list. The store resolves duplicates by
+        priority, so arrival order does not matter.
+        
+        Args:
+            sources (Iterable[Tuple[List[str], Dict]]): Fetched rules and source
+                configuration, in arrival order.
+        
+        Returns:
+            Tuple[int, int, int]: Converted, unique and optimized rule counts.
+        """
+        if self.main_list.cost_analyzer:
+            self.logger.warning("Cost analysis needs the whole list in memory, skipped with the rule store")
+        if self.variants:
+            self.logger.warning("Build variants need the whole list in memory, skipped with the rule store")
+        
+        total_rules = 0
+        
+        phase_start = time.monotonic()
+        self.rule_store.open()
+        try:
+            for rules, source in sources:
+                started = time.monotonic()
+                with self._stage('convert'):
+                    converted_rules = list(self._convert_source(rules, source))
+                del rules
+                total_rules += len(converted_rules)
+                
+                # Rules are classified for their section as they are stored
+                with self._stage('optimize'):
+                    optimized = self.rule_optimizer.iter_optimized(converted_rules, source['name'])
+                    for position, rule in enumerate(optimized):
+                        rule_type = RuleConverter.classify_rule(rule) or 0
+                        self.rule_store.add(
+                            rule, rule_type, self.main_list.section_of(rule_type),
+                            self._locality_key(rule), source['priority'], source['name'], position
+                        )
+                self._record_conversion(source, started)
+            
+            with self._stage('optimize'):
+                self.rule_store.finish()
+                self._report_makespan(phase_start)
+                
+                for stage in (self.main_list.badfilter_resolver, self.main_list.exception_pruner):
+                    if stage:
+                        self.rule_store.delete(stage.resolve(
+                            lambda: ((rule, source) for rule, source, _ in self.rule_store.iter_rules()),
+                            self.build_time
+                        ))
+        finally:
+            self.rule_store.close()
+        
+        rule_count = self.rule_store.count()
+        self.logger.info(f"Stored {rule_count} unique rules in {self.rule_store.path}")
+        
+        with self._stage('write'):
+            self._write_outputs(
+                self.main_list,
+                rule_count,
+                self._stream_sections,
+                (rule for rule, _, _ in self.rule_store.iter_rules()),
+                ((rule, source) for rule, source, _ in self.rule_store.iter_rules())
+            )
+        return total_rules, rule_count, rule_count
     
-    def _write_list(self, rules: List[str]) -> None:
+    def _convert_source(self, rules: List[str], source: Dict) -> Iterator[str]:
+        """Convert the rules of one source to uBlock Origin syntax.
+        
+        Args:
+            rules (List[str]): Raw rules of the source.
+            source (Dict): Source configuration.
+        
+        Yields:
+            str: Converted rules, unsupported rules are skipped, quarantined
+                rules are left out and regex filters with a plain equivalent
+                are replaced by it.
+        """
+        guard = self.input_guard
+        max_length = guard.line_limit(source) if guard else 0
+        budget = guard.max_rule_seconds if guard else 0
+        gc_enabled = gc.isenabled()
+        for rule in rules:
+            if max_length and len(rule) > max_length:
+                guard.quarantine(rule, source['name'], 'length')
+                continue
+            # CPU time of this thread, waiting on other threads does not count against
+            # the rule, and collections are held off so their pauses do not either
+            if budget:
+                gc.disable()
+                started = time.thread_time()
+            try:
+                converted_rule, status = self.rule_converter.convert_rule(rule, source['type'])
+                # Plain filters are indexed by token, regex filters are tested on every request
+                plain_rules = None
+                if converted_rule and self.regex_rewriter and converted_rule.startswith(('/', '@@/')):
+                    plain_rules = self.regex_rewriter.rewrite(converted_rule)
+                cpu_seconds = time.thread_time() - started if budget else 0.0
+            except Exception as e:
+                self.error_handler.record_diagnostic(
+                    f"Rule conversion failed ({type(e).__name__})", source['name'], rule
+                )
+                continue
+            finally:
+                if budget and gc_enabled:
+                    gc.enable()
+            if converted_rule:
+                if cpu_seconds > budget:
+                    guard.quarantine(rule, source['name'], 'cpu', cpu_seconds)
+                    continue
+                if plain_rules:
+                    yield from plain_rules
+                    continue
+                yield converted_rule
+            elif status == "Unsupported scriptlet":
+                self.error_handler.record_diagnostic("Scriptlet has no uBO equivalent", source['name'], rule)
+    
+    def _stage(self, name: str):
+        """Get the context that profiles a build stage.
+        
+        Args:
+            name (str): Stage name.
+        
+        Returns:
+            ContextManager: Profiling context, or a no-op when not profiling.
+        """
+        return self.profiler.stage(name) if self.profiler else nullcontext()
+    
+    def _task(self, name: str, func: Callable) -> Callable:
+        """Get a function to run on a worker thread as part of a build stage.
+        
+        Args:
+            name (str): Stage name.
+            func (Callable): Function to run.
+        
+        Returns:
+            Callable: Profiled wrapper, or the function itself when not profiling.
+        """
+        return self.profiler.thread_task(name, func) if self.profiler else func
+    
+    def _record_conversion(self, source: Dict, started: float) -> None:
+        """Record the conversion time of a source in the fetch history.
+        
+        Args:
+            source (Dict): Source configuration.
+            started (float): time.monotonic() value when the conversion started.
+        """
+        history = self.source_fetcher.history
+        if history is not None:
+            history.record(source['name'], convert_seconds=time.monotonic() - started)
+    
+    def _report_makespan(self, phase_start: float) -> None:
+        """Log the fetch and conversion makespan against its estimate and save the history.
+        
+        Args:
+            phase_start (float): time.monotonic() value when fetching started.
+        """
+        self.makespan = time.monotonic() - phase_start
+        history = self.source_fetcher.history
+        if history is None:
+            return
+        
+        estimate = self.source_fetcher.estimated_makespan
+        if estimate:
+            self.logger.info(
+                f"Fetched and converted all sources in {self.makespan:.1f}s, "
+                f"estimated {estimate:.1f}s ({(self.makespan - estimate) / estimate:+.0%})"
+            )
+        history.last_run = {
+            'finished': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'slots': self.source_fetcher.scheduler.max_workers,
+            'makespan_seconds': round(self.makespan, 3),
+            'estimated_makespan_seconds': round(estimate, 3) if estimate is not None else None
+        }
+        try:
+            history.save()
+        except OSError as e:
+            self.error_handler.handle_warning(f"Failed to save fetch history: {e}", history.path)
+    
+    def _format_makespan(self) -> str:
+        """Describe the fetch and conversion makespan for the build statistics.
+        
+        Returns:
+            str: Measured makespan, with the estimate when one was made.
+        """
+        estimate = self.source_fetcher.estimated_makespan
+        if estimate is None:
+            return f"{self.makespan:.1f}s"
+        return f"{self.makespan:.1f}s (estimated {estimate:.1f}s)"
+    
+    def _write_outputs(
+        self,
+        variant: BuildVariant,
+        rule_count: int,
+        read_sections: Callable[[], Iterable[Tuple[str, str, Iterable[str]]]],
+        rules: Iterable[str],
+        provenance: Iterable[Tuple[str, str]]
+    ) -> None:
+        """Write the unified list and every configured export concurrently.
+        
+        All outputs are derived from the same optimized rule set, so they
+        never disagree about what is blocked. The domain extraction shared by
+        the exports runs once, then each file is written on its own thread.
+        
+        Args:
+            variant (BuildVariant): The main list or a variant.
+            rule_count (int): Number of rules in the list.
+            read_sections (Callable[[], Iterable[Tuple[str, str, Iterable[str]]]]):
+                Returns a fresh iterable of the ordered sections as tuples of
+                (name, description, rules); it is read once per list output.
+            rules (Iterable[str]): Rules to extract export domains from.
+            provenance (Iterable[Tuple[str, str]]): Pairs of (rule, source name).
+        """
+        exports = variant.settings.get('exports', [])
+        domains = variant.list_exporter.collect_domains(rules) if exports else None
+        provenance_file = variant.settings.get('provenance_file')
+        
+        with ThreadPoolExecutor(max_workers=3 + len(exports)) as executor:
+            list_future = executor.submit(
+                self._task('write', self._write_list), variant, rule_count, read_sections()
+            )
+            export_futures = []
+            if provenance_file:
+                export_futures.append((executor.submit(
+                    self._task('write', self._write_provenance), provenance_file, provenance
+                ), {'format': 'provenance'}))
+            if variant.chunk_writer:
+                export_futures.append((executor.submit(
+                    self._task('write', variant.chunk_writer.write),
+                    read_sections(), self._generate_header(variant, rule_count), self.build_time
+                ), {'format': 'chunked'}))
+            export_futures.extend(
+                (executor.submit(
+                    self._task('write', variant.list_exporter.export), domains, export_settings, self.build_time
+                ), export_settings)
+                for export_settings in exports
+            )
+            
+            # Exports are best effort, a failed one must not fail the build
+            for future, export_settings in export_futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    self.error_handler.handle_error(
+                        e, f"exporting {export_settings.get('format', 'unknown')} list"
+                    )
+            list_future.result()
+    
+    def _write_provenance(self, provenance_file: str, provenance: Iterable[Tuple[str, str]]) -> None:
+        """Write which source contributed each rule, for the match tester.
+        
+        Args:
+            provenance_file (str): Path of the tab separated output file.
+            provenance (Iterable[Tuple[str, str]]): Pairs of (rule, source name).
+        """
+        output_path = Path(provenance_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.writelines(f"{rule}\t{source}\n" for rule, source in provenance)
+    
+    def _write_list(
+        self,
+        variant: BuildVariant,
+        rule_count: int,
+        sections: Iterable[Tuple[str, str, Iterable[str]]]
+    ) -> None:
         """Write the generated rules to the output file.
         
         Args:
-            rules (List[str]): List of optimized rules to write.
+            variant (BuildVariant): The main list or a variant.
+            rule_count (int): Number of rules in the list.
+            sections (Iterable[Tuple[str, str, Iterable[str]]]): Ordered
+                sections as tuples of (name, description, rules).
         """
-        output_path = Path(self.config['settings']['output_file'])
+        output_path = Path(variant.settings['output_file'])
+        output_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Generate header
-        header = self._generate_header(len(rules))
+        header = self._generate_header(variant, rule_count)
         
         # Write output file
-        with open(output_path, 'w') as f:
+        with open(output_path, 'w', encoding='utf-8', newline='\n') as f:
             f.write(header)
-            f.write('\n'.join(rules))
+            for name, description, section_rules in sections:
+                f.write(f"! === {name} ===\n")
+                if description:
+                    f.write(f"! {description}\n")
+                f.writelines(f"{rule}\n" for rule in section_rules)
+                f.write('!\n')
+        
+        self.logger.info(f"Written {rule_count} rules to {output_path}")
+    
+    def _order_rules(self, variant: BuildVariant, rules: List[str]) -> List[Tuple[str, str, List[str]]]:
+        """Group rules by section and sort them into a deterministic order.
+        
+        Sections follow the configuration order. Within a section rules are
+        ordered by rule type, then by reversed hostname so that rules for the
+        same site sit together, then by rule text. uBO does not depend on
+        rule order and source priority has already decided which duplicate
+        survived, so the output is stable across runs whatever order the
+        fetches finished in.
+        
+        Args:
+            variant (BuildVariant): The main list or a variant.
+            rules (List[str]): List of optimized rules.
+        
+        Returns:
+            List[Tuple[str, str, List[str]]]: Non-empty sections as tuples of
+                (name, description, ordered rules).
+        """
+        sections = variant.sections
+        
+        groups: List[List[tuple]] = [[] for _ in sections]
+        for rule in rules:
+            rule_type = RuleConverter.classify_rule(rule) or 0
+            groups[variant.section_of(rule_type)].append(
+                (rule_type, self._locality_key(rule), rule)
+            )
+        
+        ordered = []
+        for section, group in zip(sections, groups):
+            if group:
+                group.sort()
+                ordered.append((section['name'], section.get('description', ''), [rule for _, _, rule in group]))
+        return ordered
+    
+    def _stream_sections(self) -> Iterator[Tuple[str, str, Iterator[str]]]:
+        """Stream the ordered sections from the rule store.
+        
+        Yields:
+            Tuple[str, str, Iterator[str]]: Non-empty sections as tuples of
+                (name, description, ordered rules).
+        """
+        sections = self.main_list.sections
+        for index, rows in groupby(self.rule_store.iter_ordered(), key=itemgetter(0)):
+            section = sections[index]
+            yield section['name'], section.get('description', ''), (rule for _, rule in rows)
+    
+    @staticmethod
+    def _locality_key(rule: str) -> str:
+        """Get the reversed hostname a rule applies to, for sorting.
+        
+        Args:
+            rule (str): Rule to get the key for.
+        
+        Returns:
+            str: Reversed hostname such as "com.example.ads", or "" for generic rules.
+        """
+        if rule.startswith('@@'):
+            rule = rule[2:]
+        
+        for separator in RuleCanonicalizer.COSMETIC_SEPARATORS:
+            if separator in rule:
+                host = rule.split(separator, 1)[0].split(',', 1)[0].lstrip('~')
+                break
+        else:
+            if rule.startswith('||'):
+                host = rule[2:]
+                for index, char in enumerate(host):
+                    if char in '^/$*:|':
+                        host = host[:index]
+                        break
+            elif rule.startswith(('0.0.0.0 ', '127.0.0.1 ')):
+                host = rule.split(None, 1)[1]
+            else:
+                _, options = RuleCanonicalizer.split_options(rule)
+                host = ''
+                if options and 'domain=' in options:
+                    host = options.split('domain=', 1)[1].split('|', 1)[0].split(',', 1)[0].lstrip('~')
         
-        self.logger.info(f"Written {len(rules)} rules to {output_path}")
+        return '.'.join(reversed(host.lower().split('.')))
     
-    def _generate_header(self, rule_count: int) -> str:
+    def _generate_header(self, variant: BuildVariant, rule_count: int) -> str:
         """Generate the metadata header for the unified list.
         
         Args:
+            variant (BuildVariant): The main list or a variant.
             rule_count (int): Total number of rules in the list.
         
         Returns:
             str: Formatted header string.
         """
-        meta = self.config['metadata']
-        update_time = datetime.utcnow().strftime('%Y-%m-%d:%H:%M')
+        meta = variant.metadata
+        update_time = self.build_time.strftime('%Y-%m-%d:%H:%M')
         
         header_lines = [
             "! Title: {}".format(meta['title']),
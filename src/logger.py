@@ -1,15 +1,61 @@
+import atexit
 import logging
+import queue
 import sys
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue handler that leaves message formatting to the listener thread."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Enqueue the record unformatted, it never leaves this process."""
+        return record
+
+
+class _RoutingHandler(logging.Handler):
+    """Hands each record to the handlers registered for its logger name."""
+    
+    def __init__(self):
+        super().__init__()
+        self.routes: Dict[str, List[logging.Handler]] = {}
+    
+    def handle(self, record: logging.LogRecord) -> bool:
+        """Emit the record on every handler of its logger whose level it meets."""
+        for handler in self.routes.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
 
 class UnifiedLogger:
-    """Custom logger for the uBlock Unified List Generator."""
+    """Custom logger for the uBlock Unified List Generator.
+    
+    Records are handed to a queue and written to the console and log file
+    by a listener thread, so callers never block on log I/O. Messages take
+    %-style arguments that are only formatted if the record is emitted.
+    All loggers share one queue and one listener, so records are written
+    in the order they were logged whatever logger they came from.
+    """
+    
+    # Queue and listener shared by every logger, started with the first one
+    _queue: Optional[queue.SimpleQueue] = None
+    _listener: Optional[QueueListener] = None
+    _router = _RoutingHandler()
+    _lock = threading.Lock()
     
     def __init__(self, name: str, log_file: Optional[str] = None):
         """Initialize the logger.
         
+        Instances with the same name share one set of handlers, so creating
+        a logger again does not duplicate its output.
+        
         Args:
             name (str): Logger name
             log_file (Optional[str]): Path to log file. If None, logs to console only.
@@ -17,49 +63,79 @@ class UnifiedLogger:
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.INFO)
         
-        # Create formatters
-        console_formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
-        
-        # File handler (if log_file specified)
-        if log_file:
-            log_path = Path(log_file)
-            log_path.parent.mkdir(parents=True, exist_ok=True)
-            file_handler = logging.FileHandler(log_path)
-            file_handler.setFormatter(file_formatter)
-            self.logger.addHandler(file_handler)
+        with self._lock:
+            if name in self._router.routes:
+                return
+            
+            # Create formatters
+            console_formatter = logging.Formatter(
+                '%(asctime)s - %(levelname)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
+            
+            file_formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
+            
+            # Console handler
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(console_formatter)
+            handlers: List[logging.Handler] = [console_handler]
+            
+            # File handler (if log_file specified)
+            if log_file:
+                log_path = Path(log_file)
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                file_handler = logging.FileHandler(log_path)
+                file_handler.setFormatter(file_formatter)
+                handlers.append(file_handler)
+            
+            if UnifiedLogger._listener is None:
+                UnifiedLogger._queue = queue.SimpleQueue()
+                UnifiedLogger._listener = QueueListener(self._queue, self._router)
+                UnifiedLogger._listener.start()
+                atexit.register(UnifiedLogger.shutdown)
+            # Route before enqueueing so the listener never sees an unknown name
+            self._router.routes[name] = handlers
+            self.logger.addHandler(_DeferredQueueHandler(self._queue))
+    
+    @classmethod
+    def shutdown(cls) -> None:
+        """Write out all queued records and stop the listener thread."""
+        with cls._lock:
+            if cls._listener is not None:
+                cls._listener.stop()
+                cls._listener = None
+                atexit.unregister(UnifiedLogger.shutdown)
+            for handlers in cls._router.routes.values():
+                for handler in handlers:
+                    handler.close()
+            cls._router.routes.clear()
+            for name in list(logging.root.manager.loggerDict):
+                logger = logging.getLogger(name)
+                for handler in [h for h in logger.handlers if isinstance(h, _DeferredQueueHandler)]:
+                    logger.removeHandler(handler)
     
-    def info(self, message: str) -> None:
-        """Log info level message."""
-        self.logger.info(message)
+    def info(self, message: str, *args: Any) -> None:
+        """Log info level message, formatted with args only if emitted."""
+        self.logger.info(message, *args)
     
-    def error(self, message: str) -> None:
-        """Log error level message."""
-        self.logger.error(message)
+    def error(self, message: str, *args: Any) -> None:
+        """Log error level message, formatted with args only if emitted."""
+        self.logger.error(message, *args)
     
-    def warning(self, message: str) -> None:
-        """Log warning level message."""
-        self.logger.warning(message)
+    def warning(self, message: str, *args: Any) -> None:
+        """Log warning level message, formatted with args only if emitted."""
+        self.logger.warning(message, *args)
     
-    def debug(self, message: str) -> None:
-        """Log debug level message."""
-        self.logger.debug(message)
+    def debug(self, message: str, *args: Any) -> None:
+        """Log debug level message, formatted with args only if emitted."""
+        self.logger.debug(message, *args)
     
-    def critical(self, message: str) -> None:
-        """Log critical level message."""
-        self.logger.critical(message)
+    def critical(self, message: str, *args: Any) -> None:
+        """Log critical level message, formatted with args only if emitted."""
+        self.logger.critical(message, *args)
     
     def log_stats(self, stats: dict) -> None:
         """Log statistics about the list generation process.
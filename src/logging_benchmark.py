@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Logging Benchmark for uBlock Unified List Generator
+
+This module times the two logging paths a build leans on: per-rule
+problems, reported one warning each or aggregated as diagnostics, and
+plain info calls, timed until they return to the caller while the
+listener thread writes them out.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from error_handler import ErrorHandler
+from logger import UnifiedLogger
+
+
+def time_warnings(log_file: str, count: int) -> float:
+    """
+    Time reporting per-rule problems as one warning each.
+
+    Args:
+        log_file: Path of the log file
+        count: Number of problems
+
+    Returns:
+        Seconds until every warning was written
+    """
+    error_handler = ErrorHandler(UnifiedLogger("WarningBenchmark", log_file))
+    started = time.perf_counter()
+    for index in range(count):
+        error_handler.handle_warning(f"Rule optimization failed: Rule contains invalid characters: rule{index}")
+    UnifiedLogger.shutdown()
+    return time.perf_counter() - started
+
+
+def time_diagnostics(log_file: str, count: int) -> float:
+    """
+    Time reporting per-rule problems as aggregated diagnostics.
+
+    Args:
+        log_file: Path of the log file
+        count: Number of problems
+
+    Returns:
+        Seconds until the summary was written
+    """
+    error_handler = ErrorHandler(UnifiedLogger("DiagnosticBenchmark", log_file))
+    started = time.perf_counter()
+    for index in range(count):
+        error_handler.record_diagnostic("Rule contains invalid characters", "Benchmark", f"rule{index}")
+    error_handler.report_diagnostics()
+    UnifiedLogger.shutdown()
+    return time.perf_counter() - started
+
+
+def time_info_calls(log_file: str, count: int) -> float:
+    """
+    Time info calls until they return, leaving the writing to the listener.
+
+    Args:
+        log_file: Path of the log file
+        count: Number of calls
+
+    Returns:
+        Seconds until the last call returned
+    """
+    logger = UnifiedLogger("InfoBenchmark", log_file)
+    started = time.perf_counter()
+    for index in range(count):
+        logger.info("Processed item %d", index)
+    elapsed = time.perf_counter() - started
+    UnifiedLogger.shutdown()
+    return elapsed
+
+
+def main() -> int:
+    """Command line entry point of the logging benchmark."""
+    parser = argparse.ArgumentParser(description="Time per-rule problem reporting and info logging.")
+    parser.add_argument('--problems', type=int, default=200_000, help="per-rule problems to report")
+    parser.add_argument('--info-calls', type=int, default=100_000, help="info calls to time")
+    args = parser.parse_args()
+
+    # Console output would time the terminal, only the log file is written
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = os.path.join(directory, 'benchmark.log')
+            results = [
+                (f"{args.problems} warnings", time_warnings(log_file, args.problems)),
+                (f"{args.problems} diagnostics", time_diagnostics(log_file, args.problems)),
+                (f"{args.info_calls} info calls returned", time_info_calls(log_file, args.info_calls)),
+            ]
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+
+    for name, seconds in results:
+        print(f"{name:<32}{seconds:>8.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,38 @@
 #!/usr/bin/env python3
 
+import argparse
+
 from list_generator import ListGenerator
 from logger import UnifiedLogger
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Generate the uBlock Unified List.")
+    snapshot = parser.add_mutually_exclusive_group()
+    snapshot.add_argument(
+        '--record', action='store_true',
+        help="record the source bodies this build consumes into a new snapshot"
+    )
+    snapshot.add_argument(
+        '--replay', metavar='SNAPSHOT',
+        help="build from a recorded snapshot (identifier, 'latest' or manifest path) without network access"
+    )
+    parser.add_argument(
+        '--profile', metavar='DIR', nargs='?', const='profile',
+        help="write per-stage CPU and allocation profiles, collapsed stacks and the slowest rules to DIR "
+             "(default: profile)"
+    )
+    return parser.parse_args()
+
 def main():
     """Main entry point for the uBlock Unified List Generator."""
+    args = parse_args()
     logger = UnifiedLogger("Main")
     
     try:
         logger.info("Starting uBlock Unified List Generator")
         
-        generator = ListGenerator()
+        generator = ListGenerator(record=args.record, replay=args.replay, profile=args.profile)
         if generator.generate():
             logger.info("List generation completed successfully")
             return 0
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+"""
+URL Match Tester for uBlock Unified List Generator
+
+This module loads a generated list into a token and hostname index, in the
+spirit of uBlock Origin's own filter buckets, and reports which block,
+exception and cosmetic rules apply to a request. It is meant for triaging
+site breakage and for checking that list changes do not alter matching on
+a recorded corpus of requests.
+
+Matching follows uBO's filter syntax closely but not exactly: the public
+suffix list is approximated, and request constraints the query gives no
+value for (type, document origin) are not checked, so such queries list
+every rule that could match.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from rule_canonicalizer import RuleCanonicalizer
+from rule_cost_analyzer import RuleCostAnalyzer
+
+
+TOKEN_PATTERN = re.compile(r'[%0-9a-z]+')
+HOSTNAME_PATTERN = re.compile(r'^[a-z0-9_.-]+$')
+HOSTS_ENTRY_PATTERN = re.compile(r'^(?:0\.0\.0\.0|127\.0\.0\.1)\s+([^\s#]+)')
+
+# Request types a network filter option can restrict to, in uBO's short names
+REQUEST_TYPES = frozenset({
+    'script', 'image', 'css', 'xhr', 'frame', 'doc', 'font', 'media',
+    'object', 'ping', 'websocket', 'other', 'popup'
+})
+
+# Options that modify a request instead of blocking it
+MODIFIER_OPTIONS = frozenset({
+    'csp', 'header', 'permissions', 'redirect-rule', 'removeparam', 'replace',
+    'urlskip', 'urltransform', 'uritransform'
+})
+
+# Second-level labels under which registrations happen, such as co.uk
+SECOND_LEVEL_LABELS = frozenset({'ac', 'co', 'com', 'edu', 'go', 'gov', 'ne', 'net', 'or', 'org'})
+
+
+def base_domain(hostname: str) -> str:
+    """
+    Approximate the registrable domain of a hostname.
+
+    Args:
+        hostname: Hostname to reduce
+
+    Returns:
+        Registrable domain, such as "example.co.uk" for "www.example.co.uk"
+    """
+    labels = hostname.split('.')
+    suffix = 2 if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS else 1
+    return '.'.join(labels[-suffix - 1:])
+
+
+def hostname_keys(hostname: str) -> List[str]:
+    """
+    List the index keys a hostname is matched under.
+
+    These are the hostname, each parent domain, and the entity forms
+    ("example.*") used by filters that apply to every public suffix.
+
+    Args:
+        hostname: Hostname to expand
+
+    Returns:
+        Hostname keys, most specific first
+    """
+    labels = hostname.split('.')
+    keys = ['.'.join(labels[i:]) for i in range(len(labels))]
+    if '.' in hostname:
+        base = base_domain(hostname)
+        suffix_labels = len(labels) - len(base.split('.')) + 1
+        entity_labels = labels[:suffix_labels]
+        keys.extend('.'.join(entity_labels[i:]) + '.*' for i in range(len(entity_labels)))
+    return keys
+
+
+def domain_list_matches(entries: Tuple[str, ...], hostname: str) -> bool:
+    """
+    Check a hostname against a '|' separated domain option.
+
+    Args:
+        entries: Domain entries, negated ones prefixed with '~'
+        hostname: Hostname to check
+
+    Returns:
+        True if the hostname is included and not excluded
+    """
+    keys = set(hostname_keys(hostname))
+    included = False
+    has_positive = False
+    for entry in entries:
+        if entry.startswith('~'):
+            if entry[1:] in keys:
+                return False
+        else:
+            has_positive = True
+            included = included or entry in keys
+    return included or not has_positive
+
+
+class Request:
+    """A request to match, with the context its filters may depend on."""
+
+    __slots__ = ('url', 'url_lower', 'hostname', 'origin', 'origin_hostname', 'request_type', 'party')
+
+    def __init__(self, url: str, origin: Optional[str] = None, request_type: Optional[str] = None):
+        """
+        Initialize the request.
+
+        Args:
+            url: Request URL, or a bare hostname
+            origin: URL or hostname of the document making the request
+            request_type: Request type, such as "script" or "xmlhttprequest"
+        """
+        if '://' not in url:
+            url = f"https://{url}/"
+        self.url = url
+        self.url_lower = url.lower()
+        self.hostname = (urlsplit(self.url_lower).hostname or '').rstrip('.')
+
+        self.origin = origin
+        self.origin_hostname = None
+        if origin:
+            self.origin_hostname = (urlsplit(origin.lower() if '://' in origin else f"https://{origin.lower()}/").hostname or '').rstrip('.')
+
+        self.request_type = None
+        if request_type:
+            request_type = request_type.lower()
+            self.request_type = RuleCanonicalizer.OPTION_ALIASES.get(request_type, request_type)
+
+        self.party = None
+        if self.origin_hostname:
+            self.party = '1p' if base_domain(self.hostname) == base_domain(self.origin_hostname) else '3p'
+
+    @property
+    def document_hostname(self) -> str:
+        """Hostname of the page cosmetic filters apply to."""
+        return self.origin_hostname or self.hostname
+
+
+class NetworkFilter:
+    """A parsed network filter and the constraints it places on requests."""
+
+    __slots__ = (
+        'rule', 'exception', 'important', 'modifier', 'types', 'excluded_types',
+        'party', 'domains', 'to', 'denyallow', 'pattern', 'match_case', '_regex'
+    )
+
+    def __init__(self, rule: str):
+        """
+        Parse a network filter.
+
+        Args:
+            rule: Network filter text
+
+        Raises:
+            ValueError: If the filter is disabled or cannot be matched
+        """
+        self.rule = rule
+        self.exception = rule.startswith('@@')
+        body = rule[2:] if self.exception else rule
+
+        hosts_entry = HOSTS_ENTRY_PATTERN.match(body)
+        if hosts_entry:
+            body = f"||{hosts_entry.group(1)}^"
+
+        self.pattern, options = RuleCanonicalizer.split_options(body)
+        self.important = self.modifier = self.match_case = False
+        self.types: frozenset = frozenset()
+        self.excluded_types: frozenset = frozenset()
+        self.party = None
+        self.domains = self.to = self.denyallow = ()
+        self._regex = None
+
+        if options:
+            self._parse_options(options)
+
+    def _parse_options(self, options: str) -> None:
+        """
+        Parse the options part of the filter.
+
+        Args:
+            options: Raw options string without the leading '$'
+
+        Raises:
+            ValueError: If the filter is disabled by $badfilter
+        """
+        types, excluded_types = set(), set()
+        for option in options.split(','):
+            name, _, value = option.strip().partition('=')
+            name = name.lower()
+            negated = name.startswith('~')
+            base_name = name[1:] if negated else name
+            base_name = RuleCanonicalizer.OPTION_ALIASES.get(base_name, base_name)
+
+            if base_name == 'badfilter':
+                raise ValueError("filter is disabled by $badfilter")
+            if base_name in REQUEST_TYPES:
+                (excluded_types if negated else types).add(base_name)
+            elif base_name == 'all':
+                types.update(REQUEST_TYPES)
+            elif base_name in ('1p', '3p'):
+                self.party = base_name if not negated else ('3p' if base_name == '1p' else '1p')
+            elif base_name == 'domain':
+                self.domains = tuple(value.lower().split('|'))
+            elif base_name == 'to':
+                self.to = tuple(value.lower().split('|'))
+            elif base_name == 'denyallow':
+                self.denyallow = tuple(value.lower().split('|'))
+            elif base_name == 'important':
+                self.important = True
+            elif base_name == 'match-case':
+                self.match_case = True
+            elif base_name in MODIFIER_OPTIONS:
+                self.modifier = True
+
+        self.types = frozenset(types)
+        self.excluded_types = frozenset(excluded_types)
+
+    @property
+    def regex(self) -> re.Pattern:
+        """Pattern compiled to a regular expression on first use."""
+        if self._regex is None:
+            self._regex = self._compile()
+        return self._regex
+
+    def _compile(self) -> re.Pattern:
+        """
+        Compile the filter pattern to a regular expression.
+
+        Returns:
+            Compiled pattern
+        """
+        flags = 0 if self.match_case else re.IGNORECASE
+        pattern = self.pattern
+        if len(pattern) > 2 and pattern.startswith('/') and pattern.endswith('/'):
+            return re.compile(pattern[1:-1], flags)
+
+        prefix = suffix = ''
+        if pattern.startswith('||'):
+            prefix, pattern = r'^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?', pattern[2:]
+        elif pattern.startswith('|'):
+            prefix, pattern = '^', pattern[1:]
+        if pattern.endswith('|'):
+            suffix, pattern = '$', pattern[:-1]
+
+        parts = []
+        for char in pattern:
+            if char == '*':
+                parts.append('.*')
+            elif char == '^':
+                parts.append(r'(?:[^0-9a-z_.%-]|$)')
+            else:
+                parts.append(re.escape(char))
+        return re.compile(prefix + ''.join(parts) + suffix, flags)
+
+    def tokens(self) -> List[str]:
+        """
+        List the tokens every URL matched by the filter must contain.
+
+        A token qualifies only if it cannot be part of a longer token in a
+        matching URL, so it must be bounded by separators or anchors.
+
+        Returns:
+            Qualifying tokens, lowercased
+        """
+        pattern = self.pattern.lower()
+        if len(pattern) > 2 and pattern.startswith('/') and pattern.endswith('/'):
+            return []
+
+        left_anchored = pattern.startswith('|')
+        right_anchored = pattern.endswith('|')
+        body = pattern.strip('|')
+
+        tokens = []
+        for match in TOKEN_PATTERN.finditer(body):
+            start, end = match.span()
+            left_ok = body[start - 1] != '*' if start > 0 else left_anchored
+            right_ok = body[end] != '*' if end < len(body) else right_anchored
+            if left_ok and right_ok:
+                tokens.append(match.group())
+        return tokens
+
+    def hostname(self) -> Optional[str]:
+        """
+        Get the hostname of a pure hostname filter such as "||example.com^".
+
+        Returns:
+            Hostname, or None if the filter has any other pattern
+        """
+        if not self.pattern.startswith('||') or not self.pattern.endswith('^'):
+            return None
+        hostname = self.pattern[2:-1].lower()
+        return hostname if HOSTNAME_PATTERN.match(hostname) else None
+
+    def matches(self, request: Request, check_pattern: bool = True) -> bool:
+        """
+        Check whether the filter applies to a request.
+
+        Args:
+            request: Request to check
+            check_pattern: False when the index already proved the pattern matches
+
+        Returns:
+            True if the filter applies
+        """
+        if request.request_type:
+            if self.types and request.request_type not in self.types:
+                return False
+            if request.request_type in self.excluded_types:
+                return False
+        if self.party and request.party and self.party != request.party:
+            return False
+        if self.domains and request.origin_hostname and not domain_list_matches(self.domains, request.origin_hostname):
+            return False
+        if self.to and not domain_list_matches(self.to, request.hostname):
+            return False
+        if self.denyallow and domain_list_matches(self.denyallow, request.hostname):
+            return False
+        if not check_pattern:
+            return True
+        return self.regex.search(request.url if self.match_case else request.url_lower) is not None
+
+
+class MatchTester:
+    """Index of a generated list that answers which rules apply to a request."""
+
+    def __init__(self, rule_sources: Optional[Dict[str, str]] = None):
+        """
+        Initialize an empty index.
+
+        Args:
+            rule_sources: Mapping of rule to the source that contributed it
+        """
+        self.rule_sources = rule_sources or {}
+        self.hostname_filters: Dict[str, List[NetworkFilter]] = defaultdict(list)
+        self.token_filters: Dict[str, List[NetworkFilter]] = defaultdict(list)
+        self.generic_filters: List[NetworkFilter] = []
+        self.cosmetic_rules: Dict[str, List[str]] = defaultdict(list)
+        self.skipped = 0
+        self.rule_count = 0
+
+    @classmethod
+    def from_files(cls, list_path: str, provenance_path: Optional[str] = None) -> 'MatchTester':
+        """
+        Build an index from a generated list and its provenance file.
+
+        Args:
+            list_path: Path of the generated list
+            provenance_path: Path of the tab separated rule to source file, if any
+
+        Returns:
+            Populated match tester
+        """
+        rule_sources = {}
+        if provenance_path and Path(provenance_path).exists():
+            with open(provenance_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    rule, _, source = line.rstrip('\n').rpartition('\t')
+                    if rule:
+                        rule_sources[rule] = source
+
+        tester = cls(rule_sources)
+        with open(list_path, 'r', encoding='utf-8') as f:
+            tester.add_rules(line.rstrip('\r\n') for line in f)
+        return tester
+
+    def add_rules(self, rules: Iterable[str]) -> None:
+        """
+        Index rules.
+
+        Args:
+            rules: Rules to index, comments and blank lines are skipped
+        """
+        for rule in rules:
+            if not rule or rule.startswith(('!', '[')) or rule.startswith('#') and not rule.startswith(
+                RuleCanonicalizer.COSMETIC_SEPARATORS
+            ):
+                continue
+            self.rule_count += 1
+
+            if '#' in rule and self._add_cosmetic_rule(rule):
+                continue
+
+            try:
+                network_filter = NetworkFilter(rule)
+            except ValueError:
+                self.skipped += 1
+                continue
+            self._add_network_filter(network_filter)
+
+    def _add_cosmetic_rule(self, rule: str) -> bool:
+        """
+        Index a cosmetic, scriptlet or HTML filtering rule under its domains.
+
+        Args:
+            rule: Rule to index
+
+        Returns:
+            True if the rule is a cosmetic rule
+        """
+        for separator in RuleCanonicalizer.COSMETIC_SEPARATORS:
+            if separator in rule:
+                domains = rule.split(separator, 1)[0]
+                for domain in domains.lower().split(','):
+                    domain = domain.strip()
+                    if domain and not domain.startswith('~'):
+                        self.cosmetic_rules[domain].append(rule)
+                return True
+        return False
+
+    def _add_network_filter(self, network_filter: NetworkFilter) -> None:
+        """
+        Index a network filter under its hostname or best token.
+
+        Args:
+            network_filter: Filter to index
+        """
+        hostname = network_filter.hostname()
+        if hostname:
+            self.hostname_filters[hostname].append(network_filter)
+            return
+
+        tokens = network_filter.tokens()
+        if not tokens:
+            self.generic_filters.append(network_filter)
+            return
+
+        # The rarest token keeps buckets small, bad tokens are a last resort
+        best = min(
+            tokens,
+            key=lambda token: (token in RuleCostAnalyzer.BAD_TOKENS, len(self.token_filters.get(token, ())), -len(token))
+        )
+        self.token_filters[best].append(network_filter)
+
+    def candidates(self, request: Request) -> Iterator[Tuple[NetworkFilter, bool]]:
+        """
+        List the filters that may match a request.
+
+        Args:
+            request: Request to look up
+
+        Yields:
+            Tuples of (filter, whether its pattern still needs checking)
+        """
+        for key in hostname_keys(request.hostname):
+            for network_filter in self.hostname_filters.get(key, ()):
+                yield network_filter, False
+
+        seen = set()
+        for token in TOKEN_PATTERN.findall(request.url_lower):
+            if token in seen:
+                continue
+            seen.add(token)
+            for network_filter in self.token_filters.get(token, ()):
+                yield network_filter, True
+
+        for network_filter in self.generic_filters:
+            yield network_filter, True
+
+    def match(self, request: Request) -> Dict:
+        """
+        Find the rules that apply to a request.
+
+        Args:
+            request: Request to match
+
+        Returns:
+            Match result with the verdict and the applying rules and their sources
+        """
+        blocks, exceptions, modifiers = [], [], []
+        important = False
+        for network_filter, check_pattern in self.candidates(request):
+            if not network_filter.matches(request, check_pattern):
+                continue
+            if network_filter.modifier:
+                modifiers.append(network_filter.rule)
+            elif network_filter.exception:
+                exceptions.append(network_filter.rule)
+            else:
+                blocks.append(network_filter.rule)
+                important = important or network_filter.important
+
+        if blocks and (important or not exceptions):
+            verdict = 'blocked'
+        elif blocks:
+            verdict = 'allowed'
+        else:
+            verdict = 'no match'
+
+        cosmetic = []
+        for key in hostname_keys(request.document_hostname):
+            cosmetic.extend(self.cosmetic_rules.get(key, ()))
+
+        return {
+            'url': request.url,
+            'origin': request.origin,
+            'type': request.request_type,
+            'verdict': verdict,
+            'block': self._with_sources(blocks),
+            'exception': self._with_sources(exceptions),
+            'modifier': self._with_sources(modifiers),
+            'cosmetic': self._with_sources(cosmetic)
+        }
+
+    def _with_sources(self, rules: List[str]) -> List[Dict[str, str]]:
+        """
+        Attach the contributing source to each rule.
+
+        Args:
+            rules: Rules to annotate
+
+        Returns:
+            Rules with their sources, "unknown" if the provenance is missing
+        """
+        return [{'rule': rule, 'source': self.rule_sources.get(rule, 'unknown')} for rule in rules]
+
+
+def read_queries(lines: Iterable[str], origin: Optional[str], request_type: Optional[str]) -> Iterator[Request]:
+    """
+    Parse query lines of the form "url [origin] [type]".
+
+    Args:
+        lines: Query lines, blank lines and "#" comments are skipped
+        origin: Origin for queries that do not give one
+        request_type: Request type for queries that do not give one
+
+    Yields:
+        Parsed requests
+    """
+    for line in lines:
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+        yield Request(
+            fields[0],
+            fields[1] if len(fields) > 1 and fields[1] != '-' else origin,
+            fields[2] if len(fields) > 2 else request_type
+        )
+
+
+def main() -> int:
+    """Command line entry point of the match tester."""
+    parser = argparse.ArgumentParser(description="Report which rules of a generated list match requests.")
+    parser.add_argument('urls', nargs='*', help="URLs or hostnames to test")
+    parser.add_argument('--list', default='ublock-unified-list.txt', help="generated list to load")
+    parser.add_argument('--sources', default='reports/rule_sources.tsv', help="rule provenance file written by the generator")
+    parser.add_argument('--input', help="file of queries, one 'url [origin] [type]' per line, '-' for stdin")
+    parser.add_argument('--origin', help="document origin for queries that do not give one")
+    parser.add_argument('--type', dest='request_type', help="request type for queries that do not give one")
+    parser.add_argument('--compare', metavar='LIST', help="report only queries whose verdict differs against this list")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    tester = MatchTester.from_files(args.list, args.sources)
+    other = MatchTester.from_files(args.compare, args.sources) if args.compare else None
+    print(f"Indexed {tester.rule_count} rules in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    lines: Iterable[str] = args.urls
+    if args.input:
+        lines = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+
+    started = time.perf_counter()
+    queries = differences = 0
+    for request in read_queries(lines, args.origin, args.request_type):
+        queries += 1
+        result = tester.match(request)
+        if other is None:
+            print(json.dumps(result))
+            continue
+
+        other_result = other.match(request)
+        if result['verdict'] != other_result['verdict']:
+            differences += 1
+            print(json.dumps({'url': request.url, 'origin': request.origin, 'type': request.request_type,
+                              'verdict': result['verdict'], 'compare_verdict': other_result['verdict'],
+                              'block': result['block'], 'compare_block': other_result['block'],
+                              'exception': result['exception'], 'compare_exception': other_result['exception']}))
+
+    elapsed = time.perf_counter() - started
+    rate = queries / elapsed if elapsed else 0
+    print(f"Matched {queries} queries in {elapsed:.2f}s ({rate:.0f} queries/s)", file=sys.stderr)
+    if other is not None:
+        print(f"{differences} of {queries} verdicts differ", file=sys.stderr)
+        return 1 if differences else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
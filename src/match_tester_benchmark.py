@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Match Tester Benchmark for uBlock Unified List Generator
+
+This module times how long the match tester takes to index a list and
+how many queries it then answers per second. The list is a generated
+list given on the command line or a synthetic one of mixed rule kinds,
+and the queries mix requests to blocked hosts, URLs carrying filter
+tokens and misses, with and without an origin and request type.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from typing import List
+
+from match_tester import MatchTester, Request
+
+
+# Request types given to typed queries
+REQUEST_TYPES = ('script', 'image', 'xmlhttprequest', 'stylesheet', 'sub_frame')
+
+
+def generate_list(count: int, seed: int) -> List[str]:
+    """
+    Generate a synthetic list of mixed rule kinds.
+
+    Args:
+        count: Number of rules
+        seed: Random seed
+
+    Returns:
+        Rules of the list
+    """
+    generator = random.Random(seed)
+    rules = []
+    for i in range(count):
+        kind = generator.random()
+        if kind < 0.45:
+            rules.append(f"||ads{i}.tracker{i % 977}.example{i % 13}.com^")
+        elif kind < 0.6:
+            rules.append(f"||cdn{i}.net^$script,third-party,domain=site{i % 5000}.com")
+        elif kind < 0.7:
+            rules.append(f"/banner{i}/*/ads.$image")
+        elif kind < 0.75:
+            rules.append(f"@@||static{i}.example.net^$image")
+        elif kind < 0.95:
+            rules.append(f"site{i % 5000}.com##.ad-slot-{i}")
+        else:
+            rules.append(f"0.0.0.0 host{i}.example.org")
+    return rules
+
+
+def generate_queries(rules: List[str], count: int, seed: int) -> List[Request]:
+    """
+    Generate queries hitting hosts and tokens of the list, and misses.
+
+    Args:
+        rules: Rules of the list
+        count: Number of queries
+        seed: Random seed
+
+    Returns:
+        Requests to match
+    """
+    generator = random.Random(seed)
+    hosts = [match.group(1) for rule in rules if (match := re.match(r'^(?:@@)?\|\|([a-z0-9.-]+)\^', rule))]
+    paths = [rule.split('/')[1] for rule in rules if rule.startswith('/')]
+    queries = []
+    for i in range(count):
+        kind = generator.random()
+        if kind < 0.4 and hosts:
+            url = f"https://{generator.choice(hosts)}/script{i}.js"
+        elif kind < 0.6 and paths:
+            url = f"https://img{i % 50}.example.com/{generator.choice(paths)}/x/ads.gif"
+        else:
+            url = f"https://www.news{i % 300}.com/article/{i}/index.html"
+        origin = f"https://site{generator.randrange(5000)}.com/" if generator.random() < 0.7 else None
+        request_type = generator.choice(REQUEST_TYPES) if generator.random() < 0.7 else None
+        queries.append(Request(url, origin, request_type))
+    return queries
+
+
+def main() -> int:
+    """Command line entry point of the match tester benchmark."""
+    parser = argparse.ArgumentParser(description="Time indexing a list and answering queries with the match tester.")
+    parser.add_argument('--list', help="generated list to load instead of a synthetic one")
+    parser.add_argument('--rules', type=int, default=500_000, help="rules of the synthetic list")
+    parser.add_argument('--queries', type=int, default=20_000, help="number of queries")
+    parser.add_argument('--seed', type=int, default=11, help="random seed of the list and queries")
+    args = parser.parse_args()
+
+    if args.list:
+        with open(args.list, 'r', encoding='utf-8') as f:
+            rules = [line.rstrip('\r\n') for line in f]
+    else:
+        rules = generate_list(args.rules, args.seed)
+    queries = generate_queries(rules, args.queries, args.seed)
+
+    started = time.perf_counter()
+    tester = MatchTester()
+    tester.add_rules(rules)
+    indexed = time.perf_counter() - started
+
+    verdicts = {}
+    started = time.perf_counter()
+    for request in queries:
+        verdict = tester.match(request)['verdict']
+        verdicts[verdict] = verdicts.get(verdict, 0) + 1
+    matched = time.perf_counter() - started
+
+    print(f"indexed {tester.rule_count} rules in {indexed:.2f} s ({tester.skipped} skipped)")
+    print(f"answered {len(queries)} queries in {matched:.2f} s, {len(queries) / matched:,.0f} queries/s")
+    print("verdicts: " + ", ".join(f"{verdict} {count}" for verdict, count in sorted(verdicts.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
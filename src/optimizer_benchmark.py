@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Optimizer Benchmark for uBlock Unified List Generator
+
+This module times RuleOptimizer on a synthetic mix of network, cosmetic
+and hosts rules, a fraction of which need one of the optimizer's rewrites,
+rule by rule and in batch mode. Each run prints a digest of the output, so
+two trees or modes can be checked to produce the same list.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import argparse
+import hashlib
+import math
+import random
+import sys
+import time
+from typing import Callable, List
+
+from error_handler import ErrorHandler
+from logger import UnifiedLogger
+from rule_optimizer import RuleOptimizer
+
+
+# Builders of clean rules of each kind, from a rule number
+RULE_KINDS: List[Callable[[int], str]] = [
+    lambda i: f"||ads{i}.tracker{i % 977}.example.com^",
+    lambda i: f"||cdn{i}.net^$script,third-party,domain=site{i % 5000}.com|a{i % 7}.org",
+    lambda i: f"example{i % 3000}.com##.ad-banner-{i}",
+    lambda i: f"##div[id^=\"sponsor{i}\"] > .promo",
+    lambda i: f"0.0.0.0 host{i}.example.org",
+    lambda i: f"/banner/{i}/*/ads.$image",
+    lambda i: f"@@||static{i}.example.net^$image",
+]
+
+# Edits that each give a rule something for the optimizer to rewrite
+DIRTY_EDITS: List[Callable[[str], str]] = [
+    lambda rule: rule.replace('^', '^^'),
+    lambda rule: rule + '**',
+    lambda rule: rule + '  ',
+    lambda rule: '||*.' + rule.lstrip('|'),
+]
+
+
+def generate_rules(count: int, dirty: float, seed: int) -> List[str]:
+    """
+    Generate a reproducible rule mix.
+
+    Args:
+        count: Number of rules
+        dirty: Fraction of rules edited to need a rewrite
+        seed: Random seed
+
+    Returns:
+        Rules, followed by comments and empty lines making up 1% of count
+    """
+    generator = random.Random(seed)
+    rules = [generator.choice(RULE_KINDS)(i) for i in range(count)]
+    for i in generator.sample(range(count), int(count * dirty)):
+        rules[i] = generator.choice(DIRTY_EDITS)(rules[i])
+    return rules + ['! comment'] * (count // 200) + [''] * (count // 200)
+
+
+def main() -> int:
+    """Command line entry point of the optimizer benchmark."""
+    parser = argparse.ArgumentParser(description="Time RuleOptimizer per rule and in batch mode.")
+    parser.add_argument('--rules', type=int, default=400_000, help="number of generated rules")
+    parser.add_argument('--dirty', type=float, default=0.02, help="fraction of rules that need a rewrite")
+    parser.add_argument('--batch-sizes', default='0,1024,4096,16384',
+                        help="comma-separated optimizer_batch_size values, 0 for rule by rule")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per mode, the fastest is kept")
+    parser.add_argument('--seed', type=int, default=7, help="random seed of the rule mix")
+    args = parser.parse_args()
+
+    rules = generate_rules(args.rules, args.dirty, args.seed)
+    logger = UnifiedLogger("OptimizerBenchmark")
+    error_handler = ErrorHandler(logger)
+    # The optimizer logs a summary per run, which is not what is timed
+    logger.logger.disabled = True
+
+    print(f"{'batch size':<12}{'rules/s':>12}{'output':>10}  digest")
+    for batch_size in (int(size) for size in args.batch_sizes.split(',')):
+        optimizer = RuleOptimizer(logger, error_handler, batch_size)
+        best = math.inf
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            optimized = optimizer.optimize_rules(rules)
+            best = min(best, time.perf_counter() - started)
+        digest = hashlib.md5('\n'.join(optimized).encode()).hexdigest()[:12]
+        print(f"{batch_size:<12}{len(rules) / best:>12,.0f}{len(optimized):>10}  {digest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
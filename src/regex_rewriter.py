@@ -0,0 +1,243 @@
+import string
+from typing import Dict, List, Optional, Tuple
+
+from rule_canonicalizer import RuleCanonicalizer
+
+
+class _NotPlain(Exception):
+    """Raised while parsing a regex that has no plain filter equivalent."""
+
+
+class RegexRewriter:
+    """Rewrites regex network filters that only spell out plain patterns.
+
+    uBO cannot index regex filters by token, so every one of them is tested
+    against every request. A regex made only of literals, optional parts,
+    alternations, ``.*`` and start or end anchors matches exactly the union
+    of a few plain filters, which uBO indexes by their tokens. Such a filter
+    is replaced by those plain filters, for example ``/(ad|ads)\\.js/``
+    becomes ``ad.js`` and ``ads.js``, and ``/^https?:\\/\\/ads\\.example\\.com\\//``
+    becomes ``|http://ads.example.com/`` and ``|https://ads.example.com/``.
+    Character classes, repetition, shorthand escapes such as ``\\d`` and
+    lookarounds make a filter truly regular, it is left alone.
+    """
+
+    # Characters that stand for themselves in a regex and in a plain filter
+    LITERAL_CHARS = frozenset(string.ascii_letters + string.digits + '-_/:=&%,;@!~\'"<>')
+
+    # Punctuation that is a literal in a regex once escaped, and plain in a filter
+    ESCAPED_CHARS = frozenset('./-?=&:_%+()[]{},;@!~\'"<>')
+
+    # Deepest group nesting parsed, deeper regexes are left alone instead of
+    # exhausting the recursion limit
+    MAX_DEPTH = 16
+
+    def __init__(self, settings: Optional[Dict] = None):
+        """Initialize the regex rewriter.
+
+        Args:
+            settings (Optional[Dict]): The ``regex_rewrite`` settings block.
+        """
+        self.settings = settings or {}
+        # Most plain filters one regex filter may be split into
+        self.max_rules = max(1, self.settings.get('max_rules', 4))
+        # Regex filters rewritten and plain filters written for them
+        self.rewritten = 0
+        self.produced = 0
+
+        self._regex = ''
+        self._position = 0
+        self._depth = 0
+
+    def rewrite(self, rule: str) -> Optional[List[str]]:
+        """Rewrite a regex filter into equivalent plain filters.
+
+        Args:
+            rule (str): Converted rule.
+
+        Returns:
+            Optional[List[str]]: Plain filters matching exactly what the rule
+                matched, with its options, or None if the rule is not a regex
+                filter or has no plain equivalent.
+        """
+        prefix = '@@' if rule.startswith('@@') else ''
+        pattern, options = RuleCanonicalizer.split_options(rule[len(prefix):])
+        # Options holding a regex make the closing slash of the pattern ambiguous
+        if len(pattern) < 3 or pattern[0] != '/' or pattern[-1] != '/' or (options and '/' in options):
+            return None
+
+        try:
+            alternatives = self._parse(pattern[1:-1])
+        except _NotPlain:
+            return None
+
+        plain_patterns: List[str] = []
+        for alternative in alternatives:
+            plain = self._to_plain(alternative)
+            if plain is None:
+                return None
+            if plain not in plain_patterns:
+                plain_patterns.append(plain)
+        # A filter containing an unanchored literal alternative never matches on its own
+        literals = [plain for plain in plain_patterns if '|' not in plain and '*' not in plain]
+        plain_patterns = [
+            plain for plain in plain_patterns
+            if not any(literal != plain and literal in plain.strip('|') for literal in literals)
+        ]
+
+        suffix = f"${options}" if options is not None else ''
+        self.rewritten += 1
+        self.produced += len(plain_patterns)
+        return [f"{prefix}{plain}{suffix}" for plain in plain_patterns]
+
+    def _parse(self, regex: str) -> List[str]:
+        """Expand a regex into the alternatives it matches.
+
+        Alternatives use plain filter syntax: ``*`` for ``.*`` and ``|`` for
+        a start or end anchor, which a valid alternative only has at its ends.
+
+        Args:
+            regex (str): Regex body without the enclosing slashes.
+
+        Returns:
+            List[str]: Alternatives whose union the regex matches.
+
+        Raises:
+            _NotPlain: If the regex has no plain equivalent within max_rules filters.
+        """
+        self._regex = regex
+        self._position = 0
+        self._depth = 0
+        alternatives = self._parse_alternation()
+        if self._position != len(regex):
+            raise _NotPlain()
+        return alternatives
+
+    def _parse_alternation(self) -> List[str]:
+        """Parse branches separated by ``|`` up to the end or a closing parenthesis.
+
+        Returns:
+            List[str]: Alternatives of all branches.
+
+        Raises:
+            _NotPlain: If a branch has no plain equivalent.
+        """
+        alternatives = self._parse_sequence()
+        while self._peek() == '|':
+            self._position += 1
+            alternatives = alternatives + self._parse_sequence()
+            if len(alternatives) > self.max_rules:
+                raise _NotPlain()
+        return alternatives
+
+    def _parse_sequence(self) -> List[str]:
+        """Parse consecutive atoms and their optional ``?`` quantifiers.
+
+        Returns:
+            List[str]: Alternatives of the sequence.
+
+        Raises:
+            _NotPlain: If an atom has no plain equivalent.
+        """
+        alternatives = ['']
+        while self._peek() not in ('', '|', ')'):
+            atom, quantifiable = self._parse_atom()
+            if self._peek() == '?':
+                if not quantifiable:
+                    raise _NotPlain()
+                self._position += 1
+                atom = atom + ['']
+            if self._peek() in ('*', '+', '{', '?'):
+                raise _NotPlain()
+            alternatives = [head + tail for head in alternatives for tail in atom]
+            if len(alternatives) > self.max_rules:
+                raise _NotPlain()
+        return alternatives
+
+    def _parse_atom(self) -> Tuple[List[str], bool]:
+        """Parse one literal, group, ``.*`` or anchor.
+
+        Returns:
+            Tuple[List[str], bool]: Alternatives of the atom, and whether a
+                ``?`` may follow it.
+
+        Raises:
+            _NotPlain: If the atom has no plain equivalent.
+        """
+        char = self._regex[self._position]
+        self._position += 1
+
+        if char in self.LITERAL_CHARS:
+            return [char], True
+        if char == '\\':
+            escaped = self._peek()
+            if escaped not in self.ESCAPED_CHARS or not escaped:
+                raise _NotPlain()
+            self._position += 1
+            return [escaped], True
+        if char == '(':
+            if self._regex.startswith('?:', self._position):
+                self._position += 2
+            elif self._peek() == '?':
+                raise _NotPlain()
+            self._depth += 1
+            if self._depth > self.MAX_DEPTH:
+                raise _NotPlain()
+            alternatives = self._parse_alternation()
+            if self._peek() != ')':
+                raise _NotPlain()
+            self._position += 1
+            self._depth -= 1
+            return alternatives, True
+        if char == '.' and self._peek() == '*':
+            self._position += 1
+            # A lazy .*? matches the same strings
+            if self._peek() == '?':
+                self._position += 1
+            return ['*'], False
+        if char in '^$':
+            return ['|'], False
+        raise _NotPlain()
+
+    def _peek(self) -> str:
+        """Get the next regex character without consuming it.
+
+        Returns:
+            str: Next character, or '' at the end of the regex.
+        """
+        return self._regex[self._position:self._position + 1]
+
+    @staticmethod
+    def _to_plain(alternative: str) -> Optional[str]:
+        """Turn an expanded alternative into a plain filter pattern.
+
+        Args:
+            alternative (str): Alternative in plain filter syntax.
+
+        Returns:
+            Optional[str]: Plain filter pattern, or None if the alternative
+                has an anchor inside it, matches every URL or would be read
+                as something other than a plain filter.
+        """
+        start = alternative.startswith('|')
+        end = len(alternative) > 1 and alternative.endswith('|')
+        body = alternative[1 if start else 0:len(alternative) - 1 if end else len(alternative)]
+        if '|' in body:
+            return None
+
+        # Wildcards next to an anchor or at an unanchored end match nothing extra
+        while '**' in body:
+            body = body.replace('**', '*')
+        if start and body.startswith('*'):
+            start = False
+        if end and body.endswith('*'):
+            end = False
+        body = body.strip('*')
+
+        if not body or body.startswith(('!', '@')):
+            return None
+        plain = f"{'|' if start else ''}{body}{'|' if end else ''}"
+        # A pattern between slashes would be parsed as a regex again
+        if plain.startswith('/') and plain.endswith('/'):
+            return None
+        return plain
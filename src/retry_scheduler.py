@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Retry Scheduler for uBlock Unified List Generator
+
+This module runs fetch jobs on a worker pool and schedules their retries
+without sleeping inside the workers, optionally within a time budget. Failures are classified as retryable
+or fatal, retries back off exponentially with jitter and honor
+Retry-After, and a per-host circuit breaker makes dead hosts fail fast.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+
+from error_handler import SourceError
+
+
+# HTTP status codes worth retrying, everything else in 4xx/5xx is fatal
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Marker yielded by the scheduling loop once the caller's deadline has passed
+_DEADLINE = object()
+
+
+class CircuitOpenError(SourceError):
+    """Exception raised when a host's circuit breaker rejects a request."""
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header value.
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+
+    Returns:
+        Delay in seconds, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def classify_error(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Decide whether a failed attempt is worth retrying.
+
+    Args:
+        error: Exception raised by the attempt
+
+    Returns:
+        Tuple of (retryable, Retry-After delay in seconds or None)
+    """
+    # Look through wrapping exceptions such as SourceError for the root cause
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+
+        retryable = getattr(error, "retryable", None)
+        if retryable is not None:
+            return bool(retryable), None
+
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            retry_after = parse_retry_after(error.response.headers.get("Retry-After"))
+            return status in RETRYABLE_STATUS_CODES, retry_after
+
+        if isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              requests.exceptions.ChunkedEncodingError)):
+            return True, None
+
+        error = error.__cause__ or error.__context__
+
+    return False, None
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker shared by all fetch jobs."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 300):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive retryable failures before a host's circuit opens
+            reset_timeout: Seconds before an open circuit lets a probe request through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._probing: set = set()
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        """
+        Check whether a request to a host may proceed.
+
+        Args:
+            host: Host name of the request
+
+        Returns:
+            True if the circuit is closed, or half-open and no probe is in flight
+        """
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at < self.reset_timeout or host in self._probing:
+                return False
+            self._probing.add(host)
+            return True
+
+    def record_success(self, host: str) -> None:
+        """
+        Close a host's circuit after a successful request.
+
+        Args:
+            host: Host name of the request
+        """
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._probing.discard(host)
+
+    def record_failure(self, host: str) -> None:
+        """
+        Count a retryable failure and open the host's circuit past the threshold.
+
+        Args:
+            host: Host name of the request
+        """
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            self._probing.discard(host)
+            if self._failures[host] >= self.failure_threshold:
+                self._opened_at[host] = time.monotonic()
+    
+    def release(self, host: str) -> None:
+        """
+        End a host's probe without changing its circuit, after an outcome that
+        neither proves nor disproves the host is healthy.
+        
+        Args:
+            host: Host name of the request
+        """
+        with self._lock:
+            self._probing.discard(host)
+    
+    def is_open(self, host: str) -> bool:
+        """
+        Check whether a host's circuit is currently open.
+
+        Args:
+            host: Host name to check
+
+        Returns:
+            True if the circuit is open
+        """
+        with self._lock:
+            return host in self._opened_at
+
+
+class RetryScheduler:
+    """Runs jobs on a worker pool and schedules retries without blocking workers."""
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        """
+        Initialize the retry scheduler.
+
+        Args:
+            max_workers: Number of jobs allowed to run at once
+            max_retries: Maximum number of attempts per job
+            base_delay: Backoff delay in seconds after the first failure
+            max_delay: Upper bound for a single backoff delay
+            breaker: Circuit breaker shared across jobs, created if omitted
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(1, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Compute the exponential backoff delay with jitter.
+
+        Args:
+            attempt: Number of the attempt that just failed, starting at 1
+
+        Returns:
+            Delay in seconds before the next attempt
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def run_iter(
+        self,
+        jobs: Dict[str, Tuple[str, Callable[[], Any]]],
+        deadline: Optional[float] = None,
+        on_late_result: Optional[Callable[[str, Any, Optional[BaseException]], None]] = None
+    ) -> Iterator[Tuple[str, Any, Optional[BaseException]]]:
+        """
+        Run jobs and yield each one's outcome as soon as it is final.
+        
+        When a deadline is given and jobs are still outstanding once it passes,
+        iteration stops and the remaining jobs finish on a background thread,
+        reporting their outcomes through on_late_result.
+
+        Args:
+            jobs: Mapping of job key to tuple of (host, zero-argument callable)
+            deadline: time.monotonic() value after which iteration stops
+            on_late_result: Callback for outcomes of jobs finishing after the deadline
+
+        Yields:
+            Tuples of (job key, result, error), where error is None on success
+        """
+        state = {"deadline": deadline}
+        loop = self._loop(jobs, state)
+        for outcome in loop:
+            if outcome is _DEADLINE:
+                state["deadline"] = None
+                threading.Thread(
+                    target=self._drain, args=(loop, on_late_result), name="retry-scheduler-drain"
+                ).start()
+                return
+            yield outcome
+
+    @staticmethod
+    def _drain(loop: Iterator, on_late_result: Optional[Callable]) -> None:
+        """
+        Run the remaining jobs of a scheduling loop to completion.
+
+        Args:
+            loop: Scheduling loop that passed its deadline
+            on_late_result: Callback for each remaining outcome
+        """
+        for key, result, error in loop:
+            if on_late_result:
+                on_late_result(key, result, error)
+
+    def _loop(self, jobs: Dict[str, Tuple[str, Callable[[], Any]]], state: Dict[str, Any]) -> Iterator:
+        """
+        Scheduling loop behind run_iter.
+
+        Args:
+            jobs: Mapping of job key to tuple of (host, zero-argument callable)
+            state: Mutable loop state holding the current deadline
+
+        Yields:
+            Job outcomes, or the deadline marker once the deadline has passed
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        # Entries are (ready time, submission order, job key, attempt number)
+        pending = [(0.0, order, key, 1) for order, key in enumerate(jobs)]
+        heapq.heapify(pending)
+        sequence = len(pending)
+        running: Dict[Any, Tuple[str, int]] = {}
+        last_errors: Dict[str, BaseException] = {}
+
+        try:
+            while pending or running:
+                now = time.monotonic()
+
+                # Dispatch jobs whose backoff has elapsed
+                while pending and pending[0][0] <= now and len(running) < self.max_workers:
+                    _, _, key, attempt = heapq.heappop(pending)
+                    host, func = jobs[key]
+                    if not self.breaker.allow(host):
+                        error = CircuitOpenError(f"Circuit open for host {host}")
+                        error.__cause__ = last_errors.pop(key, None)
+                        yield key, None, error
+                        continue
+                    running[executor.submit(func)] = (key, attempt)
+
+                deadline = state["deadline"]
+                if deadline is not None and time.monotonic() >= deadline:
+                    yield _DEADLINE
+                    continue
+
+                timeout = None
+                if pending and len(running) < self.max_workers:
+                    timeout = max(0.0, pending[0][0] - time.monotonic())
+                if deadline is not None:
+                    remaining = max(0.0, deadline - time.monotonic())
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+
+                if not running:
+                    if timeout:
+                        time.sleep(timeout)
+                    continue
+
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, attempt = running.pop(future)
+                    host = jobs[key][0]
+                    error = future.exception()
+                    if error is None:
+                        last_errors.pop(key, None)
+                        self.breaker.record_success(host)
+                        yield key, future.result(), None
+                        continue
+
+                    retryable, retry_after = classify_error(error)
+                    # A host asking us to come back later is alive, so only count hard failures
+                    if retryable and retry_after is None:
+                        self.breaker.record_failure(host)
+                    else:
+                        self.breaker.release(host)
+
+                    delay = retry_after if retry_after is not None else self.backoff_delay(attempt)
+                    if not retryable or attempt >= self.max_retries or delay > self.max_delay:
+                        yield key, None, error
+                        continue
+
+                    last_errors[key] = error
+                    heapq.heappush(pending, (time.monotonic() + delay, sequence, key, attempt + 1))
+                    sequence += 1
+        finally:
+            executor.shutdown(wait=False)
+
+    def run(self, jobs: Dict[str, Tuple[str, Callable[[], Any]]]) -> Dict[str, Tuple[Any, Optional[BaseException]]]:
+        """
+        Run jobs to completion.
+
+        Args:
+            jobs: Mapping of job key to tuple of (host, zero-argument callable)
+
+        Returns:
+            Mapping of job key to tuple of (result, error)
+        """
+        return {key: (result, error) for key, result, error in self.run_iter(jobs)}
@@ -0,0 +1,175 @@
+import re
+from typing import List, Optional, Tuple
+
+from scriptlet_canonicalizer import ScriptletCanonicalizer
+
+
+class RuleCanonicalizer:
+    """Rewrites network filters into one canonical form.
+
+    Equivalent filters such as ``||X.com^$script,3p`` and
+    ``||x.com^$third-party,script`` are mapped to the same string, so plain
+    string deduplication catches them. The canonical form uses uBO's short
+    option names, sorted options, sorted and deduplicated domain lists and
+    lowercase hostnames. Scriptlet injections are canonicalized by
+    ``ScriptletCanonicalizer``.
+    """
+
+    COSMETIC_SEPARATORS = ('##', '#@#', '#?#', '#$#', '#@%#', '#%#')
+
+    # Long option names mapped to the uBO short form
+    OPTION_ALIASES = {
+        'first-party': '1p',
+        '~third-party': '1p',
+        'third-party': '3p',
+        '~first-party': '3p',
+        'stylesheet': 'css',
+        'subdocument': 'frame',
+        'xmlhttprequest': 'xhr',
+        'document': 'doc',
+        'generichide': 'ghide',
+        'elemhide': 'ehide',
+        'specifichide': 'shide',
+        'beacon': 'ping',
+        'queryprune': 'removeparam',
+        'from': 'domain'
+    }
+
+    # Options whose value is a '|' separated list with no meaningful order
+    LIST_OPTIONS = frozenset({'domain', 'denyallow', 'to', 'method'})
+
+    # Options whose value is a list of hostnames
+    HOSTNAME_OPTIONS = frozenset({'domain', 'denyallow', 'to'})
+
+    def __init__(self):
+        """Initialize the rule canonicalizer."""
+        self.patterns = {
+            'option': re.compile(r'^~?[a-z0-9_-]+(=[^,]*)?$'),
+            'host_prefix': re.compile(r'^(\|\||\|https?://)([^/^:*|$?]+)', re.IGNORECASE)
+        }
+        self.scriptlets = ScriptletCanonicalizer()
+
+    def canonicalize(self, rule: str) -> str:
+        """Return the canonical form of a network filter.
+
+        Cosmetic and HTML filtering rules are returned unchanged, scriptlet
+        injections get their own canonical form.
+
+        Args:
+            rule (str): Rule to canonicalize.
+
+        Returns:
+            str: Canonical form of the rule.
+        """
+        if '#' in rule and any(separator in rule for separator in self.COSMETIC_SEPARATORS):
+            if '+js(' in rule:
+                return self.scriptlets.canonicalize(rule)
+            return rule
+
+        prefix = ''
+        if rule.startswith('@@'):
+            prefix, rule = '@@', rule[2:]
+
+        pattern, options = self.split_options(rule)
+        pattern = self._lowercase_host(pattern)
+
+        if options is None:
+            return prefix + pattern
+
+        canonical_options = self.canonicalize_options(options)
+        if canonical_options is None:
+            return f"{prefix}{pattern}${options}"
+        if not canonical_options:
+            return prefix + pattern
+        return f"{prefix}{pattern}${','.join(canonical_options)}"
+
+    def canonicalize_options(self, options: str) -> Optional[List[str]]:
+        """Canonicalize the options part of a network filter.
+
+        Args:
+            options (str): Raw options string without the leading '$'.
+
+        Returns:
+            Optional[List[str]]: Sorted canonical options, or None if the options
+                contain values that cannot be safely reordered, such as regexes.
+        """
+        # Regex or escaped values may contain commas that are not separators
+        if '/' in options or '\\' in options:
+            return None
+
+        canonical = set()
+        for option in options.split(','):
+            option = option.strip()
+            if not option:
+                continue
+            if not self.patterns['option'].match(option.lower()):
+                return None
+
+            name, has_value, value = option.partition('=')
+            name = name.lower()
+            name = self.OPTION_ALIASES.get(name, name)
+            negated = name.startswith('~')
+            base_name = name[1:] if negated else name
+            if negated and base_name in self.OPTION_ALIASES:
+                name = '~' + self.OPTION_ALIASES[base_name]
+                base_name = name[1:]
+
+            if has_value and base_name in self.LIST_OPTIONS:
+                value = self._canonicalize_list(value, base_name in self.HOSTNAME_OPTIONS)
+            canonical.add(f"{name}={value}" if has_value else name)
+
+        return sorted(canonical)
+
+    @staticmethod
+    def _canonicalize_list(value: str, hostnames: bool) -> str:
+        """Sort and deduplicate a '|' separated option value.
+
+        Args:
+            value (str): Option value.
+            hostnames (bool): Whether entries are hostnames and may be lowercased.
+
+        Returns:
+            str: Canonical option value.
+        """
+        entries = {entry.strip().lower() if hostnames else entry.strip() for entry in value.split('|')}
+        entries.discard('')
+        entries.discard('~')
+        return '|'.join(sorted(entries, key=lambda entry: (entry.lstrip('~'), entry)))
+
+    def _lowercase_host(self, pattern: str) -> str:
+        """Lowercase the hostname of a host-anchored pattern.
+
+        Args:
+            pattern (str): Network filter pattern.
+
+        Returns:
+            str: Pattern with a lowercase hostname.
+        """
+        if not pattern.startswith('|'):
+            return pattern
+        match = self.patterns['host_prefix'].match(pattern)
+        if not match:
+            return pattern
+        return match.group(1).lower() + match.group(2).lower() + pattern[match.end():]
+
+    @staticmethod
+    def split_options(rule: str) -> Tuple[str, Optional[str]]:
+        """Split a network filter into its pattern and options parts.
+
+        Args:
+            rule (str): Network filter without the exception prefix.
+
+        Returns:
+            Tuple[str, Optional[str]]: Pattern, and options string or None if
+                the filter has no options.
+        """
+        # Regex patterns may legitimately contain '$', options follow the closing slash
+        if rule.startswith('/'):
+            closing = rule.rfind('/')
+            dollar = rule.find('$', closing) if closing > 0 else -1
+        else:
+            dollar = rule.rfind('$')
+
+        if dollar == -1:
+            return rule, None
+        return rule[:dollar], rule[dollar + 1:]
@@ -11,6 +11,14 @@ Author: Murtaza Salih (itsrody)
 import re
 from typing import Dict, List, Any, Tuple, Optional, Set
 from database import UBlockRuleConverter
+from rule_dedup import FingerprintSet
+
+
+# Bits of a dedup reference holding the index within a rule type's list
+RULE_INDEX_BITS = 24
+RULE_INDEX_MASK = (1 << RULE_INDEX_BITS) - 1
+# Largest rule type ID whose references still fit the signed 32-bit slots
+MAX_RULE_TYPE_ID = (1 << (31 - RULE_INDEX_BITS)) - 1
 
 
 class RuleConverter:
@@ -34,7 +42,7 @@ class RuleConverter:
             self.db_converter = UBlockRuleConverter()
             self.logger.debug("Rule converter database initialized")
         except Exception as e:
-            self.error_handler.handle(e, "Failed to initialize rule converter database")
+            self.error_handler.handle_error(e, "initializing rule converter database")
             self.db_converter = None
     
     def process_rules(self, source_lists: Dict[str, Tuple[List[str], Dict[str, Any]]]) -> Dict[int, List[str]]:
@@ -48,7 +56,11 @@ class RuleConverter:
             Dictionary mapping rule type IDs to lists of validated rules
         """
         validated_rules: Dict[int, List[str]] = {}
-        processed_rules: Set[str] = set()  # Track all processed rules to avoid duplication
+        # Track all processed rules to avoid duplication. References encode
+        # the rule type in the high bits and the index in its list below.
+        processed_rules = FingerprintSet(
+            lambda ref: validated_rules[ref >> RULE_INDEX_BITS][ref & RULE_INDEX_MASK]
+        )
         
         # Initialize rule type lists
         for section in self.config.sections:
@@ -68,18 +80,29 @@ class RuleConverter:
                         continue
                     
                     # Convert rule to uBlock Origin syntax
-                    converted_rule, status = self.convert_rule(rule, source_type)
+                    converted_rule, status = self.convert_rule(rule, source_type, source_name)
                     if not converted_rule:
                         continue
                     
                     # Validate and classify the rule
                     rule_type_id = self.classify_rule(converted_rule)
                     if rule_type_id and rule_type_id in validated_rules:
-                        validated_rules[rule_type_id].append(converted_rule)
-                        processed_rules.add(converted_rule)
+                        type_rules = validated_rules[rule_type_id]
+                        if len(type_rules) > RULE_INDEX_MASK or rule_type_id > MAX_RULE_TYPE_ID:
+                            raise OverflowError(
+                                f"Rule type {rule_type_id} with {len(type_rules)} rules does not fit "
+                                f"a {RULE_INDEX_BITS}-bit dedup reference"
+                            )
+                        ref = (rule_type_id << RULE_INDEX_BITS) | len(type_rules)
+                        if processed_rules.add(converted_rule, ref):
+                            type_rules.append(converted_rule)
                     
+                except OverflowError:
+                    raise
                 except Exception as e:
-                    self.error_handler.warn(f"Error processing rule '{rule}': {str(e)}")
+                    self.error_handler.record_diagnostic(
+                        f"Rule processing failed ({type(e).__name__})", source_name, rule
+                    )
         
         # Log statistics
         total_rules = sum(len(rules) for rules in validated_rules.values())
@@ -87,13 +110,14 @@ class RuleConverter:
         
         return validated_rules
     
-    def convert_rule(self, rule: str, source_type: str) -> Tuple[str, str]:
+    def convert_rule(self, rule: str, source_type: str, source_name: str = "") -> Tuple[str, str]:
         """
         Convert a rule to uBlock Origin syntax using the database.
         
         Args:
             rule: Original rule
             source_type: Type of the source (e.g., "AdBlock Plus", "AdGuard")
+            source_name: Name of the source, used to attribute diagnostics
             
         Returns:
             Tuple of (converted rule, status message)
@@ -102,12 +126,20 @@ class RuleConverter:
             return rule, "Database converter not available"
         
         try:
-            return self.db_converter.convert_rule(rule, source_type)
+            converted_rule, status = self.db_converter.convert_rule(rule, source_type)
+            if status == "Unsupported scriptlet":
+                self.error_handler.record_diagnostic(
+                    "Scriptlet has no uBO equivalent", source_name or source_type, rule
+                )
+            return converted_rule, status
         except Exception as e:
-            self.error_handler.warn(f"Conversion error for rule '{rule}': {str(e)}")
+            self.error_handler.record_diagnostic(
+                f"Rule conversion failed ({type(e).__name__})", source_name or source_type, rule
+            )
             return "", "Conversion error"
     
-    def classify_rule(self, rule: str) -> Optional[int]:
+    @staticmethod
+    def classify_rule(rule: str) -> Optional[int]:
         """
         Classify a rule to determine its type.
         
@@ -125,12 +157,21 @@ class RuleConverter:
         if '##' not in rule and '$domain=' in rule:
             return 2
         
+        # Scriptlet injection, HTML filtering and extended CSS rules are
+        # element hiding syntax too, so they must be matched first
+        if '##+js' in rule:
+            return 7
+        if '##^' in rule:
+            return 8
+        if '##' in rule and (':has(' in rule or ':not(' in rule or ':is(' in rule):
+            return 11
+        
         # Element hiding rules (type 3)
         if '##' in rule and not rule.startswith('@@') and '#@#' not in rule and '#?#' not in rule:
             return 3
         
         # Exception rules (type 4)
-        if rule.startswith('@@'):
+        if rule.startswith('@@') or '#@#' in rule:
             return 4
         
         # Regular expression rules (type 5)
@@ -141,22 +182,10 @@ class RuleConverter:
         if '$redirect=' in rule:
             return 15
         
-        # Scriptlet injection rules (type 7)
-        if '##+js' in rule:
-            return 7
-        
-        # HTML filtering rules (type 8)
-        if '##^' in rule:
-            return 8
-        
         # Hosts file format rules (type 9)
         if re.match(r'^(0\.0\.0\.0|127\.0\.0\.1)\s+[a-z0-9.-]+$', rule):
             return 9
         
-        # Extended CSS rules (type 11)
-        if '##' in rule and (':has(' in rule or ':not(' in rule or ':is(' in rule):
-            return 11
-        
         # Network filter options (type 12)
         if '$' in rule and not '$redirect=' in rule and not '$domain=' in rule and not '$removeparam=' in rule:
             return 12
@@ -0,0 +1,297 @@
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from logger import UnifiedLogger
+from error_handler import ErrorHandler
+from rule_canonicalizer import RuleCanonicalizer
+
+
+class RuleCostAnalyzer:
+    """Estimates the runtime matching cost of rules in uBlock Origin.
+
+    uBO indexes network filters by their best literal token. Filters without a
+    usable token end up in generic buckets that are tested against every
+    request, and generic procedural cosmetics or scriptlets run on every page.
+    Scores are relative units in the 0-100 range, higher meaning slower.
+    
+    The ``action`` setting decides what happens beyond the report: ``report``
+    leaves the rules untouched, ``rewrite`` drops pointless wildcards, and
+    ``drop`` removes rules scoring at least ``drop_threshold`` from sources
+    less trusted than ``protected_priority``. Dropped rules are listed in the
+    report so they can be restored upstream.
+    """
+
+    # Tokens uBO considers too common to be useful for indexing
+    BAD_TOKENS = frozenset({
+        'com', 'http', 'https', 'icon', 'images', 'img', 'js', 'net', 'news', 'www'
+    })
+
+    COSMETIC_SEPARATORS = RuleCanonicalizer.COSMETIC_SEPARATORS
+
+    PROCEDURAL_OPERATORS = (
+        ':has-text(', ':matches-css', ':matches-attr(', ':matches-path(',
+        ':min-text-length(', ':others(', ':upward(', ':watch-attr(', ':xpath(',
+        ':-abp-', ':contains(', ':remove(', ':style('
+    )
+
+    # Score assigned to each cost category
+    CATEGORY_COSTS = {
+        'generic_procedural_cosmetic': 100,
+        'generic_no_token': 90,
+        'regex': 70,
+        'generic_scriptlet': 60,
+        'generic_html_filter': 60,
+        'domain_no_token': 40,
+        'short_token': 30,
+        'generic_complex_cosmetic': 25,
+        'bad_token': 20,
+        'specific_cosmetic': 2,
+        'generic_simple_cosmetic': 5,
+        'tokenized': 1
+    }
+
+    def __init__(self, logger: UnifiedLogger, error_handler: ErrorHandler, settings: Optional[Dict] = None):
+        """Initialize the rule cost analyzer.
+
+        Args:
+            logger (UnifiedLogger): Logger instance for analysis reporting.
+            error_handler (ErrorHandler): Error handler for analysis errors.
+            settings (Optional[Dict]): The ``cost_analysis`` settings block.
+        """
+        self.logger = logger
+        self.error_handler = error_handler
+        self.settings = settings or {}
+
+        self.action = self.settings.get('action', 'report')
+        self.drop_threshold = self.settings.get('drop_threshold', 90)
+        self.protected_priority = self.settings.get('protected_priority', 0)
+        self.top_rules = self.settings.get('top_rules', 200)
+        # Source of each rule returned by the last analyze() call
+        self.kept_sources: List[str] = []
+
+        self.patterns = {
+            'token': re.compile(r'[%0-9A-Za-z]+'),
+            'simple_selector': re.compile(r'^[#.][A-Za-z0-9_-]+$|^[a-z]+$')
+        }
+
+    def score_rule(self, rule: str) -> Tuple[int, str]:
+        """Estimate the matching cost of a single rule.
+
+        Args:
+            rule (str): Rule to score.
+
+        Returns:
+            Tuple[int, str]: Cost score and cost category.
+        """
+        for separator in self.COSMETIC_SEPARATORS:
+            if separator in rule:
+                return self._score_cosmetic_rule(rule, separator)
+
+        return self._score_network_rule(rule)
+
+    def _score_cosmetic_rule(self, rule: str, separator: str) -> Tuple[int, str]:
+        """Estimate the cost of a cosmetic, scriptlet or HTML filtering rule.
+
+        Args:
+            rule (str): Cosmetic rule to score.
+            separator (str): Separator between the domain and selector parts.
+
+        Returns:
+            Tuple[int, str]: Cost score and cost category.
+        """
+        domains, selector = rule.split(separator, 1)
+        generic = not domains or all(d.startswith('~') for d in domains.split(','))
+
+        if not generic:
+            category = 'specific_cosmetic'
+        elif selector.startswith('+js('):
+            category = 'generic_scriptlet'
+        elif selector.startswith('^'):
+            category = 'generic_html_filter'
+        elif any(op in selector for op in self.PROCEDURAL_OPERATORS):
+            category = 'generic_procedural_cosmetic'
+        elif self.patterns['simple_selector'].match(selector):
+            category = 'generic_simple_cosmetic'
+        else:
+            category = 'generic_complex_cosmetic'
+
+        return self.CATEGORY_COSTS[category], category
+
+    def _score_network_rule(self, rule: str) -> Tuple[int, str]:
+        """Estimate the cost of a network filter from its best token.
+
+        Args:
+            rule (str): Network rule to score.
+
+        Returns:
+            Tuple[int, str]: Cost score and cost category.
+        """
+        pattern, options = self._split_network_rule(rule)
+
+        if len(pattern) > 2 and pattern.startswith('/') and pattern.endswith('/'):
+            return self.CATEGORY_COSTS['regex'], 'regex'
+
+        # uBO drops pointless leading and trailing wildcards before tokenizing
+        pattern = pattern.strip('*')
+
+        best_token = ''
+        for match in self.patterns['token'].finditer(pattern):
+            start, end = match.span()
+            # Tokens touching a wildcard are partial and cannot be indexed
+            if (start > 0 and pattern[start - 1] == '*') or (end < len(pattern) and pattern[end] == '*'):
+                continue
+            token = match.group().lower()
+            if token in self.BAD_TOKENS:
+                best_token = best_token or token
+                continue
+            if len(token) > len(best_token) or best_token in self.BAD_TOKENS:
+                best_token = token
+
+        if not best_token:
+            category = 'domain_no_token' if 'domain=' in options or 'from=' in options else 'generic_no_token'
+        elif best_token in self.BAD_TOKENS:
+            category = 'bad_token'
+        elif len(best_token) < 3:
+            category = 'short_token'
+        else:
+            category = 'tokenized'
+
+        return self.CATEGORY_COSTS[category], category
+
+    def rewrite_rule(self, rule: str) -> str:
+        """Apply cost-neutral rewrites that shrink a rule without changing what it matches.
+
+        Args:
+            rule (str): Rule to rewrite.
+
+        Returns:
+            str: Rewritten rule.
+        """
+        if any(separator in rule for separator in self.COSMETIC_SEPARATORS):
+            return rule
+
+        prefix = '@@' if rule.startswith('@@') else ''
+        pattern, options = self._split_network_rule(rule)
+        if pattern.startswith('/') and pattern.endswith('/'):
+            return rule
+
+        trimmed = pattern.strip('*')
+        # A bare or regex-looking pattern needs its wildcards to stay unambiguous
+        if not trimmed or trimmed.startswith('|') or trimmed.endswith('|') or (
+            trimmed.startswith('/') and trimmed.endswith('/')
+        ):
+            return rule
+
+        rewritten = prefix + trimmed
+        return f"{rewritten}${options}" if options else rewritten
+
+    def analyze(
+        self,
+        rules: List[str],
+        rule_sources: Dict[str, str],
+        source_priorities: Dict[str, int],
+        build_time: Optional[datetime] = None
+    ) -> List[str]:
+        """Score every rule, write the cost report and apply the configured action.
+
+        Args:
+            rules (List[str]): Optimized rules to analyze.
+            rule_sources (Dict[str, str]): Mapping of rule to the source that contributed it.
+            source_priorities (Dict[str, int]): Mapping of source name to priority.
+            build_time (Optional[datetime]): UTC time stamped in the report, now if omitted.
+
+        Returns:
+            List[str]: Rules to write, rewritten or dropped according to the action.
+        """
+        kept: List[str] = []
+        self.kept_sources = []
+        dropped: List[Dict] = []
+        scored: List[Tuple[int, str, str, str]] = []
+        by_source: Dict[str, Dict] = {}
+        # Rewriting can turn a rule into one already in the list
+        seen = set(rules) if self.action == 'rewrite' else set()
+        
+        for rule in rules:
+            source = rule_sources.get(rule, 'unknown')
+            if self.action == 'rewrite':
+                rewritten = self.rewrite_rule(rule)
+                if rewritten != rule:
+                    if rewritten in seen:
+                        continue
+                    seen.add(rewritten)
+                rule = rewritten
+
+            score, category = self.score_rule(rule)
+            scored.append((score, rule, source, category))
+
+            summary = by_source.setdefault(source, {'rules': 0, 'total_cost': 0, 'categories': {}})
+            summary['rules'] += 1
+            summary['total_cost'] += score
+            summary['categories'][category] = summary['categories'].get(category, 0) + 1
+
+            if (
+                self.action == 'drop'
+                and score >= self.drop_threshold
+                and source_priorities.get(source, 999) > self.protected_priority
+            ):
+                dropped.append({'rule': rule, 'source': source, 'score': score, 'category': category})
+                continue
+
+            kept.append(rule)
+            self.kept_sources.append(source)
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        ranked_sources = sorted(by_source.items(), key=lambda item: -item[1]['total_cost'])
+
+        report = {
+            'generated': (build_time or datetime.utcnow()).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'action': self.action,
+            'total_cost': sum(item[0] for item in scored),
+            'sources': [
+                dict(source=name, average_cost=round(data['total_cost'] / data['rules'], 2), **data)
+                for name, data in ranked_sources
+            ],
+            'worst_rules': [
+                {'rule': rule, 'source': source, 'score': score, 'category': category}
+                for score, rule, source, category in scored[:self.top_rules]
+            ],
+            'dropped': dropped
+        }
+        self._write_report(report)
+
+        if dropped:
+            self.logger.info(f"Dropped {len(dropped)} high-cost rules (threshold {self.drop_threshold})")
+        self.logger.info(f"Estimated matching cost of {len(scored)} rules: {report['total_cost']}")
+        return kept
+
+    def _write_report(self, report: Dict) -> None:
+        """Write the cost report to the configured path.
+
+        Args:
+            report (Dict): Report data to serialize.
+        """
+        report_path = Path(self.settings.get('report_file', 'reports/rule_cost.json'))
+        try:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            self.error_handler.handle_error(e, "writing rule cost report")
+
+    @staticmethod
+    def _split_network_rule(rule: str) -> Tuple[str, str]:
+        """Split a network rule into its pattern and options parts.
+
+        Args:
+            rule (str): Network rule to split.
+
+        Returns:
+            Tuple[str, str]: Pattern without exception prefix, and raw options string.
+        """
+        if rule.startswith('@@'):
+            rule = rule[2:]
+        pattern, options = RuleCanonicalizer.split_options(rule)
+        return pattern, options or ''
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Rule Deduplication for uBlock Unified List Generator
+
+This module provides compact membership structures for deduplicating
+millions of rules. Rules are keyed on 64-bit fingerprints stored in flat
+arrays instead of a hash set of full strings; the caller keeps the rules
+themselves, and a fingerprint match is confirmed by comparing against the
+stored rule so collisions never drop a distinct rule.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+from array import array
+from typing import Callable, Optional
+
+
+class BloomFilter:
+    """Bloom filter over 64-bit fingerprints, used as a cheap negative pre-check."""
+
+    def __init__(self, capacity: int, bits_per_item: int = 10, hash_count: int = 7):
+        """
+        Initialize the Bloom filter.
+
+        Args:
+            capacity: Expected number of items
+            bits_per_item: Filter bits per expected item, 10 gives about 1% false positives
+            hash_count: Number of bit positions set per item
+        """
+        self.size = max(64, capacity * bits_per_item)
+        self.hash_count = hash_count
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def clear(self) -> None:
+        """Remove all fingerprints from the filter."""
+        self._bits = bytearray(len(self._bits))
+
+    def add(self, fingerprint: int) -> None:
+        """
+        Add a fingerprint to the filter.
+
+        Bit positions are derived from the fingerprint by double hashing.
+
+        Args:
+            fingerprint: 64-bit fingerprint
+        """
+        bits, size = self._bits, self.size
+        position = fingerprint & 0xFFFFFFFF
+        step = (fingerprint >> 32) & 0xFFFFFFFF | 1
+        for _ in range(self.hash_count):
+            position = (position + step) % size
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def might_contain(self, fingerprint: int) -> bool:
+        """
+        Check whether a fingerprint may have been added.
+
+        Args:
+            fingerprint: 64-bit fingerprint
+
+        Returns:
+            False if the fingerprint was definitely never added
+        """
+        bits, size = self._bits, self.size
+        position = fingerprint & 0xFFFFFFFF
+        step = (fingerprint >> 32) & 0xFFFFFFFF | 1
+        for _ in range(self.hash_count):
+            position = (position + step) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class FingerprintSet:
+    """Open-addressing set of rule fingerprints with exact collision fallback.
+
+    Each slot holds a 64-bit fingerprint and a 32-bit reference to where the
+    caller stored the rule, 12 bytes per slot in total. ``resolve`` maps a
+    reference back to the rule so fingerprint collisions are settled by
+    exact comparison.
+    """
+
+    MAX_LOAD = 0.7
+
+    def __init__(
+        self,
+        resolve: Callable[[int], str],
+        capacity: int = 1024,
+        bloom: Optional[BloomFilter] = None
+    ):
+        """
+        Initialize the fingerprint set.
+
+        Args:
+            resolve: Callable returning the rule stored under a reference
+            capacity: Expected number of rules, the table grows beyond it
+            bloom: Optional Bloom filter consulted before probing the table
+        """
+        self.resolve = resolve
+        self.bloom = bloom
+        self._count = 0
+        self._allocate(max(16, int(capacity / self.MAX_LOAD)))
+
+    def _allocate(self, slots: int) -> None:
+        """
+        Allocate an empty table of at least the given number of slots.
+
+        Args:
+            slots: Minimum number of slots
+        """
+        size = 1 << (slots - 1).bit_length()
+        self._mask = size - 1
+        self._limit = int(size * self.MAX_LOAD)
+        self._fingerprints = array('q', bytes(8 * size))
+        self._refs = array('i', bytes(4 * size))
+
+    @staticmethod
+    def fingerprint(rule: str) -> int:
+        """
+        Compute the 64-bit fingerprint of a rule.
+
+        str hashes are cached on the string object, so this is free for
+        rules that were hashed before. Zero marks empty slots and is
+        remapped.
+
+        Args:
+            rule: Rule to fingerprint
+
+        Returns:
+            Non-zero 64-bit fingerprint
+        """
+        return hash(rule) or 1
+
+    def _find(self, rule: str, fingerprint: int) -> int:
+        """
+        Find the slot holding a rule, or the empty slot where it belongs.
+
+        Args:
+            rule: Rule to look up
+            fingerprint: Fingerprint of the rule
+
+        Returns:
+            Slot index, holding either the rule or a zero fingerprint
+        """
+        fingerprints = self._fingerprints
+        mask = self._mask
+        index = fingerprint & mask
+        while True:
+            stored = fingerprints[index]
+            if stored == 0:
+                return index
+            if stored == fingerprint and self.resolve(self._refs[index]) == rule:
+                return index
+            index = (index + 1) & mask
+
+    def add(self, rule: str, ref: int) -> bool:
+        """
+        Add a rule unless it is already present.
+
+        Args:
+            rule: Rule to add
+            ref: Reference the caller stores the rule under if it is new
+
+        Returns:
+            True if the rule was added, False if it was a duplicate
+        """
+        fingerprint = hash(rule) or 1
+        if self.bloom is not None:
+            if self.bloom.might_contain(fingerprint):
+                index = self._find(rule, fingerprint)
+                if self._fingerprints[index]:
+                    return False
+            else:
+                index = self._find_empty(fingerprint)
+            self.bloom.add(fingerprint)
+        else:
+            index = self._find(rule, fingerprint)
+            if self._fingerprints[index]:
+                return False
+
+        self._fingerprints[index] = fingerprint
+        self._refs[index] = ref
+        self._count += 1
+        if self._count > self._limit:
+            self._grow()
+        return True
+
+    def _find_empty(self, fingerprint: int) -> int:
+        """
+        Find the first empty slot for a fingerprint known to be absent.
+
+        Args:
+            fingerprint: Fingerprint of the rule
+
+        Returns:
+            Index of an empty slot
+        """
+        fingerprints = self._fingerprints
+        mask = self._mask
+        index = fingerprint & mask
+        while fingerprints[index]:
+            index = (index + 1) & mask
+        return index
+
+    def _grow(self) -> None:
+        """Double the table size and reinsert every entry."""
+        old_fingerprints, old_refs = self._fingerprints, self._refs
+        self._allocate(len(old_fingerprints) * 2)
+        for fingerprint, ref in zip(old_fingerprints, old_refs):
+            if fingerprint:
+                index = self._find_empty(fingerprint)
+                self._fingerprints[index] = fingerprint
+                self._refs[index] = ref
+
+    def get(self, rule: str) -> Optional[int]:
+        """
+        Look up the reference a rule is stored under.
+
+        Args:
+            rule: Rule to look up
+
+        Returns:
+            Reference passed when the rule was added, or None if it is absent
+        """
+        fingerprint = hash(rule) or 1
+        if self.bloom is not None and not self.bloom.might_contain(fingerprint):
+            return None
+        index = self._find(rule, fingerprint)
+        return self._refs[index] if self._fingerprints[index] else None
+
+    def __contains__(self, rule: str) -> bool:
+        fingerprint = hash(rule) or 1
+        if self.bloom is not None and not self.bloom.might_contain(fingerprint):
+            return False
+        return self._fingerprints[self._find(rule, fingerprint)] != 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        """Remove all entries and release the table."""
+        self._count = 0
+        self._allocate(16)
+        if self.bloom is not None:
+            self.bloom.clear()
@@ -1,56 +1,181 @@
 import re
-from typing import List, Set, Dict, Optional
+from array import array
+from typing import Callable, Iterator, List, Optional, Tuple
 from logger import UnifiedLogger
 from error_handler import ErrorHandler, RuleError
+from rule_dedup import FingerprintSet
+from rule_canonicalizer import RuleCanonicalizer
 
 class RuleOptimizer:
     """Optimizer for uBlock Origin filter rules."""
     
-    def __init__(self, logger: UnifiedLogger, error_handler: ErrorHandler):
+    def __init__(self, logger: UnifiedLogger, error_handler: ErrorHandler, batch_size: int = 0):
         """Initialize the rule optimizer.
         
         Args:
             logger (UnifiedLogger): Logger instance for optimization reporting.
             error_handler (ErrorHandler): Error handler for optimization errors.
+            batch_size (int): Rules per substitution pass in batch mode, 0 to
+                optimize rule by rule.
         """
         self.logger = logger
         self.error_handler = error_handler
-        self.optimized_rules: Set[str] = set()
+        self.batch_size = batch_size
+        self.optimized_rules = FingerprintSet(lambda ref: ref)
+        self.canonicalizer = RuleCanonicalizer()
+        # Index of the input rule each optimized rule came from
+        self.origins = array('i')
+        # Index of the optimized rule each input rule became, -1 if dropped
+        self.merged_into = array('i')
         
-        # Compile regex patterns for rule validation and optimization
+        # Compile regex patterns for rule optimization. Every pattern is only
+        # run after a plain substring check shows it can change the rule,
+        # which is false for the vast majority of rules. None of them
+        # backtracks, so a pattern runs in time linear in the rule length.
         self.patterns = {
-            'comment': re.compile(r'^!.*'),
-            'empty': re.compile(r'^\s*$'),
-            'invalid': re.compile(r'[^\x00-\x7F]'),  # Non-ASCII characters
-            'whitespace': re.compile(r'\s+$'),  # Trailing whitespace
             'duplicate_caret': re.compile(r'\^+'),  # Multiple consecutive carets
             'duplicate_asterisk': re.compile(r'\*+'),  # Multiple consecutive asterisks
-            'duplicate_separator': re.compile(r'[,\^]{2,}')  # Multiple separators
+            'duplicate_separator': re.compile(r'[,\^]{2,}'),  # Multiple separators
+            'domain_part': re.compile(r'\|\|[^/]*'),  # "||ads*.example.com" up to the path
+            'domain_wildcard_label': re.compile(r'\*\.([a-z])'),  # "*.example.com"
+            'child_combinator': re.compile(r' ?> ?'),  # Runs on whitespace already collapsed
+            'selector_whitespace': re.compile(r'\s+')
         }
     
-    def optimize_rules(self, rules: List[str]) -> List[str]:
+    def optimize_rules(
+        self,
+        rules: List[str],
+        source_of: Optional[Callable[[int], str]] = None,
+        map_inputs: bool = False
+    ) -> List[str]:
         """Optimize a list of filter rules for uBlock Origin.
         
         Args:
             rules (List[str]): List of rules to optimize.
+            source_of (Optional[Callable[[int], str]]): Maps a rule's index to
+                its source name, used to attribute diagnostics.
+            map_inputs (bool): Also record in merged_into which optimized rule
+                every input rule became, including the duplicates.
         
         Returns:
             List[str]: Optimized rules list.
         """
-        self.optimized_rules.clear()
         optimized: List[str] = []
+        self.optimized_rules = FingerprintSet(optimized.__getitem__, capacity=len(rules))
+        self.origins = array('i')
+        merged_into = array('i', [-1]) * len(rules) if map_inputs else None
         
-        for rule in rules:
+        for index, optimized_rule in self._optimize_indexed(rules, source_of or (lambda index: "")):
+            if self.optimized_rules.add(optimized_rule, len(optimized)):
+                if merged_into is not None:
+                    merged_into[index] = len(optimized)
+                optimized.append(optimized_rule)
+                self.origins.append(index)
+            elif merged_into is not None:
+                merged_into[index] = self.optimized_rules.get(optimized_rule)
+        self.merged_into = merged_into if merged_into is not None else array('i')
+        
+        self.logger.info(f"Optimized {len(rules)} rules to {len(optimized)} unique rules")
+        return optimized
+    
+    def iter_optimized(self, rules: List[str], source: str = "") -> Iterator[str]:
+        """Optimize rules without deduplicating them.
+        
+        Used when deduplication happens downstream, such as in the on-disk
+        rule store.
+        
+        Args:
+            rules (List[str]): List of rules to optimize.
+            source (str): Name of the source the rules came from.
+        
+        Yields:
+            str: Optimized form of each kept rule.
+        """
+        for _, optimized_rule in self._optimize_indexed(rules, lambda index: source):
+            yield optimized_rule
+    
+    def _optimize_indexed(self, rules: List[str], source_of: Callable[[int], str]) -> Iterator[Tuple[int, str]]:
+        """Optimize rules one at a time or in batches, as configured.
+        
+        Args:
+            rules (List[str]): List of rules to optimize.
+            source_of (Callable[[int], str]): Maps a rule's index to its source name.
+        
+        Yields:
+            Tuple[int, str]: Input index and optimized form of each kept rule.
+        """
+        if self.batch_size > 0:
+            return self._optimize_batches(rules, source_of)
+        return self._optimize_each(rules, source_of)
+    
+    def _record_failure(self, error: RuleError, source: str) -> None:
+        """Count a rule the optimizer had to drop.
+        
+        Args:
+            error (RuleError): Error raised for the rule, with the problem and rule as args.
+            source (str): Name of the source the rule came from.
+        """
+        problem, *example = error.args
+        self.error_handler.record_diagnostic(problem, source, example[0] if example else None)
+    
+    def _optimize_each(self, rules: List[str], source_of: Callable[[int], str]) -> Iterator[Tuple[int, str]]:
+        """Optimize rules one at a time.
+        
+        Args:
+            rules (List[str]): List of rules to optimize.
+            source_of (Callable[[int], str]): Maps a rule's index to its source name.
+        
+        Yields:
+            Tuple[int, str]: Input index and optimized form of each kept rule.
+        """
+        for index, rule in enumerate(rules):
             try:
                 if optimized_rule := self._optimize_rule(rule):
-                    if optimized_rule not in self.optimized_rules:
-                        optimized.append(optimized_rule)
-                        self.optimized_rules.add(optimized_rule)
+                    yield index, optimized_rule
             except RuleError as e:
-                self.error_handler.handle_warning(f"Rule optimization failed: {str(e)}")
+                self._record_failure(e, source_of(index))
+    
+    def _optimize_batches(self, rules: List[str], source_of: Callable[[int], str]) -> Iterator[Tuple[int, str]]:
+        """Optimize rules in chunks, collapsing separators once per chunk.
         
-        self.logger.info(f"Optimized {len(rules)} rules to {len(optimized)} unique rules")
-        return optimized
+        The separator substitutions never match across a newline, so running
+        them over newline-joined chunks gives the same result as running them
+        per rule, with one pass over a large string instead of many small calls.
+        
+        Args:
+            rules (List[str]): List of rules to optimize.
+            source_of (Callable[[int], str]): Maps a rule's index to its source name.
+        
+        Yields:
+            Tuple[int, str]: Input index and optimized form of each kept rule.
+        """
+        for start in range(0, len(rules), self.batch_size):
+            indexes: List[int] = []
+            prepared: List[str] = []
+            for index in range(start, min(start + self.batch_size, len(rules))):
+                try:
+                    rule = self._prepare_rule(rules[index])
+                except RuleError as e:
+                    self._record_failure(e, source_of(index))
+                    continue
+                if rule is None:
+                    continue
+                # A rule spanning lines would shift every rule after it in the chunk
+                if '\n' in rule:
+                    rule = self._collapse_separators(rule)
+                    if optimized_rule := self._finish_rule(rule):
+                        yield index, optimized_rule
+                    continue
+                indexes.append(index)
+                prepared.append(rule)
+            
+            collapsed = self._collapse_separators('\n'.join(prepared)).split('\n')
+            for index, rule in zip(indexes, collapsed):
+                try:
+                    if optimized_rule := self._finish_rule(rule):
+                        yield index, optimized_rule
+                except RuleError as e:
+                    self._record_failure(e, source_of(index))
     
     def _optimize_rule(self, rule: str) -> Optional[str]:
         """Optimize a single filter rule.
@@ -61,30 +186,72 @@ class RuleOptimizer:
         Returns:
             Optional[str]: Optimized rule or None if rule should be discarded.
         """
+        rule = self._prepare_rule(rule)
+        if rule is None:
+            return None
+        return self._finish_rule(self._collapse_separators(rule))
+    
+    def _prepare_rule(self, rule: str) -> Optional[str]:
+        """Drop comments and empty lines, validate and strip a rule.
+        
+        Args:
+            rule (str): Rule to prepare.
+        
+        Returns:
+            Optional[str]: Stripped rule or None if rule should be discarded.
+        
+        Raises:
+            RuleError: If the rule contains non-ASCII characters.
+        """
         # Skip comments and empty lines
-        if self.patterns['comment'].match(rule) or self.patterns['empty'].match(rule):
+        if not rule or rule[0] == '!' or rule.isspace():
             return None
         
         # Check for invalid characters
-        if self.patterns['invalid'].search(rule):
-            raise RuleError(f"Rule contains invalid characters: {rule}")
+        if not rule.isascii():
+            raise RuleError("Rule contains invalid characters", rule)
         
         # Remove trailing whitespace
-        rule = self.patterns['whitespace'].sub('', rule)
+        return rule.rstrip()
+    
+    def _collapse_separators(self, text: str) -> str:
+        """Collapse repeated carets, asterisks and separators.
         
-        # Optimize separators and wildcards
-        rule = self.patterns['duplicate_caret'].sub('^', rule)
-        rule = self.patterns['duplicate_asterisk'].sub('*', rule)
-        rule = self.patterns['duplicate_separator'].sub(',', rule)
+        Args:
+            text (str): Rule, or newline-joined rules in batch mode.
         
+        Returns:
+            str: Text with repeated separators collapsed.
+        """
+        if '^^' in text:
+            text = self.patterns['duplicate_caret'].sub('^', text)
+        if '**' in text:
+            text = self.patterns['duplicate_asterisk'].sub('*', text)
+        if ',,' in text or ',^' in text or '^,' in text:
+            text = self.patterns['duplicate_separator'].sub(',', text)
+        return text
+    
+    def _finish_rule(self, rule: str) -> Optional[str]:
+        """Apply the type-specific optimizations and canonicalize a rule.
+        
+        Args:
+            rule (str): Rule with separators already collapsed.
+        
+        Returns:
+            Optional[str]: Optimized rule or None if rule should be discarded.
+        """
         # Optimize domain rules
         if rule.startswith('||'):
             rule = self._optimize_domain_rule(rule)
         
-        # Optimize element hiding rules
-        elif '##' in rule:
+        # Optimize element hiding rules, scriptlet arguments are left to the canonicalizer
+        elif '##' in rule and '##+js(' not in rule:
             rule = self._optimize_element_hiding_rule(rule)
         
+        # Rewrite network filters to their canonical form so equivalent
+        # filters deduplicate to a single rule
+        rule = self.canonicalizer.canonicalize(rule)
+        
         return rule if rule else None
     
     def _optimize_domain_rule(self, rule: str) -> str:
@@ -96,14 +263,37 @@ class RuleOptimizer:
         Returns:
             str: Optimized domain rule.
         """
+        # Both rewrites need a wildcard label, which most domain rules lack
+        if '*.' not in rule:
+            return rule
+        
         # Remove unnecessary wildcards after domain separator
-        rule = re.sub(r'\|\|([^/]+)\*\.', r'||\1.', rule)
+        rule = self.patterns['domain_part'].sub(self._drop_wildcard_suffix, rule)
         
         # Optimize domain wildcards
-        rule = re.sub(r'\*\.[a-z]', lambda m: m.group()[2:], rule)
+        rule = self.patterns['domain_wildcard_label'].sub(r'\1', rule)
         
         return rule
     
+    @staticmethod
+    def _drop_wildcard_suffix(match: re.Match) -> str:
+        """Drop the wildcard of the last ``*.`` in a domain part, as in ``||ads*.example.com``.
+        
+        Searching the domain part once replaces a backtracking regex, which
+        restarted from every ``||`` and took quadratic time on rules
+        repeating it.
+        
+        Args:
+            match (re.Match): Domain part from ``||`` up to the first ``/``.
+        
+        Returns:
+            str: Domain part without the wildcard, unchanged if it has none
+                after its first label character.
+        """
+        domain = match.group()
+        index = domain.rfind('*.', 3)
+        return domain if index < 0 else domain[:index] + domain[index + 1:]
+    
     def _optimize_element_hiding_rule(self, rule: str) -> str:
         """Optimize an element hiding rule.
         
@@ -117,12 +307,13 @@ class RuleOptimizer:
         try:
             domains, selector = rule.split('##', 1)
         except ValueError:
-            raise RuleError(f"Invalid element hiding rule format: {rule}")
+            raise RuleError("Invalid element hiding rule format", rule)
         
-        # Optimize selector
-        selector = re.sub(r'\s*>\s*', '>', selector)  # Remove spaces around child combinator
-        selector = re.sub(r'\s+', ' ', selector)  # Normalize whitespace
-        selector = selector.strip()
+        # Optimize selector, only whitespace can change it
+        if self.patterns['selector_whitespace'].search(selector):
+            selector = self.patterns['selector_whitespace'].sub(' ', selector)  # Normalize whitespace
+            selector = self.patterns['child_combinator'].sub('>', selector)  # Remove spaces around child combinator
+            selector = selector.strip()
         
         # Reconstruct rule
         return f"{domains}##{selector}" if domains else f"##{selector}"
\ No newline at end of file
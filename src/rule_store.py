@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Rule Store for uBlock Unified List Generator
+
+This module provides an on-disk SQLite table for builds larger than RAM.
+Rules are streamed in with bulk inserts, deduplicated by a UNIQUE key on
+their canonical text and read back in output order from an index, so peak
+memory does not grow with the size of the merged corpus.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+class RuleStore:
+    """SQLite-backed rule table with priority-aware deduplication."""
+
+    SCHEMA = '''
+    CREATE TABLE rules (
+        id INTEGER PRIMARY KEY,
+        rule TEXT NOT NULL UNIQUE,
+        rule_type INTEGER NOT NULL,
+        section INTEGER NOT NULL,
+        domain TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        position INTEGER NOT NULL
+    )
+    '''
+
+    # The highest priority source (lowest number) owns a duplicated rule,
+    # whatever order the sources were stored in
+    UPSERT = '''
+    INSERT INTO rules (rule, rule_type, section, domain, priority, source, position)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(rule) DO UPDATE SET
+        priority = excluded.priority, source = excluded.source, position = excluded.position
+    WHERE excluded.priority < rules.priority
+    '''
+
+    def __init__(self, path: str, batch_size: int = 10000, cache_size_kib: int = 16384):
+        """
+        Initialize the rule store.
+
+        Args:
+            path: Path of the SQLite database file, recreated on every build
+            batch_size: Rules buffered before each bulk insert
+            cache_size_kib: SQLite page cache size per connection in KiB
+        """
+        self.path = Path(path)
+        self.batch_size = max(1, batch_size)
+        self.cache_size_kib = cache_size_kib
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[Tuple[str, int, int, str, int, str, int]] = []
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a connection with the store's pragmas applied.
+
+        Returns:
+            SQLite connection
+        """
+        conn = sqlite3.connect(self.path)
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_kib}")
+        conn.execute("PRAGMA temp_store = FILE")
+        return conn
+
+    def open(self) -> None:
+        """Create an empty store, discarding the table of a previous build."""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        for suffix in ('', '-wal', '-shm'):
+            Path(f"{self.path}{suffix}").unlink(missing_ok=True)
+
+        self._conn = self._connect()
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        # The store is rebuilt from the cache on every run, durability is not needed
+        self._conn.execute("PRAGMA synchronous = OFF")
+        self._conn.execute(self.SCHEMA)
+        self._conn.commit()
+
+    def add(
+        self, rule: str, rule_type: int, section: int, domain: str, priority: int, source: str, position: int
+    ) -> None:
+        """
+        Queue a rule for insertion.
+
+        Args:
+            rule: Canonical rule text, the deduplication key
+            rule_type: Rule type ID
+            section: Index of the output section the rule belongs to
+            domain: Reversed hostname used to order rules within a section
+            priority: Priority of the source that contributed the rule
+            source: Name of the source that contributed the rule
+            position: Index of the rule within its source
+        """
+        self._pending.append((rule, rule_type, section, domain, priority, source, position))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Insert all queued rules in one transaction."""
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(self.UPSERT, self._pending)
+        self._pending.clear()
+
+    def finish(self) -> None:
+        """Flush queued rules and build the indexes used to read them back."""
+        self.flush()
+        # Indexes are cheaper to build once than to maintain during the bulk load
+        with self._conn:
+            self._conn.execute(
+                "CREATE INDEX rules_output_order ON rules (section, rule_type, domain, rule)"
+            )
+            self._conn.execute("CREATE INDEX rules_priority ON rules (priority, source, position)")
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def delete(self, rules: Iterable[str]) -> None:
+        """
+        Remove rules from the store.
+
+        Args:
+            rules: Canonical rule texts to remove
+        """
+        with self._conn:
+            self._conn.executemany("DELETE FROM rules WHERE rule = ?", ((rule,) for rule in rules))
+
+    def count(self) -> int:
+        """
+        Count the stored rules.
+
+        Returns:
+            Number of unique rules
+        """
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+        finally:
+            conn.close()
+
+    def iter_ordered(self) -> Iterator[Tuple[int, str]]:
+        """
+        Stream rules in output order.
+
+        Rules are ordered by section, rule type, reversed hostname and rule
+        text, read through the output order index. The cursor uses its own
+        connection, so it may be consumed on another thread.
+
+        Yields:
+            Tuples of (section index, rule)
+        """
+        conn = self._connect()
+        try:
+            yield from conn.execute(
+                "SELECT section, rule FROM rules ORDER BY section, rule_type, domain, rule"
+            )
+        finally:
+            conn.close()
+
+    def iter_rules(self) -> Iterator[Tuple[str, str, int]]:
+        """
+        Stream rules in source priority order, each source's rules in their
+        original order, whatever order the sources were stored in.
+
+        Yields:
+            Tuples of (rule, source name, source priority)
+        """
+        conn = self._connect()
+        try:
+            yield from conn.execute("SELECT rule, source, priority FROM rules ORDER BY priority, source, position")
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        """Close the writer connection, keeping the database file."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Rule Store Benchmark for uBlock Unified List Generator
+
+This module builds a list from generated overlapping sources twice, once
+in memory and once through the on-disk rule store, and reports the peak
+resident set size and wall time of each build. The sources are served
+from a local HTTP server so the builds go through the normal fetch path,
+and the two generated lists are compared for identical content.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+SRC_DIR = Path(__file__).resolve().parent
+
+# Runs main.py in this interpreter and reports its peak RSS in KiB on stderr
+CHILD = """
+import resource, runpy, sys
+sys.path.insert(0, {src!r})
+sys.argv = [{main!r}]
+try:
+    runpy.run_path({main!r}, run_name='__main__')
+finally:
+    print(f"maxrss={{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}", file=sys.stderr)
+"""
+
+# Header lines that differ between two builds of the same list
+VOLATILE_HEADERS = ('! Last Updated:',)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    """Static file handler that does not log requests."""
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def write_sources(directory: Path, count: int, rules_per_source: int, overlap: float, seed: int) -> None:
+    """
+    Write overlapping uBlock Origin sources of mixed rule kinds.
+
+    Args:
+        directory: Directory to write source0.txt, source1.txt, ... to
+        count: Number of sources
+        rules_per_source: Rules in each source
+        overlap: Fraction of each source's rules shared with the next one
+        seed: Random seed
+    """
+    generator = random.Random(seed)
+    step = max(1, int(rules_per_source * (1 - overlap)))
+    for index in range(count):
+        lines = ['! Title: Benchmark source']
+        for i in range(index * step, index * step + rules_per_source):
+            kind = generator.random()
+            if kind < 0.5:
+                lines.append(f"||ads{i}.tracker{i % 977}.example{i % 13}.com^")
+            elif kind < 0.7:
+                lines.append(f"site{i % 5000}.com##.ad-slot-{i}")
+            elif kind < 0.85:
+                lines.append(f"||cdn{i}.net^$script,third-party,domain=site{i % 5000}.com")
+            else:
+                lines.append(f"0.0.0.0 host{i}.example.org")
+        (directory / f"source{index}.txt").write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def write_config(path: Path, base_url: str, count: int, rule_store: bool) -> None:
+    """
+    Write a configuration building the generated sources.
+
+    The repository's sources.json is used for everything else, with cost
+    analysis, exports and variants turned off since the rule store skips them.
+
+    Args:
+        path: Path of the configuration file to write
+        base_url: URL the sources are served from
+        count: Number of sources
+        rule_store: Build through the rule store
+    """
+    with open(SRC_DIR.parent / 'sources.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    settings = config['settings']
+    settings['output_file'] = 'list.txt'
+    settings['cost_analysis'] = {'enabled': False}
+    settings['rule_store'] = dict(settings.get('rule_store', {}), enabled=rule_store, path='cache/rules.db')
+    settings.pop('exports', None)
+    config.pop('variants', None)
+    config['sources'] = [
+        {
+            'name': f"Source {index}", 'type': 'uBlock Origin', 'url': f"{base_url}/source{index}.txt",
+            'enabled': True, 'priority': index + 1
+        }
+        for index in range(count)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+
+
+def run_build(directory: Path) -> Tuple[int, float]:
+    """
+    Run a build in a fresh interpreter.
+
+    Args:
+        directory: Working directory holding sources.json
+
+    Returns:
+        Peak RSS in KiB and wall time in seconds
+
+    Raises:
+        RuntimeError: If the build fails
+    """
+    main = str(SRC_DIR / 'main.py')
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD.format(src=str(SRC_DIR), main=main)],
+        cwd=directory, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"build in {directory} failed:\n{result.stdout[-2000:]}{result.stderr[-2000:]}")
+    maxrss = [line for line in result.stderr.splitlines() if line.startswith('maxrss=')][-1]
+    return int(maxrss.split('=', 1)[1]), elapsed
+
+
+def read_list(path: Path) -> List[str]:
+    """
+    Read a generated list without the header lines that change between builds.
+
+    Args:
+        path: Path of the generated list
+
+    Returns:
+        Lines of the list
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line for line in f if not line.startswith(VOLATILE_HEADERS)]
+
+
+def main() -> int:
+    """Command line entry point of the rule store benchmark."""
+    parser = argparse.ArgumentParser(description="Compare peak memory of in-memory and rule store builds.")
+    parser.add_argument('--sources', type=int, default=4, help="number of generated sources")
+    parser.add_argument('--rules-per-source', type=int, default=150_000, help="rules in each source")
+    parser.add_argument('--overlap', type=float, default=0.6,
+                        help="fraction of each source's rules shared with the next one")
+    parser.add_argument('--seed', type=int, default=3, help="random seed of the sources")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp:
+        root = Path(temp)
+        lists = root / 'lists'
+        lists.mkdir()
+        write_sources(lists, args.sources, args.rules_per_source, args.overlap, args.seed)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=str(lists)))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        results: Dict[str, Tuple[int, float]] = {}
+        try:
+            for mode in ('in memory', 'rule store'):
+                directory = root / mode.replace(' ', '_')
+                directory.mkdir()
+                write_config(directory / 'sources.json', base_url, args.sources, mode == 'rule store')
+                results[mode] = run_build(directory)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        identical = read_list(root / 'in_memory' / 'list.txt') == read_list(root / 'rule_store' / 'list.txt')
+
+    print(f"{args.sources * args.rules_per_source} input rules from {args.sources} sources")
+    for mode, (maxrss, elapsed) in results.items():
+        print(f"{mode:<12}peak RSS {maxrss / 1024:>7.0f} MiB{elapsed:>9.1f} s")
+    print(f"outputs {'identical' if identical else 'DIFFER'}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+from typing import Dict, List, Optional
+
+
+class ScriptletCanonicalizer:
+    """Rewrites scriptlet injection rules into one canonical uBO form.
+
+    uBO accepts several names for most scriptlets (``abort-on-property-read``,
+    ``aopr`` and ``aopr.js`` are the same scriptlet) and AdGuard lists write
+    the same injections as ``#%#//scriptlet(...)``. Every form is mapped to
+    ``domains##+js(name, args)`` with uBO's short scriptlet name, sorted
+    domains and uniform argument separators, so duplicates across sources
+    collapse to one rule. Names are resolved from tables built once, without
+    any per-rule regex.
+    """
+
+    # uBO scriptlets by canonical name, with the other names uBO accepts
+    UBO_SCRIPTLETS = {
+        'acs': ('abort-current-script', 'abort-current-inline-script', 'acis'),
+        'aopr': ('abort-on-property-read',),
+        'aopw': ('abort-on-property-write',),
+        'aost': ('abort-on-stack-trace',),
+        'aeld': ('addEventListener-defuser', 'prevent-addEventListener'),
+        'aell': ('addEventListener-logger',),
+        'nano-sib': ('nano-setInterval-booster', 'adjust-setInterval'),
+        'nano-stb': ('nano-setTimeout-booster', 'adjust-setTimeout'),
+        'noeval-if': ('prevent-eval-if',),
+        'no-fetch-if': ('prevent-fetch',),
+        'no-xhr-if': ('prevent-xhr',),
+        'nosiif': ('no-setInterval-if', 'prevent-setInterval', 'setInterval-defuser'),
+        'nostif': ('no-setTimeout-if', 'prevent-setTimeout', 'setTimeout-defuser'),
+        'norafif': ('no-requestAnimationFrame-if', 'prevent-requestAnimationFrame'),
+        'nowoif': ('no-window-open-if', 'prevent-window-open', 'window.open-defuser'),
+        'ra': ('remove-attr',),
+        'rc': ('remove-class',),
+        'rmnt': ('remove-node-text',),
+        'set': ('set-constant',),
+        'trusted-set': ('trusted-set-constant',),
+        'cookie-remover': ('remove-cookie',),
+        'alert-buster': (),
+        'call-nothrow': (),
+        'disable-newtab-links': (),
+        'evaldata-prune': (),
+        'href-sanitizer': (),
+        'json-prune': (),
+        'json-prune-fetch-response': (),
+        'json-prune-xhr-response': (),
+        'm3u-prune': (),
+        'no-floc': (),
+        'noeval': (),
+        'nowebrtc': (),
+        'overlay-buster': (),
+        'refresh-defuser': (),
+        'set-attr': (),
+        'set-cookie': (),
+        'set-local-storage-item': (),
+        'set-session-storage-item': (),
+        'silent-noeval': (),
+        'spoof-css': (),
+        'trusted-click-element': (),
+        'trusted-replace-fetch-response': (),
+        'trusted-replace-xhr-response': (),
+        'trusted-set-cookie': (),
+        'trusted-set-local-storage-item': (),
+        'window-close-if': (),
+        'window.name-defuser': (),
+        'xml-prune': ()
+    }
+
+    # AdGuard scriptlet names that are not uBO names, mapped to their uBO equivalent
+    ADGUARD_ALIASES = {
+        'log-addEventListener': 'aell',
+        'prevent-refresh': 'refresh-defuser',
+        'close-window': 'window-close-if'
+    }
+
+    # Characters uBO accepts around a quoted scriptlet argument
+    QUOTES = ('\'', '"', '`')
+
+    def __init__(self):
+        """Initialize the scriptlet canonicalizer."""
+        self.names: Dict[str, str] = {}
+        for name, aliases in self.UBO_SCRIPTLETS.items():
+            self.names[name] = name
+            for alias in aliases:
+                self.names[alias] = name
+        self.adguard_names = dict(self.names, **self.ADGUARD_ALIASES)
+
+    def canonical_name(self, name: str, adguard: bool = False) -> Optional[str]:
+        """Resolve a scriptlet name to its canonical uBO name.
+
+        Args:
+            name (str): Scriptlet name as written in the rule.
+            adguard (bool): Whether the name comes from an AdGuard scriptlet rule.
+
+        Returns:
+            Optional[str]: Canonical name. Unknown uBO names are returned without
+                their ``.js`` suffix, unknown AdGuard names as None.
+        """
+        name = name.strip()
+        if name.endswith('.js'):
+            name = name[:-3]
+        if not adguard:
+            return self.names.get(name, name)
+        # AdGuard refers to uBO scriptlets by their name with a 'ubo-' prefix
+        if name.startswith('ubo-'):
+            name = name[4:]
+        return self.adguard_names.get(name)
+
+    def canonicalize(self, rule: str) -> str:
+        """Return the canonical form of a uBO scriptlet rule.
+
+        Rules that are not ``##+js(...)`` or ``#@#+js(...)`` injections, or whose
+        arguments cannot be parsed, are returned unchanged.
+
+        Args:
+            rule (str): Rule to canonicalize.
+
+        Returns:
+            str: Canonical form of the rule.
+        """
+        separator = '#@#+js(' if '#@#+js(' in rule else '##+js('
+        domains, found, body = rule.partition(separator)
+        if not found or not body.endswith(')'):
+            return rule
+
+        args = self.split_arguments(body[:-1])
+        if args is None:
+            return rule
+        name = self.canonical_name(args[0]) if args[0] else ''
+        return self._format(domains, separator, name, args[1:])
+
+    def convert_adguard(self, rule: str) -> Optional[str]:
+        """Convert an AdGuard scriptlet rule to its canonical uBO form.
+
+        Args:
+            rule (str): ``#%#//scriptlet(...)`` or ``#@%#//scriptlet(...)`` rule.
+
+        Returns:
+            Optional[str]: Converted rule, or None if the rule is malformed or
+                the scriptlet has no uBO equivalent.
+        """
+        if '#@%#//scriptlet(' in rule:
+            domains, _, body = rule.partition('#@%#//scriptlet(')
+            separator = '#@#+js('
+        else:
+            domains, found, body = rule.partition('#%#//scriptlet(')
+            if not found:
+                return None
+            separator = '##+js('
+
+        # Domain modifiers such as [$path=...] have no uBO counterpart
+        if domains.startswith('[') or not body.endswith(')'):
+            return None
+        values = self._parse_adguard_arguments(body[:-1])
+        if values is None:
+            return None
+
+        # An empty exception disables every scriptlet, as '#@#+js()' does in uBO
+        if not values:
+            return self._format(domains, separator, '', []) if separator == '#@#+js(' else None
+
+        name = self.canonical_name(values[0], adguard=True)
+        if name is None:
+            return None
+        return self._format(domains, separator, name, [self._quote(value) for value in values[1:]])
+
+    def split_arguments(self, text: str) -> Optional[List[str]]:
+        """Split the body of a uBO ``+js(...)`` call into its arguments.
+
+        Arguments are kept verbatim, including quotes and escaped commas, only
+        the whitespace around them is removed.
+
+        Args:
+            text (str): Text between the parentheses.
+
+        Returns:
+            Optional[List[str]]: Scriptlet name followed by its arguments, or None
+                if a quoted argument is not terminated properly.
+        """
+        if '\\' not in text and not any(quote in text for quote in self.QUOTES):
+            return [arg.strip() for arg in text.split(',')]
+
+        args = []
+        index, length = 0, len(text)
+        while True:
+            while index < length and text[index].isspace():
+                index += 1
+            start = index
+            if index < length and text[index] in self.QUOTES:
+                quote = text[index]
+                index += 1
+                while index < length and text[index] != quote:
+                    index += 2 if text[index] == '\\' else 1
+                if index >= length:
+                    return None
+                index += 1
+                args.append(text[start:index])
+                while index < length and text[index].isspace():
+                    index += 1
+                if index < length and text[index] != ',':
+                    return None
+            else:
+                while index < length and text[index] != ',':
+                    index += 2 if text[index] == '\\' else 1
+                args.append(text[start:index].rstrip())
+            if index >= length:
+                return args
+            index += 1
+
+    def _parse_adguard_arguments(self, text: str) -> Optional[List[str]]:
+        """Parse the quoted arguments of an AdGuard ``//scriptlet(...)`` call.
+
+        Args:
+            text (str): Text between the parentheses.
+
+        Returns:
+            Optional[List[str]]: Unquoted scriptlet name and arguments, or None
+                if the arguments are not a comma separated list of quoted strings.
+        """
+        values = []
+        index, length = 0, len(text)
+        while index < length and text[index].isspace():
+            index += 1
+        while index < length:
+            quote = text[index]
+            if quote not in ('\'', '"'):
+                return None
+            index += 1
+            chars = []
+            while index < length and text[index] != quote:
+                # Only the quote itself is escaped, other backslashes belong to the value
+                if text[index] == '\\' and index + 1 < length and text[index + 1] == quote:
+                    index += 1
+                chars.append(text[index])
+                index += 1
+            if index >= length:
+                return None
+            values.append(''.join(chars))
+            index += 1
+            while index < length and text[index].isspace():
+                index += 1
+            if index < length:
+                if text[index] != ',':
+                    return None
+                index += 1
+                while index < length and text[index].isspace():
+                    index += 1
+        return values
+
+    def _quote(self, value: str) -> str:
+        """Write an argument value in uBO syntax.
+
+        Args:
+            value (str): Unquoted argument value.
+
+        Returns:
+            str: Value as written inside ``+js(...)``.
+        """
+        if value and value == value.strip() and value[0] not in self.QUOTES and ',' not in value:
+            return value
+        for quote in self.QUOTES:
+            if quote not in value:
+                return f"{quote}{value}{quote}"
+        return value.replace(',', '\\,')
+
+    @staticmethod
+    def _format(domains: str, separator: str, name: str, args: List[str]) -> str:
+        """Assemble a scriptlet rule from its parts.
+
+        Args:
+            domains (str): Comma separated domain list, may be empty.
+            separator (str): ``##+js(`` or ``#@#+js(``.
+            name (str): Canonical scriptlet name.
+            args (List[str]): Arguments as written inside ``+js(...)``.
+
+        Returns:
+            str: Scriptlet rule.
+        """
+        # Regex hostnames may contain commas, other domain lists have no meaningful order
+        if ',' in domains and '/' not in domains:
+            entries = {entry.strip().lower() for entry in domains.split(',')}
+            entries.discard('')
+            domains = ','.join(sorted(entries, key=lambda entry: (entry.lstrip('~'), entry)))
+        elif '/' not in domains:
+            domains = domains.strip().lower()
+        return f"{domains}{separator}{', '.join([name, *args])})"
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Snapshot Archive for uBlock Unified List Generator
+
+This module records the source bodies a build consumed, with their
+headers, into a compressed, content-addressed archive, and serves them
+back so a past build can be replayed without network access. Bodies are
+stored once per SHA-256 digest and shared between snapshots; each
+snapshot is a small JSON manifest naming the bodies of its sources.
+
+Author: Murtaza Salih (itsrody)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from error_handler import SourceError
+
+
+# Response headers kept with each recorded body
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Expires", "Cache-Control", "Date")
+
+
+class SnapshotArchive:
+    """Content-addressed store of source bodies and per-build manifests."""
+
+    def __init__(self, root: str, snapshot_id: str, manifest: Dict[str, Any], read_only: bool):
+        """
+        Initialize the snapshot archive. Use create() or open() instead.
+
+        Args:
+            root: Archive directory
+            snapshot_id: Identifier of the snapshot being recorded or replayed
+            manifest: Snapshot manifest
+            read_only: True when replaying an existing snapshot
+        """
+        self.root = Path(root)
+        self.snapshot_id = snapshot_id
+        self.manifest = manifest
+        self.read_only = read_only
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, root: str) -> "SnapshotArchive":
+        """
+        Start recording a new snapshot.
+
+        Args:
+            root: Archive directory
+
+        Returns:
+            Writable archive for a snapshot named after the current UTC time
+        """
+        created = datetime.now(timezone.utc)
+        snapshot_id = created.strftime("%Y%m%dT%H%M%SZ")
+        manifest = {"id": snapshot_id, "created": created.isoformat(), "sources": {}}
+        return cls(root, snapshot_id, manifest, read_only=False)
+
+    @classmethod
+    def open(cls, root: str, snapshot_id: str = "latest") -> "SnapshotArchive":
+        """
+        Open a recorded snapshot for replay.
+
+        Args:
+            root: Archive directory
+            snapshot_id: Snapshot identifier, "latest", or a manifest path
+
+        Returns:
+            Read-only archive
+
+        Raises:
+            SourceError: If the snapshot does not exist
+        """
+        manifest_path = Path(snapshot_id)
+        if not manifest_path.is_file():
+            manifests_dir = Path(root) / "manifests"
+            if snapshot_id == "latest":
+                manifests = sorted(manifests_dir.glob("*.json")) if manifests_dir.is_dir() else []
+                if not manifests:
+                    raise SourceError(f"No snapshots recorded in {root}")
+                manifest_path = manifests[-1]
+            else:
+                manifest_path = manifests_dir / f"{snapshot_id}.json"
+        if not manifest_path.is_file():
+            raise SourceError(f"Snapshot {snapshot_id} not found in {root}")
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return cls(root, manifest["id"], manifest, read_only=True)
+
+    @property
+    def created(self) -> datetime:
+        """Time the snapshot was recorded."""
+        return datetime.fromisoformat(self.manifest["created"])
+
+    def _object_path(self, digest: str) -> Path:
+        """
+        Get the path of a stored body.
+
+        Args:
+            digest: SHA-256 hex digest of the body
+
+        Returns:
+            Path of the compressed object
+        """
+        return self.root / "objects" / digest[:2] / f"{digest}.gz"
+
+    def record(self, source_name: str, body: bytes, metadata: Dict[str, Any]) -> None:
+        """
+        Store a source body and add it to the snapshot manifest.
+
+        Args:
+            source_name: Name of the source
+            body: Body exactly as consumed by the build
+            metadata: Origin, encoding, URL and headers describing the body
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+
+        # Bodies unchanged since an earlier snapshot are already stored
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=object_path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    # mtime=0 keeps the compressed object byte-identical across runs
+                    with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz:
+                        gz.write(body)
+                os.replace(temp_path, object_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+        with self._lock:
+            self.manifest["sources"][source_name] = dict(metadata, sha256=digest, size=len(body))
+
+    def load(self, source_name: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """
+        Load a recorded source body.
+
+        Args:
+            source_name: Name of the source
+
+        Returns:
+            Tuple of (body, metadata), or None if the snapshot lacks the source
+
+        Raises:
+            SourceError: If the stored body is missing or corrupt
+        """
+        entry = self.manifest["sources"].get(source_name)
+        if entry is None:
+            return None
+
+        object_path = self._object_path(entry["sha256"])
+        try:
+            with gzip.open(object_path, "rb") as f:
+                body = f.read()
+        except (OSError, EOFError) as e:
+            raise SourceError(f"Snapshot body of {source_name} is unreadable: {e}") from e
+
+        if hashlib.sha256(body).hexdigest() != entry["sha256"]:
+            raise SourceError(f"Snapshot body of {source_name} does not match its digest")
+        return body, entry
+
+    def save(self) -> Path:
+        """
+        Write the snapshot manifest.
+
+        Returns:
+            Path of the manifest
+        """
+        manifest_path = self.root / "manifests" / f"{self.snapshot_id}.json"
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, indent=2, sort_keys=True)
+        return manifest_path
@@ -3,23 +3,110 @@
 Source Fetcher for uBlock Unified List Generator
 
 This module handles fetching adblock lists from various sources,
-implementing caching, retries, and error handling.
+implementing caching, retries, and error handling. Sources published on
+several mirrors are raced: a hedged request goes to the next mirror when
+the current one is slower than its usual response time, and a failed
+mirror hands over to the next one at once.
 
 Author: Murtaza Salih (itsrody)
 """
 
 import os
+import re
+import json
 import time
 import hashlib
+import queue
+import tempfile
+import threading
 import requests
-from typing import Dict, List, Any, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+from content_validator import ContentRejectedError, ContentValidator
+from error_handler import SourceError
+from fetch_history import FetchHistory
+from file_lock import FileLock
+from retry_scheduler import CircuitBreaker, CircuitOpenError, RetryScheduler, classify_error
+from snapshot_archive import RECORDED_HEADERS, SnapshotArchive
+
+
+# Number of leading lines searched for list header fields
+HEADER_SCAN_LINES = 50
+
+HEADER_FIELD_PATTERN = re.compile(
+    r'^[!#]\s*(Expires|Version|Last modified|Last-modified|Updated)\s*:\s*(.+)$', re.IGNORECASE
+)
+
+EXPIRES_PATTERN = re.compile(r'(\d+)\s*(d|day|days|h|hour|hours)\b', re.IGNORECASE)
+
+
+def parse_expires(value: str) -> Optional[int]:
+    """
+    Parse an Expires header value such as "4 days (update frequency)".
+    
+    Args:
+        value: Expires header value
+        
+    Returns:
+        Expiry in seconds, or None if the value is not understood
+    """
+    match = EXPIRES_PATTERN.search(value)
+    if not match:
+        return None
+    
+    amount = int(match.group(1))
+    unit = 86400 if match.group(2).lower().startswith("d") else 3600
+    return amount * unit if amount > 0 else None
+
+
+def format_age(seconds: float) -> str:
+    """
+    Format an age in seconds for reports.
+    
+    Args:
+        seconds: Age in seconds
+        
+    Returns:
+        Human readable age such as "42s", "15m" or "3.5h"
+    """
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+class MirrorsFailedError(SourceError):
+    """Exception raised when every mirror of a source failed."""
+    
+    def __init__(self, message: str, errors: List[BaseException]):
+        """
+        Initialize the error.
+        
+        Args:
+            message: Summary of the failure
+            errors: Error of each mirror tried, in the order they failed
+        """
+        super().__init__(message)
+        self.errors = errors
+        # Another round is only worth it if some mirror failed transiently
+        self.retryable = any(classify_error(error)[0] for error in errors)
 
 
 class SourceFetcher:
     """Fetches adblock lists from various sources."""
 
-    def __init__(self, config: Any, error_handler: Any, logger: Any, use_cache: bool = True):
+    def __init__(
+        self,
+        config: Any,
+        error_handler: Any,
+        logger: Any,
+        use_cache: bool = True,
+        snapshot: Optional[SnapshotArchive] = None
+    ):
         """
         Initialize the source fetcher.
         
@@ -28,59 +115,299 @@ class SourceFetcher:
             error_handler: Error handler for exceptions
             logger: Logger instance
             use_cache: Whether to use cached lists
+            snapshot: Snapshot to record fetched bodies into, or to replay
+                sources from without network access when read-only
         """
         self.config = config
         self.error_handler = error_handler
         self.logger = logger
         self.use_cache = use_cache
         self.cache_dir = "cache"
+        self.snapshot = snapshot
+        self.stale_sources: Dict[str, float] = {}
+        # Bodies consumed by fetch jobs, recorded once the build accepts them
+        self._captures: Dict[str, Tuple[bytes, Dict[str, Any]]] = {}
+        # Duration of the last download attempt of each source in this run
+        self._fetch_seconds: Dict[str, float] = {}
+        self.estimated_makespan: Optional[float] = None
         self.session = requests.Session()
         self.session.headers.update({
             "User-Agent": config.settings.get("user_agent", "uBlock-Unified-List-Generator/1.0")
         })
         
+        breaker_settings = config.settings.get("circuit_breaker", {})
+        self.scheduler = RetryScheduler(
+            max_workers=config.settings.get("parallel_downloads", 5),
+            max_retries=config.settings.get("max_retries", 3),
+            base_delay=config.settings.get("retry_delay", 5),
+            max_delay=config.settings.get("max_retry_delay", 60),
+            breaker=CircuitBreaker(
+                failure_threshold=breaker_settings.get("failure_threshold", 3),
+                reset_timeout=breaker_settings.get("reset_timeout", 300)
+            )
+        )
+        
+        self.validator = ContentValidator(config.settings.get("content_validation", {}))
+        self.hedging = config.settings.get("hedging", {})
+        
+        # Replayed builds do no network work, so they neither use nor update the history
+        history_settings = config.settings.get("fetch_history", {})
+        self.history: Optional[FetchHistory] = None
+        if history_settings.get("enabled", False) and not (snapshot is not None and snapshot.read_only):
+            self.history = FetchHistory(
+                history_settings.get("path", os.path.join(self.cache_dir, "fetch_history.json")),
+                history_settings.get("smoothing", 0.3)
+            )
+            self.history.load()
+        
         # Create cache directory if it doesn't exist
         os.makedirs(self.cache_dir, exist_ok=True)
     
-    def fetch_all_sources(self) -> Dict[str, Tuple[List[str], Dict[str, Any]]]:
+    def fetch_all_sources(self, deadline: Optional[float] = None) -> Dict[str, Tuple[List[str], Dict[str, Any]]]:
         """
         Fetch all enabled source lists in parallel.
         
+        Args:
+            deadline: time.monotonic() value bounding the fetch phase, or None
+            
         Returns:
             Dictionary mapping source names to tuple of (rules list, source metadata)
         """
+        return {source["name"]: (rules, source) for rules, source in self.iter_sources(deadline)}
+    
+    def iter_sources(self, deadline: Optional[float] = None) -> Iterator[Tuple[List[str], Dict[str, Any]]]:
+        """
+        Fetch all enabled source lists in parallel, yielding each as soon as it arrives.
+        
+        With a fetch history, sources are submitted longest first so a slow
+        list does not start last and stretch the build. Sources still
+        downloading when the deadline passes are served from their last good
+        cached copy and keep refreshing in the background, so the next run
+        picks up the new content.
+        
+        Args:
+            deadline: time.monotonic() value bounding the fetch phase, or None
+            
+        Yields:
+            Tuples of (rules list, source metadata) in arrival order
+        """
         sources = self.config.get_enabled_sources()
+        if self.snapshot is not None and self.snapshot.read_only:
+            yield from self._replay_sources(sources).values()
+            return
         self.logger.info(f"Starting fetch of {len(sources)} enabled sources")
         
+        self.stale_sources = {}
+        self._captures = {}
+        self._fetch_seconds = {}
+        self.estimated_makespan = None
+        source_by_name = {source["name"]: source for source in sources}
+        order = list(source_by_name)
+        if self.history is not None:
+            # Sources served from a valid cache cost no download time this run
+            cached = []
+            for source in sources:
+                cache_file = self._get_cache_file_path(source["name"])
+                if self.use_cache and self._is_cache_valid(cache_file, source, self._load_metadata(cache_file)):
+                    cached.append(source["name"])
+            order, self.estimated_makespan = self.history.schedule(order, self.scheduler.max_workers, cached)
+            if self.estimated_makespan is not None:
+                self.logger.info(
+                    f"Scheduling sources longest first over {self.scheduler.max_workers} slots, "
+                    f"estimated makespan {self.estimated_makespan:.1f}s"
+                )
+        # Mirrored sources fail over inside the job, the scheduler sees their hosts as one
+        jobs = {
+            name: (
+                ",".join(urlparse(url).netloc for url in self._source_urls(source_by_name[name])),
+                partial(self.fetch_source, source_by_name[name])
+            )
+            for name in order
+        }
+        
+        finished = set()
+        recorded = 0
+        for source_name, rules, error in self._run_jobs(jobs, deadline):
+            finished.add(source_name)
+            if error is not None:
+                rules = self._handle_fetch_failure(source_by_name[source_name], error)
+            elif self.history is not None:
+                samples = {"size_bytes": float(sum(len(rule) + 1 for rule in rules))}
+                if source_name in self._fetch_seconds:
+                    samples["fetch_seconds"] = self._fetch_seconds[source_name]
+                self.history.record(source_name, **samples)
+            
+            if rules:
+                self._record_source(source_by_name[source_name], rules, use_capture=error is None)
+                recorded += 1
+                self.logger.info(f"Fetched {len(rules)} rules from {source_name}")
+                yield rules, source_by_name[source_name]
+            else:
+                self.logger.warning(f"No rules fetched from {source_name}")
+        
+        # Serve sources that missed the build time budget from their last good copy
+        for source_name in [name for name in order if name not in finished]:
+            rules = self._load_stale_cache(source_name, "build time budget exceeded")
+            if rules:
+                self._record_source(source_by_name[source_name], rules, use_capture=False)
+                recorded += 1
+                yield rules, source_by_name[source_name]
+            else:
+                self.error_handler.handle_warning(
+                    "Build time budget exceeded and no cached copy available", f"fetching {source_name}"
+                )
+        
+        if self.snapshot is not None:
+            manifest_path = self.snapshot.save()
+            self.logger.info(f"Recorded {recorded} sources to snapshot {self.snapshot.snapshot_id} ({manifest_path})")
+    
+    def _run_jobs(self, jobs: Dict[str, Tuple[str, Any]], deadline: Optional[float]) -> Iterator[Tuple[str, Any, Optional[BaseException]]]:
+        """
+        Run fetch jobs on a background thread and yield their outcomes.
+        
+        The scheduling loop only dispatches queued jobs and retries while it
+        is iterated, so it runs on its own thread; a caller converting one
+        source never leaves download slots idle.
+        
+        Args:
+            jobs: Mapping of source name to tuple of (host, fetch callable)
+            deadline: time.monotonic() value bounding the fetch phase, or None
+            
+        Yields:
+            Tuples of (source name, rules, error) as each job finishes
+        """
+        outcomes: queue.Queue = queue.Queue()
+        
+        def pump() -> None:
+            try:
+                for outcome in self.scheduler.run_iter(jobs, deadline, self._on_background_refresh):
+                    outcomes.put(outcome)
+            except BaseException as e:
+                outcomes.put(e)
+            finally:
+                outcomes.put(None)
+        
+        threading.Thread(target=pump, name="source-fetch", daemon=True).start()
+        for outcome in iter(outcomes.get, None):
+            if isinstance(outcome, BaseException):
+                raise outcome
+            yield outcome
+    
+    def _replay_sources(self, sources: List[Dict[str, Any]]) -> Dict[str, Tuple[List[str], Dict[str, Any]]]:
+        """
+        Serve every source from the snapshot being replayed, without network access.
+        
+        Args:
+            sources: Enabled source configurations
+            
+        Returns:
+            Dictionary mapping source names to tuple of (rules list, source metadata)
+        """
+        self.logger.info(f"Replaying {len(sources)} enabled sources from snapshot {self.snapshot.snapshot_id}")
         results = {}
-        max_workers = min(len(sources), self.config.settings.get("parallel_downloads", 5))
+        for source in sources:
+            source_name = source["name"]
+            recorded = self.snapshot.load(source_name)
+            if recorded is None:
+                self.error_handler.handle_warning("Source is not in the snapshot", f"replaying {source_name}")
+                continue
+            
+            body, metadata = recorded
+            # Decode exactly as the recorded build did
+            content = body.decode(metadata.get("encoding") or "utf-8", errors="replace")
+            rules = self._process_source_content(content, source)
+            results[source_name] = (rules, source)
+            self.logger.info(f"Replayed {len(rules)} rules from {source_name} ({metadata.get('origin')})")
+        return results
+    
+    def _capture(self, source: Dict[str, Any], body: bytes, encoding: str, origin: str,
+                 response: Optional[requests.Response] = None, url: Optional[str] = None) -> None:
+        """
+        Keep the body a fetch job consumed, for recording into the snapshot.
+        
+        Args:
+            source: Source configuration
+            body: Body as consumed, raw bytes for downloads
+            encoding: Encoding the body was decoded with
+            origin: "network" for downloads, "cache" for cached copies
+            response: HTTP response the body came from, if any
+            url: Mirror the body was downloaded from, the source URL if None
+        """
+        if self.snapshot is None or self.snapshot.read_only:
+            return
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all fetch tasks
-            future_to_source = {
-                executor.submit(self.fetch_source, source): source for source in sources
+        metadata: Dict[str, Any] = {"url": url or source["url"], "origin": origin, "encoding": encoding}
+        if response is not None:
+            metadata["status"] = response.status_code
+            metadata["headers"] = {
+                name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers
             }
+        self._captures[source["name"]] = (body, metadata)
+    
+    def _record_source(self, source: Dict[str, Any], rules: List[str], use_capture: bool = True) -> None:
+        """
+        Record the body behind a source's accepted rules into the snapshot.
+        
+        Args:
+            source: Source configuration
+            rules: Rules the build accepted for the source
+            use_capture: False when the rules came from a stale cache copy, not
+                from the body the fetch job captured
+        """
+        if self.snapshot is None:
+            return
+        
+        captured = self._captures.pop(source["name"], None)
+        if captured is None or not use_capture:
+            captured = ("\n".join(rules).encode("utf-8"), {"url": source["url"], "origin": "cache", "encoding": "utf-8"})
+        self.snapshot.record(source["name"], *captured)
+    
+    def _on_background_refresh(self, source_name: str, rules: Optional[List[str]], error: Optional[BaseException]) -> None:
+        """
+        Report the outcome of a source refresh that finished after the deadline.
+        
+        Args:
+            source_name: Name of the source
+            rules: Fetched rules, already written to the cache by fetch_source
+            error: Final error of the fetch job, or None on success
+        """
+        if error is None:
+            self.logger.info(f"Refreshed {source_name} in the background ({len(rules)} rules) for the next run")
+        else:
+            self.logger.warning(f"Background refresh of {source_name} failed: {error}")
+    
+    def _load_stale_cache(self, source_name: str, reason: str) -> List[str]:
+        """
+        Load a source's last good cached copy regardless of its age.
+        
+        Args:
+            source_name: Name of the source
+            reason: Why the cached copy is being used
             
-            # Process completed tasks
-            for future in as_completed(future_to_source):
-                source = future_to_source[future]
-                source_name = source["name"]
-                
-                try:
-                    rules = future.result()
-                    if rules:
-                        results[source_name] = (rules, source)
-                        self.logger.info(f"Fetched {len(rules)} rules from {source_name}")
-                    else:
-                        self.logger.warning(f"No rules fetched from {source_name}")
-                except Exception as e:
-                    self.error_handler.handle(e, f"Error fetching {source_name}")
+        Returns:
+            List of rules from the cache, or an empty list if there is none
+        """
+        cache_file = self._get_cache_file_path(source_name)
+        if not self.use_cache or not os.path.exists(cache_file):
+            return []
         
-        return results
+        # A 304 refreshes fetched_at without rewriting the cache file
+        fetched_at = self._load_metadata(cache_file).get("fetched_at") or os.path.getmtime(cache_file)
+        age = time.time() - fetched_at
+        self.stale_sources[source_name] = age
+        self.error_handler.handle_warning(
+            f"Serving cached copy that is {format_age(age)} old: {reason}", f"fetching {source_name}"
+        )
+        return self._load_from_cache(cache_file)
     
     def fetch_source(self, source: Dict[str, Any]) -> List[str]:
         """
-        Fetch a single source list with retries and caching.
+        Fetch a single source list, using the cache when it is still valid.
+        
+        A single download attempt is made; retries are scheduled by the
+        caller so that waiting never ties up a worker thread. Builds sharing
+        the cache directory download an expired entry one at a time: the
+        others wait on the entry's lock file and then find it fresh.
         
         Args:
             source: Source configuration
@@ -89,49 +416,303 @@ class SourceFetcher:
             List of rules from the source
         """
         source_name = source["name"]
-        source_url = source["url"]
-        self.logger.debug(f"Fetching source: {source_name} from {source_url}")
         
         # Check if we can use cached version
         cache_file = self._get_cache_file_path(source_name)
-        if self.use_cache and self._is_cache_valid(cache_file):
+        metadata = self._load_metadata(cache_file) if self.use_cache else {}
+        if self.use_cache and self._is_cache_valid(cache_file, source, metadata):
             self.logger.debug(f"Using cached version of {source_name}")
-            return self._load_from_cache(cache_file)
+            return self._load_cached_source(cache_file, source)
+        if not self.use_cache:
+            return self._download_source(source, cache_file, metadata)
+        
+        lock_settings = self.config.settings.get("cache_lock", {})
+        with FileLock(
+            f"{os.path.splitext(cache_file)[0]}.lock",
+            timeout=lock_settings.get("timeout", 300),
+            stale_after=lock_settings.get("stale_after", 600)
+        ) as lock:
+            if not lock.acquired:
+                self.error_handler.handle_warning(
+                    "Timed out waiting for another build's download, downloading anyway", f"fetching {source_name}"
+                )
+            # Another build may have refreshed the entry while this one waited
+            metadata = self._load_metadata(cache_file)
+            if self._is_cache_valid(cache_file, source, metadata):
+                self.logger.debug(f"Using {source_name} as just refreshed by another build")
+                return self._load_cached_source(cache_file, source)
+            return self._download_source(source, cache_file, metadata)
+    
+    def _download_source(self, source: Dict[str, Any], cache_file: str, metadata: Dict[str, Any]) -> List[str]:
+        """
+        Download a source list, revalidating its cache entry when possible.
+        
+        Args:
+            source: Source configuration
+            cache_file: Path to the cache file
+            metadata: Cached metadata of the source
+            
+        Returns:
+            List of rules from the source
+        """
+        source_name = source["name"]
+        urls = self._source_urls(source)
+        
+        # Revalidate an expired cache entry instead of downloading it again;
+        # validators only hold for the mirror that issued them
+        headers = {}
+        if self.use_cache and os.path.exists(cache_file):
+            if metadata.get("etag"):
+                headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("http_last_modified"):
+                headers["If-Modified-Since"] = metadata["http_last_modified"]
+        validated_url = metadata.get("url", source["url"])
         
-        # Fetch with retries
-        max_retries = self.config.settings.get("max_retries", 3)
-        retry_delay = self.config.settings.get("retry_delay", 5)
+        self.logger.debug(f"Fetching source: {source_name} from {', '.join(urls)}")
         timeout = self.config.settings.get("timeout", 30)
+        started = time.monotonic()
+        if len(urls) == 1:
+            source_url = urls[0]
+            response = self._request(source_url, headers if source_url == validated_url else {}, timeout)
+        else:
+            response, source_url = self._request_mirrors(urls, headers, validated_url, timeout)
+            if source_url != urls[0]:
+                self.logger.info(f"Fetched {source_name} from mirror {source_url}")
         
-        for attempt in range(1, max_retries + 1):
-            try:
-                self.logger.debug(f"Fetching {source_name} (attempt {attempt}/{max_retries})")
-                response = self.session.get(source_url, timeout=timeout)
-                response.raise_for_status()
-                
-                # Process the content
-                content = response.text
-                rules = self._process_source_content(content, source)
-                
-                # Cache the result
-                if self.use_cache:
-                    self._save_to_cache(cache_file, rules)
-                
-                return rules
-                
-            except requests.RequestException as e:
-                if attempt == max_retries:
-                    self.error_handler.warn(f"Failed to fetch {source_name} after {max_retries} attempts: {str(e)}")
-                    # Try to use cached version even if expired
-                    if self.use_cache and os.path.exists(cache_file):
-                        self.logger.warning(f"Using expired cache for {source_name} due to fetch failure")
-                        return self._load_from_cache(cache_file)
-                    return []
+        if response.status_code == 304:
+            response.close()
+            self.logger.debug(f"{source_name} not modified since last fetch")
+            metadata["fetched_at"] = time.time()
+            self._save_metadata(cache_file, metadata)
+            self._fetch_seconds[source_name] = time.monotonic() - started
+            return self._load_cached_source(cache_file, source)
+        
+        # Reject error pages and truncated bodies before parsing them, so the
+        # last good cache entry survives and serves as the fallback
+        body_size = len(response.content)
+        previous_size = metadata.get("bytes") or metadata.get("size")
+        # A truncation rarely repeats byte for byte, the same smaller body served
+        # twice in a row means the list really shrank
+        if body_size == metadata.get("rejected_bytes"):
+            previous_size = None
+        try:
+            self.validator.validate(response.content, source, response.headers, response.encoding, previous_size)
+        except ContentRejectedError as e:
+            if e.reason == "shrunk" and self.use_cache and metadata:
+                metadata["rejected_bytes"] = body_size
+                self._save_metadata(cache_file, metadata)
+            raise
+        
+        # Process the content
+        content = response.text
+        rules = self._process_source_content(content, source)
+        self._fetch_seconds[source_name] = time.monotonic() - started
+        self._capture(
+            source, response.content, response.encoding or response.apparent_encoding, "network", response, source_url
+        )
+        
+        # Cache the result along with the list's own header metadata
+        if self.use_cache:
+            self._save_to_cache(cache_file, rules)
+            metadata = self._parse_list_header(content)
+            metadata.update({
+                "fetched_at": time.time(),
+                "url": source_url,
+                "size": len(content),
+                "bytes": body_size,
+                "etag": response.headers.get("ETag"),
+                "http_last_modified": response.headers.get("Last-Modified")
+            })
+            self._save_metadata(cache_file, metadata)
+        
+        return rules
+    
+    def _request(self, url: str, headers: Dict[str, str], timeout: float, mirrored: bool = False) -> requests.Response:
+        """
+        Send one request and wait for its response headers, leaving the body unread.
+        
+        Args:
+            url: URL to request
+            headers: Extra request headers
+            timeout: Connect and read timeout in seconds
+            mirrored: Whether the URL is one of several mirrors, whose hosts
+                are tracked by the circuit breaker here instead of by the scheduler
+        
+        Returns:
+            Response with a successful or 304 status
+        
+        Raises:
+            requests.RequestException: If the request failed or returned an error status
+        """
+        host = urlparse(url).netloc
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, timeout=timeout, headers=headers, stream=True)
+            if self.history is not None:
+                self.history.record_latency(host, time.monotonic() - started)
+            if response.status_code != 304:
+                try:
+                    response.raise_for_status()
+                except requests.HTTPError:
+                    response.close()
+                    raise
+        except Exception as e:
+            if mirrored and classify_error(e)[0]:
+                self.scheduler.breaker.record_failure(host)
+            raise
+        if mirrored:
+            self.scheduler.breaker.record_success(host)
+        return response
+    
+    def _request_mirrors(
+        self,
+        urls: List[str],
+        headers: Dict[str, str],
+        validated_url: str,
+        timeout: float
+    ) -> Tuple[requests.Response, str]:
+        """
+        Race a source's mirrors and return the first successful response.
+        
+        The primary is requested first. While a request is in flight and
+        slower than the hedge delay of its host, the next mirror is requested
+        as well; when nothing is in flight after a failure, the next mirror
+        is requested at once. Mirrors whose circuit is open are skipped.
+        
+        Args:
+            urls: Source URL followed by its mirrors, in order of preference
+            headers: Conditional request headers of the cached copy
+            validated_url: Mirror the conditional headers were issued by
+            timeout: Connect and read timeout in seconds
+        
+        Returns:
+            Tuple of (response, URL that served it)
+        
+        Raises:
+            MirrorsFailedError: If every mirror failed or was skipped
+        """
+        pending = list(urls)
+        in_flight: Dict[Future, str] = {}
+        errors: List[BaseException] = []
+        hedge_at = float("inf")
+        executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="mirror-fetch")
+        try:
+            while pending or in_flight:
+                if pending and (not in_flight or time.monotonic() >= hedge_at):
+                    url = pending.pop(0)
+                    host = urlparse(url).netloc
+                    if not self.scheduler.breaker.allow(host):
+                        errors.append(CircuitOpenError(f"Circuit open for host {host}"))
+                        continue
+                    if in_flight:
+                        self.logger.debug(f"Hedging slow request with mirror {url}")
+                    future = executor.submit(
+                        self._request, url, headers if url == validated_url else {}, timeout, True
+                    )
+                    in_flight[future] = url
+                    delay = self._hedge_delay(url)
+                    hedge_at = time.monotonic() + delay if delay is not None else float("inf")
+                    continue
                 
-                self.logger.debug(f"Retry {attempt}/{max_retries} for {source_name} in {retry_delay}s: {str(e)}")
-                time.sleep(retry_delay)
+                wait_seconds = max(0.0, hedge_at - time.monotonic()) if pending and hedge_at != float("inf") else None
+                done, _ = wait(in_flight, timeout=wait_seconds, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = in_flight.pop(future)
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        self.logger.debug(f"Mirror {url} failed: {e}")
+                        errors.append(e)
+                        continue
+                    # Responses of the losing requests are dropped as they arrive
+                    for other in in_flight:
+                        other.add_done_callback(self._close_response)
+                    return response, url
+        finally:
+            executor.shutdown(wait=False)
+        
+        raise MirrorsFailedError(f"All {len(urls)} mirrors failed: {errors[-1]}", errors) from errors[-1]
+    
+    def _hedge_delay(self, url: str) -> Optional[float]:
+        """
+        Get how long to wait on a request before hedging it with the next mirror.
+        
+        Args:
+            url: URL of the request in flight
+        
+        Returns:
+            The configured latency percentile of the host's recent responses,
+            the default delay while the host has too few samples, or None if
+            hedging is disabled
+        """
+        if not self.hedging.get("enabled", False):
+            return None
+        delay = None
+        if self.history is not None:
+            delay = self.history.latency_percentile(
+                urlparse(url).netloc, self.hedging.get("percentile", 95), self.hedging.get("min_samples", 5)
+            )
+        if delay is None:
+            delay = self.hedging.get("default_delay", 2.0)
+        return max(self.hedging.get("min_delay", 0.2), delay)
+    
+    @staticmethod
+    def _close_response(future: Future) -> None:
+        """
+        Close the response of a request that lost a mirror race.
+        
+        Args:
+            future: Finished request
+        """
+        if not future.cancelled() and future.exception() is None:
+            future.result().close()
+    
+    @staticmethod
+    def _source_urls(source: Dict[str, Any]) -> List[str]:
+        """
+        Get the URLs a source is published at.
+        
+        Args:
+            source: Source configuration
+        
+        Returns:
+            Source URL followed by its mirrors, in order of preference
+        """
+        return [source["url"]] + [url for url in source.get("mirrors", []) if url != source["url"]]
+    
+    def _load_cached_source(self, cache_file: str, source: Dict[str, Any]) -> List[str]:
+        """
+        Load a source's cached rules in place of a download.
+        
+        Args:
+            cache_file: Path to the cache file
+            source: Source configuration
+            
+        Returns:
+            List of rules from the cache
+        """
+        rules = self._load_from_cache(cache_file)
+        self._capture(source, "\n".join(rules).encode("utf-8"), "utf-8", "cache")
+        return rules
+    
+    def _handle_fetch_failure(self, source: Dict[str, Any], error: BaseException) -> List[str]:
+        """
+        Report a source that could not be fetched and fall back to its cache.
+        
+        Args:
+            source: Source configuration
+            error: Final error of the fetch job
+            
+        Returns:
+            List of rules from the expired cache, or an empty list
+        """
+        source_name = source["name"]
         
-        return []
+        # Try to use cached version even if expired
+        rules = self._load_stale_cache(source_name, f"fetch failed: {error}")
+        if not rules:
+            self.error_handler.handle_error(error, f"fetching {source_name}")
+        return rules
     
     def _process_source_content(self, content: str, source: Dict[str, Any]) -> List[str]:
         """
@@ -186,12 +767,86 @@ class SourceFetcher:
         safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in source_name)
         return os.path.join(self.cache_dir, f"{safe_name}.txt")
     
-    def _is_cache_valid(self, cache_file: str) -> bool:
+    def _get_metadata_file_path(self, cache_file: str) -> str:
+        """
+        Get the metadata sidecar path for a cache file.
+        
+        Args:
+            cache_file: Path to the cache file
+            
+        Returns:
+            Path to the metadata sidecar
+        """
+        return f"{os.path.splitext(cache_file)[0]}.meta.json"
+    
+    def _parse_list_header(self, content: str) -> Dict[str, Any]:
+        """
+        Parse the metadata header of a filter list.
+        
+        Args:
+            content: Raw content from the source
+            
+        Returns:
+            Dictionary with the list's expires (in seconds), version and last modified values
+        """
+        metadata: Dict[str, Any] = {}
+        
+        for line in content.splitlines()[:HEADER_SCAN_LINES]:
+            line = line.strip()
+            if not line or line.startswith("["):
+                continue
+            if not line.startswith(("!", "#")):
+                break
+            
+            match = HEADER_FIELD_PATTERN.match(line)
+            if not match:
+                continue
+            
+            field, value = match.group(1).lower(), match.group(2).strip()
+            if field == "expires":
+                expires = parse_expires(value)
+                if expires:
+                    metadata["expires"] = expires
+            elif field == "version":
+                metadata["version"] = value
+            else:
+                metadata["last_modified"] = value
+        
+        return metadata
+    
+    def _get_refresh_interval(self, source: Dict[str, Any], metadata: Dict[str, Any]) -> float:
+        """
+        Get the refresh interval of a source.
+        
+        The source's own refresh_interval wins, then the list's Expires
+        header, then the global cache_ttl. The result is clamped to the
+        configured minimum and maximum refresh intervals.
+        
+        Args:
+            source: Source configuration
+            metadata: Cached metadata of the source
+            
+        Returns:
+            Refresh interval in seconds
+        """
+        settings = self.config.settings
+        interval = source.get("refresh_interval") or metadata.get("expires") or settings.get("cache_ttl", 86400)
+        
+        min_interval = settings.get("min_refresh_interval", 0)
+        max_interval = settings.get("max_refresh_interval")
+        interval = max(interval, min_interval)
+        if max_interval:
+            interval = min(interval, max_interval)
+        return interval
+    
+    def _is_cache_valid(self, cache_file: str, source: Dict[str, Any], metadata: Dict[str, Any]) -> bool:
         """
         Check if a cache file is valid and not expired.
         
         Args:
             cache_file: Path to the cache file
+            source: Source configuration
+            metadata: Cached metadata of the source
             
         Returns:
             True if the cache is valid
@@ -199,12 +854,46 @@ class SourceFetcher:
         if not os.path.exists(cache_file):
             return False
         
-        # Check if the cache is expired
-        cache_ttl = self.config.settings.get("cache_ttl", 86400)  # Default: 24 hours
-        file_mtime = os.path.getmtime(cache_file)
+        # Entries cached before sidecars existed fall back to the file time
+        fetched_at = metadata.get("fetched_at") or os.path.getmtime(cache_file)
         current_time = time.time()
         
-        return (current_time - file_mtime) < cache_ttl
+        return (current_time - fetched_at) < self._get_refresh_interval(source, metadata)
+    
+    def _load_metadata(self, cache_file: str) -> Dict[str, Any]:
+        """
+        Load the metadata sidecar of a cache file.
+        
+        Args:
+            cache_file: Path to the cache file
+            
+        Returns:
+            Cached metadata, or an empty dictionary if there is none
+        """
+        metadata_file = self._get_metadata_file_path(cache_file)
+        if not os.path.exists(metadata_file):
+            return {}
+        
+        try:
+            with open(metadata_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.error_handler.handle_warning(f"Failed to load cache metadata: {str(e)}", metadata_file)
+            return {}
+    
+    def _save_metadata(self, cache_file: str, metadata: Dict[str, Any]) -> None:
+        """
+        Save the metadata sidecar of a cache file.
+        
+        Args:
+            cache_file: Path to the cache file
+            metadata: Metadata to save
+        """
+        metadata_file = self._get_metadata_file_path(cache_file)
+        try:
+            self._write_atomic(metadata_file, json.dumps(metadata, indent=2))
+        except OSError as e:
+            self.error_handler.handle_warning(f"Failed to save cache metadata: {str(e)}", metadata_file)
     
     def _load_from_cache(self, cache_file: str) -> List[str]:
         """
@@ -220,7 +909,7 @@ class SourceFetcher:
             with open(cache_file, 'r', encoding='utf-8') as f:
                 return [line.strip() for line in f if line.strip()]
         except Exception as e:
-            self.error_handler.warn(f"Failed to load from cache {cache_file}: {str(e)}")
+            self.error_handler.handle_warning(f"Failed to load from cache: {str(e)}", cache_file)
             return []
     
     def _save_to_cache(self, cache_file: str, rules: List[str]) -> None:
@@ -232,8 +921,24 @@ class SourceFetcher:
             rules: List of rules to save
         """
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                for rule in rules:
-                    f.write(f"{rule}\n")
+            self._write_atomic(cache_file, "".join(f"{rule}\n" for rule in rules))
         except Exception as e:
-            self.error_handler.warn(f"Failed to save to cache {cache_file}: {str(e)}")
+            self.error_handler.handle_warning(f"Failed to save to cache: {str(e)}", cache_file)
+    
+    @staticmethod
+    def _write_atomic(path: str, text: str) -> None:
+        """
+        Replace a file in one step, so concurrent readers never see it half-written.
+        
+        Args:
+            path: File to write
+            text: New content
+        """
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
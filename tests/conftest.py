@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules under src/ import each other by bare name, as when run from there
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from logger import UnifiedLogger  # noqa: E402
+from error_handler import ErrorHandler  # noqa: E402
+
+
+@pytest.fixture
+def logger():
+    return UnifiedLogger('tests')
+
+
+@pytest.fixture
+def error_handler(logger):
+    return ErrorHandler(logger)
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from badfilter_resolver import BadfilterResolver
+from error_handler import ConfigError
+from rule_canonicalizer import RuleCanonicalizer
+
+
+def resolve(logger, error_handler, tmp_path, rules, **settings):
+    settings.setdefault('report_file', str(tmp_path / 'badfilter.json'))
+    resolver = BadfilterResolver(logger, error_handler, settings)
+    pairs = [(rule, 'List A' if 'badfilter' in rule else 'List B') for rule in rules]
+    return resolver.resolve(lambda: iter(pairs))
+
+
+def test_removes_exact_target_and_its_badfilter(logger, error_handler, tmp_path):
+    removed = resolve(logger, error_handler, tmp_path, ['||ads.com^$badfilter', '||ads.com^', '||keep.com^'])
+
+    assert removed == {'||ads.com^$badfilter', '||ads.com^'}
+
+
+def test_matches_canonical_forms_of_differently_written_targets(logger, error_handler, tmp_path):
+    # Rules reach the resolver canonicalized by the optimizer
+    canonicalizer = RuleCanonicalizer()
+    rules = [canonicalizer.canonicalize(rule) for rule in ('||ads.com^$badfilter,script,third-party', '||ads.com^$script,3p')]
+    
+    assert resolve(logger, error_handler, tmp_path, rules) == set(rules)
+
+
+def test_domain_list_disables_targets_with_a_subset(logger, error_handler, tmp_path):
+    removed = resolve(logger, error_handler, tmp_path, [
+        '||t.com^$script,domain=a.com|b.com,badfilter',
+        '||t.com^$script,domain=a.com',
+        '||t.com^$script,domain=b.com|a.com',
+        '||t.com^$script,domain=c.com',
+        '||t.com^$script',
+    ])
+
+    assert removed - {'||t.com^$script,domain=a.com|b.com,badfilter'} == {
+        '||t.com^$script,domain=a.com', '||t.com^$script,domain=b.com|a.com'
+    }
+
+
+def test_entity_domains_match_as_entries(logger, error_handler, tmp_path):
+    removed = resolve(logger, error_handler, tmp_path, [
+        '||e.com^$domain=example.*|x.com,badfilter', '||e.com^$domain=example.*', '||e.com^$domain=example.com'
+    ])
+
+    assert '||e.com^$domain=example.*' in removed
+    assert '||e.com^$domain=example.com' not in removed
+
+
+def test_negated_domain_lists_only_match_exactly(logger, error_handler, tmp_path):
+    removed = resolve(logger, error_handler, tmp_path, [
+        '||n.com^$domain=~a.com,badfilter', '||n.com^$domain=~a.com|b.com', '||n.com^$domain=~a.com'
+    ])
+
+    assert '||n.com^$domain=~a.com|b.com' not in removed
+    assert '||n.com^$domain=~a.com' in removed
+
+
+@pytest.mark.parametrize('keep, expected', [
+    ('none', {'||ads.com^', '||ads.com^$badfilter', '||other.com^$badfilter'}),
+    ('unmatched', {'||ads.com^', '||ads.com^$badfilter'}),
+    ('all', {'||ads.com^'}),
+])
+def test_keep_mode_decides_which_badfilters_stay(logger, error_handler, tmp_path, keep, expected):
+    rules = ['||ads.com^$badfilter', '||ads.com^', '||other.com^$badfilter']
+
+    assert resolve(logger, error_handler, tmp_path, rules, keep=keep) == expected
+
+
+def test_report_lists_removed_targets(logger, error_handler, tmp_path):
+    resolve(logger, error_handler, tmp_path, ['||ads.com^$badfilter', '||ads.com^', '||other.com^$badfilter'])
+
+    report = json.loads((tmp_path / 'badfilter.json').read_text())
+    assert report['removed_targets'] == [{
+        'rule': '||ads.com^', 'source': 'List B',
+        'badfilter': '||ads.com^$badfilter', 'badfilter_source': 'List A'
+    }]
+    assert report['unmatched_badfilters'] == [{'rule': '||other.com^$badfilter', 'source': 'List A'}]
+
+
+def test_rejects_unknown_keep_mode(logger, error_handler):
+    with pytest.raises(ConfigError):
+        BadfilterResolver(logger, error_handler, {'keep': 'some'})
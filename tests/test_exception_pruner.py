@@ -0,0 +1,41 @@
+import pytest
+
+from exception_pruner import ExceptionPruner
+
+
+def prune(logger, error_handler, tmp_path, rules):
+    pruner = ExceptionPruner(logger, error_handler, {'report_file': str(tmp_path / 'exceptions.json')})
+    pairs = [(rule, 'List A') for rule in rules]
+    return pruner.resolve(lambda: iter(pairs))
+
+
+@pytest.mark.parametrize('exception, rule', [
+    ('@@||tracker.com^', '||tracker.com^$script'),
+    ('@@||tracker.com^', '||ads.tracker.com^'),
+    ('@@||tracker.com^$script,image', '||tracker.com^$script'),
+    ('@@||tracker.com^', '||tracker.com^$3p'),
+    ('@@||tracker.com^$domain=a.com|b.com', '||tracker.com^$domain=a.com'),
+])
+def test_prunes_rules_an_exception_always_overrides(logger, error_handler, tmp_path, exception, rule):
+    assert prune(logger, error_handler, tmp_path, [exception, rule]) == {rule}
+
+
+@pytest.mark.parametrize('exception, rule', [
+    ('@@||ads.tracker.com^', '||tracker.com^'),
+    ('@@||tracker.com^$script', '||tracker.com^$image'),
+    ('@@||tracker.com^$script', '||tracker.com^'),
+    ('@@||tracker.com^$3p', '||tracker.com^'),
+    ('@@||tracker.com^$domain=a.com', '||tracker.com^'),
+    ('@@||tracker.com^$domain=a.com', '||tracker.com^$domain=a.com|b.com'),
+    ('@@||tracker.com^', '||tracker.com^$important'),
+    ('@@||tracker.com^', '||tracker.com^$redirect=noopjs'),
+    ('@@||tracker.com^', '||othertracker.com^'),
+])
+def test_keeps_rules_an_exception_only_partly_covers(logger, error_handler, tmp_path, exception, rule):
+    assert prune(logger, error_handler, tmp_path, [exception, rule]) == set()
+
+
+def test_never_prunes_exceptions(logger, error_handler, tmp_path):
+    rules = ['@@||tracker.com^', '@@||ads.tracker.com^$script']
+
+    assert prune(logger, error_handler, tmp_path, rules) == set()
@@ -0,0 +1,64 @@
+import json
+import random
+import re
+import time
+
+import pytest
+
+from database import UBlockRuleConverter
+from input_guard import InputGuard
+from rule_optimizer import RuleOptimizer
+
+
+def test_quarantine_counts_and_reports_rules(logger, error_handler, tmp_path):
+    report_file = tmp_path / 'quarantine.json'
+    guard = InputGuard(logger, error_handler, {'report_file': str(report_file), 'max_rule_ms': 20})
+    guard.quarantine('x' * 500, 'List A', 'length')
+    guard.quarantine('/(a+)+$/', 'List B', 'cpu', 0.0315)
+    guard.write_report()
+
+    assert guard.total == 2
+    report = json.loads(report_file.read_text())
+    assert report['counts'] == {'length': 1, 'cpu': 1}
+    assert report['max_rule_ms'] == 20
+    assert report['rules'][0] == {
+        'rule': 'x' * InputGuard.EXAMPLE_LENGTH, 'length': 500, 'source': 'List A', 'reason': 'length'
+    }
+    assert report['rules'][1]['cpu_ms'] == 31.5
+
+
+def test_sources_may_override_the_line_length_cap(logger, error_handler):
+    guard = InputGuard(logger, error_handler, {'max_line_length': 1000})
+
+    assert guard.line_limit({'name': 'List A'}) == 1000
+    assert guard.line_limit({'name': 'List B', 'max_line_length': 0}) == 0
+
+
+def test_glob_matching_agrees_with_a_regex(tmp_path):
+    converter = UBlockRuleConverter(str(tmp_path / 'rules.db'))
+    generator = random.Random(50)
+    for _ in range(2000):
+        pattern = ''.join(generator.choice('ab*') for _ in range(generator.randrange(1, 8)))
+        rule = ''.join(generator.choice('ab') for _ in range(generator.randrange(0, 10)))
+        expected = re.fullmatch('.*'.join(map(re.escape, pattern.split('*'))), rule, re.DOTALL) is not None
+
+        assert converter._pattern_matches(pattern, rule) == expected, (pattern, rule)
+
+
+@pytest.mark.parametrize('rule, expected', [
+    ('||ads*.example.com^', '||ads.example.com^'),
+    ('||*.example.com^', '||example.com^'),
+    ('example.com##div > a', 'example.com##div>a'),
+    ('example.com##div   >a', 'example.com##div>a'),
+])
+def test_optimizer_rewrites_are_unchanged(logger, error_handler, rule, expected):
+    assert RuleOptimizer(logger, error_handler)._optimize_rule(rule) == expected
+
+
+@pytest.mark.parametrize('rule', ['||*.' + '||' * 20000, 'example.com##a' + ' ' * 20000 + 'b'])
+def test_optimizer_stays_linear_on_repeated_patterns(logger, error_handler, rule):
+    # Both took seconds with the backtracking regexes
+    started = time.perf_counter()
+    RuleOptimizer(logger, error_handler)._optimize_rule(rule)
+    
+    assert time.perf_counter() - started < 1
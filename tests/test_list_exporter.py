@@ -0,0 +1,58 @@
+import pytest
+
+from list_exporter import ListExporter
+
+
+@pytest.fixture
+def exporter(logger, error_handler):
+    return ListExporter(logger, error_handler, {})
+
+
+def test_collects_plain_hostname_blocks(exporter):
+    blocked, allowed = exporter.collect_domains([
+        '||ads.example.com^', '||Tracker.Example.org^', '0.0.0.0 hosts.example.net', '@@||cdn.example.com^'
+    ])
+
+    assert blocked == {'ads.example.com', 'tracker.example.org', 'hosts.example.net'}
+    assert allowed == {'cdn.example.com'}
+
+
+@pytest.mark.parametrize('rule', ['||a.com^$important', '||a.com^$all', '||a.com^$important,all'])
+def test_keeps_options_that_do_not_narrow_the_block(exporter, rule):
+    assert exporter.collect_domains([rule])[0] == {'a.com'}
+
+
+@pytest.mark.parametrize('rule', [
+    '||a.com^$doc',
+    '||a.com^$document',
+    '||a.com^$script',
+    '||a.com^$third-party',
+    '||a.com^$domain=b.com',
+    '||a.com^$important,doc',
+    '||a.com/ads',
+    '||a.com',
+    '||ads.*.com^',
+])
+def test_leaves_out_rules_dns_cannot_express(exporter, rule):
+    assert exporter.collect_domains([rule]) == (set(), set())
+
+
+@pytest.mark.parametrize('rule', ['||localhost^', '0.0.0.0 0.0.0.0', '||1.2.3.4^', '0.0.0.0 broadcasthost'])
+def test_leaves_out_reserved_hosts_and_addresses(exporter, rule):
+    assert exporter.collect_domains([rule])[0] == set()
+
+
+def test_subdomain_formats_collapse_covered_subdomains(exporter):
+    blocked = {'example.com', 'ads.example.com', 'other.org'}
+
+    assert exporter.filter_domains(blocked, set(), 'dnsmasq') == ['example.com', 'other.org']
+    assert sorted(exporter.filter_domains(blocked, set(), 'hosts')) == ['ads.example.com', 'example.com', 'other.org']
+
+
+def test_allowed_hosts_are_not_exported(exporter):
+    blocked = {'example.com', 'cdn.example.com', 'ads.example.org'}
+    allowed = {'cdn.example.com', 'ads.example.org'}
+
+    # Blocking the whole zone would also block the allowed subdomain
+    assert exporter.filter_domains(blocked, allowed, 'dnsmasq') == []
+    assert exporter.filter_domains(blocked, allowed, 'hosts') == ['example.com']
@@ -0,0 +1,40 @@
+from error_handler import ErrorHandler
+from logger import UnifiedLogger
+
+
+def read_messages(log_file):
+    return [line.rsplit(' - ', 1)[1] for line in log_file.read_text().splitlines()]
+
+
+def test_records_of_all_loggers_are_written_in_call_order(tmp_path):
+    log_file = tmp_path / 'build.log'
+    loggers = [UnifiedLogger(f'order-{index}', str(log_file)) for index in range(4)]
+    for number in range(400):
+        loggers[number % 4].info('%d', number)
+    UnifiedLogger.shutdown()
+
+    assert read_messages(log_file) == [str(number) for number in range(400)]
+
+
+def test_same_name_shares_one_set_of_handlers(tmp_path):
+    log_file = tmp_path / 'build.log'
+    UnifiedLogger('shared', str(log_file))
+    UnifiedLogger('shared', str(log_file)).info('once')
+    UnifiedLogger.shutdown()
+
+    assert read_messages(log_file) == ['once']
+
+
+def test_diagnostics_are_logged_once_per_category_and_source(tmp_path):
+    log_file = tmp_path / 'build.log'
+    error_handler = ErrorHandler(UnifiedLogger('diagnostics', str(log_file)), sample_size=2)
+    for number in range(100):
+        error_handler.record_diagnostic('Unsupported rule', 'List A', f'rule{number}')
+    error_handler.record_diagnostic('Unsupported rule', 'List B', 'other')
+    error_handler.report_diagnostics()
+    UnifiedLogger.shutdown()
+
+    messages = read_messages(log_file)
+    assert len(messages) == 2
+    assert messages[0].startswith('Unsupported rule [List A]: 100 rules')
+    assert error_handler.warning_count == 101
@@ -0,0 +1,82 @@
+import re
+
+import pytest
+
+from regex_rewriter import RegexRewriter
+
+
+def plain_to_regex(plain):
+    """Translate a plain filter pattern made of literals, ``*`` and ``|`` anchors to a regex."""
+    start = '^' if plain.startswith('|') else ''
+    end = '$' if plain.endswith('|') and len(plain) > 1 else ''
+    body = plain[bool(start):len(plain) - bool(end)]
+    return start + '.*'.join(re.escape(part) for part in body.split('*')) + end
+
+
+@pytest.mark.parametrize('rule, expected', [
+    (r'/banner\.gif/', ['banner.gif']),
+    (r'/(ad|ads)\.js/', ['ad.js', 'ads.js']),
+    (r'/ad(s)?\.js/', ['ads.js', 'ad.js']),
+    (r'/^https?:\/\/ads\.example\.com\//', ['|https://ads.example.com/', '|http://ads.example.com/']),
+    (r'/\/track\/.*\/pixel\.gif$/', ['/track/*/pixel.gif|']),
+    (r'/banner\.gif/$image,3p', ['banner.gif$image,3p']),
+    (r'@@/(ad|ads)\.js/$script', ['@@ad.js$script', '@@ads.js$script']),
+])
+def test_rewrites_regex_to_plain_filters(rule, expected):
+    assert RegexRewriter().rewrite(rule) == expected
+
+
+@pytest.mark.parametrize('rule', [
+    r'/ad[0-9]\.js/',
+    r'/\d+\.gif/',
+    r'/ads+\.js/',
+    r'/(?!x)ads/',
+    r'/a.b/',
+    r'/(a|b|c|d|e)x/',
+    '/' + '(' * 40 + 'a' + ')' * 40 + '/',
+    r'/ads/$replace=/a/b/',
+    '||example.com^',
+    '##.ad',
+])
+def test_leaves_truly_regular_and_other_rules_alone(rule):
+    assert RegexRewriter().rewrite(rule) is None
+
+
+def test_drops_alternatives_covered_by_an_unanchored_literal():
+    assert RegexRewriter().rewrite(r'/(ad|ad\.js)/') == ['ad']
+
+
+def test_max_rules_limits_the_split():
+    assert RegexRewriter({'max_rules': 2}).rewrite(r'/(a|b|c)x/') is None
+    assert RegexRewriter({'max_rules': 3}).rewrite(r'/(a|b|c)x/') == ['ax', 'bx', 'cx']
+
+
+def test_counts_rewritten_and_produced_rules():
+    rewriter = RegexRewriter()
+    rewriter.rewrite(r'/(ad|ads)\.js/')
+    rewriter.rewrite(r'/banner\.gif/')
+    rewriter.rewrite(r'/ad[0-9]/')
+
+    assert (rewriter.rewritten, rewriter.produced) == (2, 3)
+
+
+@pytest.mark.parametrize('rule', [
+    r'/(ad|ads)\.js/',
+    r'/ad(s)?\.js/',
+    r'/^https?:\/\/ads\.example\.com\//',
+    r'/\/track\/.*\/pixel\.gif$/',
+    r'/(banner|promo)-(top|side)\.png/',
+])
+def test_plain_filters_match_what_the_regex_matched(rule):
+    urls = [
+        'https://ads.example.com/ad.js', 'https://cdn.example.com/ads.js', 'http://ads.example.com/x',
+        'https://a.com/?u=http://ads.example.com/', 'https://example.com/track/1/2/pixel.gif',
+        'https://example.com/track/pixel.gif', 'https://example.com/track/1/pixel.gif?x',
+        'https://example.com/img/banner-side.png', 'https://example.com/img/promo-top.png',
+        'https://example.com/img/banner-left.png', 'https://example.com/a.js',
+    ]
+    plain_regexes = [plain_to_regex(plain) for plain in RegexRewriter().rewrite(rule)]
+    regex = rule[1:-1]
+
+    for url in urls:
+        assert bool(re.search(regex, url)) == any(re.search(plain, url) for plain in plain_regexes), url
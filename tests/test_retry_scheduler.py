@@ -0,0 +1,144 @@
+import time
+
+import pytest
+import requests
+
+from retry_scheduler import CircuitBreaker, CircuitOpenError, RetryScheduler, classify_error, parse_retry_after
+
+
+def http_error(status, retry_after=None):
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers['Retry-After'] = retry_after
+    return requests.HTTPError(f"{status} Error", response=response)
+
+
+class Flaky:
+    """Job raising the given errors in turn, then returning 'ok'."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+def open_breaker(host, reset_timeout=0.0):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure(host)
+    return breaker
+
+
+@pytest.mark.parametrize('error, expected', [
+    (http_error(503), (True, None)),
+    (http_error(429, '7'), (True, 7.0)),
+    (http_error(404), (False, None)),
+    (requests.ConnectionError(), (True, None)),
+    (ValueError('bad'), (False, None)),
+])
+def test_classifies_errors(error, expected):
+    assert classify_error(error) == expected
+
+
+def test_parses_retry_after_seconds_and_dates():
+    assert parse_retry_after('12') == 12.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_grows_exponentially_within_jitter_and_cap():
+    scheduler = RetryScheduler(1, base_delay=1.0, max_delay=8.0)
+
+    for attempt, delay in [(1, 1.0), (2, 2.0), (3, 4.0), (6, 8.0)]:
+        assert delay / 2 <= scheduler.backoff_delay(attempt) <= delay
+
+
+def test_retries_retryable_errors_until_success():
+    job = Flaky(requests.ConnectionError(), http_error(502))
+    scheduler = RetryScheduler(2, max_retries=3, base_delay=0.01)
+
+    assert scheduler.run({'a': ('a.example', job)}) == {'a': ('ok', None)}
+    assert job.calls == 3
+
+
+def test_gives_up_after_max_retries():
+    error = requests.ConnectionError('down')
+    job = Flaky(error, error, error)
+    scheduler = RetryScheduler(1, max_retries=2, base_delay=0.01)
+
+    assert scheduler.run({'a': ('a.example', job)}) == {'a': (None, error)}
+    assert job.calls == 2
+
+
+def test_fatal_errors_are_not_retried():
+    error = http_error(404)
+    job = Flaky(error)
+    scheduler = RetryScheduler(1, max_retries=3, base_delay=0.01)
+
+    assert scheduler.run({'a': ('a.example', job)}) == {'a': (None, error)}
+    assert job.calls == 1
+
+
+def test_honors_retry_after_without_opening_the_circuit():
+    job = Flaky(http_error(429, '0'), http_error(503, '0'))
+    scheduler = RetryScheduler(1, max_retries=3, base_delay=60, breaker=CircuitBreaker(failure_threshold=1))
+
+    started = time.monotonic()
+    assert scheduler.run({'a': ('a.example', job)}) == {'a': ('ok', None)}
+    assert time.monotonic() - started < 5
+    assert not scheduler.breaker.is_open('a.example')
+
+
+def test_retry_after_beyond_max_delay_gives_up():
+    error = http_error(503, '3600')
+    scheduler = RetryScheduler(1, max_retries=3, max_delay=60)
+
+    assert scheduler.run({'a': ('a.example', Flaky(error))}) == {'a': (None, error)}
+
+
+def test_open_circuit_fails_fast_with_the_last_error_as_cause():
+    error = requests.ConnectionError('down')
+    job = Flaky(error, error)
+    scheduler = RetryScheduler(1, max_retries=3, base_delay=0.01,
+                               breaker=CircuitBreaker(failure_threshold=1, reset_timeout=300))
+
+    (result, failure), = scheduler.run({'a': ('a.example', job)}).values()
+
+    assert result is None
+    assert isinstance(failure, CircuitOpenError)
+    assert failure.__cause__ is error
+    assert job.calls == 1
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    breaker = open_breaker('a.example')
+
+    assert breaker.allow('a.example')
+    assert not breaker.allow('a.example')
+    breaker.record_success('a.example')
+    assert not breaker.is_open('a.example')
+    assert breaker.allow('a.example')
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = open_breaker('a.example', reset_timeout=300)
+    breaker._opened_at['a.example'] -= 300
+
+    assert breaker.allow('a.example')
+    breaker.record_failure('a.example')
+    assert not breaker.allow('a.example')
+
+
+@pytest.mark.parametrize('error', [http_error(404), http_error(429, '0'), ValueError('bad body')])
+def test_probe_is_released_on_outcomes_that_do_not_count(error):
+    breaker = open_breaker('a.example')
+    scheduler = RetryScheduler(1, max_retries=1, breaker=breaker)
+
+    assert scheduler.run({'a': ('a.example', Flaky(error))}) == {'a': (None, error)}
+    assert breaker.allow('a.example')
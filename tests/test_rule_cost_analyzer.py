@@ -0,0 +1,52 @@
+import json
+
+from rule_cost_analyzer import RuleCostAnalyzer
+
+
+def make_analyzer(logger, error_handler, tmp_path, **settings):
+    settings.setdefault('report_file', str(tmp_path / 'rule_cost.json'))
+    return RuleCostAnalyzer(logger, error_handler, settings)
+
+
+def test_scores_untokenized_rules_above_tokenized(logger, error_handler, tmp_path):
+    analyzer = make_analyzer(logger, error_handler, tmp_path)
+
+    assert analyzer.score_rule('||ads.example.com^') == (1, 'tokenized')
+    assert analyzer.score_rule('*$script') == (90, 'generic_no_token')
+    assert analyzer.score_rule('/ad[0-9]+/') == (70, 'regex')
+    assert analyzer.score_rule('##div:has-text(Sponsored)') == (100, 'generic_procedural_cosmetic')
+
+
+def test_report_action_keeps_every_rule(logger, error_handler, tmp_path):
+    analyzer = make_analyzer(logger, error_handler, tmp_path)
+    rules = ['*$script', '||ads.example.com^']
+
+    assert analyzer.analyze(rules, {}, {}) == rules
+    assert analyzer.kept_sources == ['unknown', 'unknown']
+
+
+def test_rewrite_strips_pointless_wildcards(logger, error_handler, tmp_path):
+    analyzer = make_analyzer(logger, error_handler, tmp_path, action='rewrite')
+
+    assert analyzer.analyze(['*banner-ad*$script', '@@*tracker*'], {}, {}) == ['banner-ad$script', '@@tracker']
+
+
+def test_rewrite_skips_results_already_in_list(logger, error_handler, tmp_path):
+    analyzer = make_analyzer(logger, error_handler, tmp_path, action='rewrite')
+    rules = ['*banner-ad*$script', 'banner-ad$script', '*x*', 'x*']
+    sources = {'*banner-ad*$script': 'A', 'banner-ad$script': 'B', '*x*': 'C', 'x*': 'D'}
+
+    assert analyzer.analyze(rules, sources, {}) == ['banner-ad$script', 'x']
+    assert analyzer.kept_sources == ['B', 'C']
+
+
+def test_drop_removes_costly_rules_of_unprotected_sources(logger, error_handler, tmp_path):
+    analyzer = make_analyzer(logger, error_handler, tmp_path, action='drop', protected_priority=1)
+    rules = ['*$script', '*$image', '||ads.example.com^']
+    sources = {'*$script': 'trusted', '*$image': 'other', '||ads.example.com^': 'other'}
+
+    kept = analyzer.analyze(rules, sources, {'trusted': 1, 'other': 5})
+
+    assert kept == ['*$script', '||ads.example.com^']
+    report = json.loads((tmp_path / 'rule_cost.json').read_text())
+    assert [entry['rule'] for entry in report['dropped']] == ['*$image']
@@ -0,0 +1,35 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from source_fetcher import SourceFetcher
+
+
+@pytest.fixture
+def fetcher(logger, error_handler, tmp_path):
+    fetcher = SourceFetcher(SimpleNamespace(settings={}), error_handler, logger)
+    fetcher.cache_dir = str(tmp_path)
+    return fetcher
+
+
+def test_stale_age_follows_fetched_at_refreshed_by_a_304(fetcher):
+    cache_file = fetcher._get_cache_file_path('List A')
+    fetcher._save_to_cache(cache_file, ['||ads.example.com^'])
+    week_ago = time.time() - 7 * 86400
+    os.utime(cache_file, (week_ago, week_ago))
+    fetcher._save_metadata(cache_file, {'fetched_at': time.time() - 60})
+
+    assert fetcher._load_stale_cache('List A', 'download failed') == ['||ads.example.com^']
+    assert 60 <= fetcher.stale_sources['List A'] < 120
+
+
+def test_stale_age_falls_back_to_the_cache_file_time(fetcher):
+    cache_file = fetcher._get_cache_file_path('List A')
+    fetcher._save_to_cache(cache_file, ['||ads.example.com^'])
+    day_ago = time.time() - 86400
+    os.utime(cache_file, (day_ago, day_ago))
+
+    fetcher._load_stale_cache('List A', 'download failed')
+    assert 86400 <= fetcher.stale_sources['List A'] < 86460